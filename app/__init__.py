@@ -3,11 +3,15 @@ from app.config import configure_app
 from app.routes import register_routes
 from app.models import ModelCache
 from app.limiter import init_limiter
+from app.resources import ResourceManager
 import warnings
 import logging
 warnings.simplefilter("ignore", category=FutureWarning)
 
 def create_app():
+    # No-op when the gunicorn post_fork hook already applied the thread plan
+    ResourceManager().apply()
+
     app = Flask(__name__)
     configure_app(app)
     # Initialize rate limiter with sensible defaults
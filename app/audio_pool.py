@@ -0,0 +1,194 @@
+import atexit
+import subprocess
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from logging import getLogger
+from multiprocessing import get_context, shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+import whisper
+
+from app.config import AudioConfig
+from app.preprocessing import PreprocessingService
+from app.resources import limit_process_threads
+
+logger = getLogger(__name__)
+
+# (shared memory block name, array shape, dtype string)
+SharedArray = Tuple[str, Tuple[int, ...], str]
+DecodedAudio = Tuple[np.ndarray, Optional[np.ndarray]]
+
+
+def load_channels(file_path: str, channels: int = 2, sr: int = whisper.audio.SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode every channel of an audio file in one ffmpeg pass.
+
+    Returns:
+        float32 array of shape (channels, samples); mono sources come back as identical channels
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", file_path,
+        "-f", "s16le", "-ac", str(channels), "-acodec", "pcm_s16le", "-ar", str(sr), "-"
+    ]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to load audio: {e.stderr.decode()}") from e
+
+    interleaved = np.frombuffer(out, np.int16)
+    interleaved = interleaved[:len(interleaved) - len(interleaved) % channels]
+    return np.ascontiguousarray(interleaved.reshape(-1, channels).T).astype(np.float32) / 32768.0
+
+
+def _load_arrays(file_path: str, preprocess: bool, split_channels: bool = False) -> DecodedAudio:
+    """Decode the raw audio with ffmpeg and optionally run the preprocessing pipeline."""
+    if split_channels:
+        audio = load_channels(file_path)
+        if not np.array_equal(audio[0], audio[1]):
+            # No silence trimming, so the channels stay aligned in time
+            processed = np.stack([
+                PreprocessingService.process_array(channel, trim_silence=False) for channel in audio
+            ]) if preprocess else None
+            return audio, processed
+        logger.info(f"{file_path} has one channel, transcribing it as mono")
+        audio = audio[0]
+    else:
+        audio = whisper.load_audio(file_path)
+
+    processed = PreprocessingService.process_audio(file_path) if preprocess else None
+    return audio, processed
+
+
+def _to_shared(array: np.ndarray) -> SharedArray:
+    """Copy an array into a new shared memory block and describe it for the parent."""
+    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    try:
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        return shm.name, array.shape, array.dtype.str
+    except BaseException:
+        # The parent never learns the name of a block that was not returned
+        shm.unlink()
+        raise
+    finally:
+        shm.close()
+
+
+def _from_shared(descriptor: SharedArray) -> np.ndarray:
+    """Copy an array out of a shared memory block and release the block."""
+    name, shape, dtype = descriptor
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _unlink_shared(descriptor: SharedArray) -> None:
+    """Release a shared memory block whose contents are not needed."""
+    try:
+        shm = shared_memory.SharedMemory(name=descriptor[0])
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _decode_job(file_path: str, preprocess: bool, split_channels: bool = False) \
+        -> Tuple[SharedArray, Optional[SharedArray]]:
+    """Worker entry point: decode/preprocess and hand the arrays back through shared memory."""
+    audio, processed = _load_arrays(file_path, preprocess, split_channels)
+    audio_desc = _to_shared(audio)
+    try:
+        return audio_desc, (_to_shared(processed) if processed is not None else None)
+    except BaseException:
+        # e.g. /dev/shm full: the first block would otherwise outlive both processes
+        _unlink_shared(audio_desc)
+        raise
+
+
+class AudioDecodePool:
+    """
+    Runs ffmpeg decoding and audio preprocessing in a process pool so the CPU-bound
+    work of one request overlaps with model inference of another.
+
+    The pool size is taken from AUDIO_DECODE_WORKERS; with 0 workers the work runs
+    inline on the calling thread.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._executor = None
+                    cls._instance._workers = AudioConfig().get('decode_workers', 0)
+        return cls._instance
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._workers <= 0:
+            return None
+
+        with self._lock:
+            if self._executor is None:
+                logger.info(f"Starting audio decode pool with {self._workers} workers")
+                # spawn keeps CUDA/torch thread state of the parent out of the workers;
+                # each worker is single-threaded, it has one core of the thread plan
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._workers,
+                    mp_context=get_context('spawn'),
+                    initializer=limit_process_threads,
+                    initargs=(1,)
+                )
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def submit(self, file_path: str, preprocess: bool = False, split_channels: bool = False) -> 'Future[DecodedAudio]':
+        """
+        Schedule decoding (and preprocessing) of an audio file.
+
+        Args:
+            file_path: Path to the audio file
+            preprocess: Whether to also run the preprocessing pipeline
+            split_channels: Decode the two channels of a stereo file separately; the arrays
+                then have shape (2, samples) unless the file turns out to be mono
+
+        Returns:
+            Future resolving to (raw audio, preprocessed audio or None)
+        """
+        result: 'Future[DecodedAudio]' = Future()
+        executor = self._get_executor()
+
+        if executor is None:
+            try:
+                result.set_result(_load_arrays(file_path, preprocess, split_channels))
+            except Exception as e:
+                result.set_exception(e)
+            return result
+
+        def _collect(job: Future) -> None:
+            try:
+                audio_desc, processed_desc = job.result()
+                try:
+                    audio = _from_shared(audio_desc)
+                except BaseException:
+                    if processed_desc is not None:
+                        _unlink_shared(processed_desc)
+                    raise
+                processed = _from_shared(processed_desc) if processed_desc is not None else None
+                result.set_result((audio, processed))
+            except Exception as e:
+                logger.error(f"Audio decode job failed for {file_path}: {e}")
+                result.set_exception(e)
+
+        executor.submit(_decode_job, file_path, preprocess, split_channels).add_done_callback(_collect)
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
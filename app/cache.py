@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from logging import getLogger
+from typing import Any, Dict, Optional
+
+logger = getLogger(__name__)
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of JSON-serializable results, optionally persisted to disk
+    (one file per key) so entries survive restarts and are shared between workers.
+    """
+
+    def __init__(self, max_entries: int = 256, directory: Optional[str] = None, max_disk_entries: int = 10000):
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+        self._directory = directory
+        self._max_disk_entries = max_disk_entries
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+
+        if self._directory:
+            os.makedirs(self._directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """Build a stable hash key from keyword parts."""
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        value = None
+        if self._directory:
+            try:
+                with open(self._path(key), 'r', encoding='utf-8') as f:
+                    value = json.load(f)
+                os.utime(self._path(key))
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Failed to read cache entry {key}: {e}")
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, value)
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._store(key, value)
+            self._puts += 1
+            prune = self._directory and self._puts % 100 == 0
+
+        if self._directory:
+            try:
+                tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(value, f, ensure_ascii=False)
+                os.replace(tmp_path, self._path(key))
+            except Exception as e:
+                logger.warning(f"Failed to persist cache entry {key}: {e}")
+            if prune:
+                self._prune_disk()
+
+    def _store(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def _prune_disk(self) -> None:
+        """Drop the least recently used files once the directory grows past its limit."""
+        try:
+            files = [entry for entry in os.scandir(self._directory) if entry.name.endswith('.json')]
+            excess = len(files) - self._max_disk_entries
+            if excess <= 0:
+                return
+            files.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in files[:excess]:
+                os.remove(entry.path)
+        except Exception as e:
+            logger.warning(f"Failed to prune cache directory {self._directory}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "persistent": bool(self._directory),
+            }
@@ -0,0 +1,84 @@
+import socket
+import time
+from logging import getLogger
+from typing import Any, Optional
+
+from flask import request
+
+from app.config import TranscriptionConfig
+
+logger = getLogger(__name__)
+
+DEADLINE_EXCEEDED = 'deadline_exceeded'
+CLIENT_DISCONNECTED = 'client_disconnected'
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation for long-running work.
+
+    The work checks the token between steps; it reports a reason once the request's deadline
+    has passed or the client has closed its connection, and the work then stops and returns
+    what it has so far.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, client_socket: Any = None, poll_interval: float = 1.0):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.reason: Optional[str] = None
+        self._socket = client_socket
+        self._poll_interval = poll_interval
+        self._next_poll = 0.0
+
+    @classmethod
+    def from_request(cls, data: Optional[dict] = None) -> 'CancellationToken':
+        """
+        Build a token for the current request.
+
+        The timeout in seconds comes from the X-Request-Timeout header or a "timeout" field in
+        the request data, defaulting to TRANSCRIPTION_DEFAULT_TIMEOUT_SEC. Client-supplied
+        timeouts are capped at TRANSCRIPTION_MAX_TIMEOUT_SEC; requests sending none are not.
+        """
+        config = TranscriptionConfig()
+        requested = request.headers.get('X-Request-Timeout') or (data or {}).get('timeout')
+        timeout = config.get('default_timeout_sec', 0)
+        if requested:
+            try:
+                timeout = float(requested)
+            except (TypeError, ValueError):
+                logger.warning(f"Ignoring invalid request timeout: {requested}")
+                requested = None
+
+        max_timeout = config.get('max_timeout_sec', 0)
+        if requested and max_timeout and (timeout <= 0 or timeout > max_timeout):
+            timeout = max_timeout
+
+        client_socket = request.environ.get('gunicorn.socket') or request.environ.get('werkzeug.socket')
+        return cls(timeout or None, client_socket)
+
+    def _client_gone(self) -> bool:
+        """Peek at the client socket: a readable socket with no data means the peer closed it."""
+        if self._socket is None:
+            return False
+
+        now = time.monotonic()
+        if now < self._next_poll:
+            return False
+        self._next_poll = now + self._poll_interval
+
+        try:
+            return self._socket.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b''
+        except (BlockingIOError, InterruptedError):
+            return False
+        except OSError:
+            return True
+
+    def cancelled(self) -> bool:
+        """Whether the work should stop; the reason is kept in self.reason."""
+        if self.reason is None:
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                self.reason = DEADLINE_EXCEEDED
+            elif self._client_gone():
+                self.reason = CLIENT_DISCONNECTED
+            if self.reason is not None:
+                logger.warning(f"Stopping work early: {self.reason}")
+        return self.reason is not None
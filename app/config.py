@@ -114,9 +114,14 @@ class AudioConfig:
             'frame_length': int(os.getenv('AUDIO_FRAME_LENGTH', '2048')),
             'hop_length': int(os.getenv('AUDIO_HOP_LENGTH', '512')),
             'noise_threshold': float(os.getenv('AUDIO_NOISE_THRESHOLD', '2.0')),
+            'noise_floor_percentile': float(os.getenv('AUDIO_NOISE_FLOOR_PERCENTILE', '10.0')),
+            'noise_floor_window_sec': float(os.getenv('AUDIO_NOISE_FLOOR_WINDOW_SEC', '1.5')),
+            'noise_floor_bias': float(os.getenv('AUDIO_NOISE_FLOOR_BIAS', '1.5')),
             'trim_db': float(os.getenv('AUDIO_TRIM_DB', '20.0')),
             'silence_threshold': float(os.getenv('AUDIO_SILENCE_THRESHOLD', '0.01')),
-            'sample_rate': int(os.getenv('AUDIO_SAMPLE_RATE', '16000'))
+            'sample_rate': int(os.getenv('AUDIO_SAMPLE_RATE', '16000')),
+            # Worker processes for decoding/preprocessing; 0 runs them inline
+            'decode_workers': int(os.getenv('AUDIO_DECODE_WORKERS', '0')),
         }
 
     def get(self, key: str, default: Any = None) -> Any:
@@ -147,6 +152,8 @@ class TranscriptionConfig:
             'add_keywords': str_to_bool(os.getenv('TRANSCRIPTION_ADD_KEYWORDS', '')),
             # Decoding/tuning
             'temperature': float(os.getenv('TRANSCRIPTION_TEMPERATURE', '0.0')),  # greedy for speed
+            # Retry at higher temperatures when a decode fails the compression/logprob checks (0 = never)
+            'temperature_increment_on_fallback': float(os.getenv('TRANSCRIPTION_TEMPERATURE_INCREMENT_ON_FALLBACK', '0.2')),
             'beam_size': int(os.getenv('TRANSCRIPTION_BEAM_SIZE', '1')),          # 1 for greedy
             'best_of': int(os.getenv('TRANSCRIPTION_BEST_OF', '1')),
             'word_timestamps': str_to_bool(os.getenv('TRANSCRIPTION_WORD_TIMESTAMPS', 'false')),
@@ -159,9 +166,243 @@ class TranscriptionConfig:
             'segment_length_sec': int(os.getenv('TRANSCRIPTION_SEGMENT_LENGTH_SEC', '15')),
             'segment_overlap_sec': int(os.getenv('TRANSCRIPTION_SEGMENT_OVERLAP_SEC', '5')),
             'skip_silent_segments': str_to_bool(os.getenv('TRANSCRIPTION_SKIP_SILENT_SEGMENTS', 'true')),
+            # Decode clips shorter than Whisper's 30 s window in one call, without segmentation
+            'short_clip_fast_path': str_to_bool(os.getenv('TRANSCRIPTION_SHORT_CLIP_FAST_PATH', 'true')),
+            'logprob_threshold': float(os.getenv('TRANSCRIPTION_LOGPROB_THRESHOLD', '-1.0')),
+            # Compute the STFT/mel once per recording and share it between silence checks and the encoder
+            'shared_features': str_to_bool(os.getenv('TRANSCRIPTION_SHARED_FEATURES', 'true')),
+            # Segments prepared ahead of the model by the segmentation producer
+            'pipeline_queue_size': int(os.getenv('TRANSCRIPTION_PIPELINE_QUEUE_SIZE', '4')),
+            # Per-request deadline in seconds when the client sends none, and the cap on
+            # client-provided ones only (0 = no deadline / no cap)
+            'default_timeout_sec': float(os.getenv('TRANSCRIPTION_DEFAULT_TIMEOUT_SEC', '0')),
+            'max_timeout_sec': float(os.getenv('TRANSCRIPTION_MAX_TIMEOUT_SEC', '450')),
+            # Speaker labels of the channels in split-channel (stereo call) mode
+            'channel_labels': [label.strip() for label in
+                               os.getenv('TRANSCRIPTION_CHANNEL_LABELS', 'left,right').split(',') if label.strip()],
+            # Automatic language identification (lang=auto): detect once per recording from the
+            # first speech segments, or per segment
+            'auto_language_scope': os.getenv('TRANSCRIPTION_AUTO_LANGUAGE_SCOPE', 'recording').lower(),
+            'language_detection_segments': int(os.getenv('TRANSCRIPTION_LANGUAGE_DETECTION_SEGMENTS', '3')),
             # Focus token biasing
             'focus_tokens': [c.strip() for c in tokens_env.split(',') if c.strip()],
         }
 
     def get(self, key: str, default: Any = None) -> Any:
         return self.settings.get(key, default)
+
+
+class DownloadConfig:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._load_config()
+        return cls._instance
+
+    def _load_config(self) -> None:
+        self.settings = {
+            'timeout': float(os.getenv('DOWNLOAD_TIMEOUT', '30')),
+            'retries': int(os.getenv('DOWNLOAD_RETRIES', '3')),
+            'backoff_factor': float(os.getenv('DOWNLOAD_BACKOFF_FACTOR', '0.5')),
+            # Connection pooling: number of hosts kept in the pool and connections per host
+            'pool_connections': int(os.getenv('DOWNLOAD_POOL_CONNECTIONS', '10')),
+            'per_host_connections': int(os.getenv('DOWNLOAD_PER_HOST_CONNECTIONS', '4')),
+            # Streaming: adaptive read size bounds and Range-resume attempts per file
+            'min_chunk_size': int(os.getenv('DOWNLOAD_MIN_CHUNK_SIZE', str(64 * 1024))),
+            'max_chunk_size': int(os.getenv('DOWNLOAD_MAX_CHUNK_SIZE', str(1024 * 1024))),
+            'max_resumes': int(os.getenv('DOWNLOAD_MAX_RESUMES', '5')),
+            # /pull/batch
+            'batch_workers': int(os.getenv('DOWNLOAD_BATCH_WORKERS', '8')),
+            'batch_max_urls': int(os.getenv('DOWNLOAD_BATCH_MAX_URLS', '100')),
+        }
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.settings.get(key, default)
+
+
+class ReconstructionConfig:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._load_config()
+        return cls._instance
+
+    def _load_config(self) -> None:
+        self.settings = {
+            # Loaded reconstruction models: count limit and memory budget in MB (0 = no budget)
+            'max_models': int(os.getenv('RECONSTRUCTION_MAX_MODELS', '2')),
+            'model_memory_mb': int(os.getenv('RECONSTRUCTION_MODEL_MEMORY_MB', '0')),
+            # CPU weights: float32, bfloat16 or int8 (dynamic quantization of Linear layers)
+            'cpu_dtype': os.getenv('RECONSTRUCTION_CPU_DTYPE', 'float32').lower(),
+            # Micro-batching of concurrent /reconstruct requests
+            'batch_window_ms': float(os.getenv('RECONSTRUCTION_BATCH_WINDOW_MS', '20')),
+            'max_batch_size': int(os.getenv('RECONSTRUCTION_MAX_BATCH_SIZE', '8')),
+            # KV caches of template prefixes kept for reuse (0 disables)
+            'prefix_cache_size': int(os.getenv('RECONSTRUCTION_PREFIX_CACHE_SIZE', '8')),
+            # Greedy decoding by default (requests can override with "deterministic")
+            'deterministic': str_to_bool(os.getenv('RECONSTRUCTION_DETERMINISTIC', 'false')),
+            # Cache of deterministic results; set a directory to persist it on disk
+            'cache_size': int(os.getenv('RECONSTRUCTION_CACHE_SIZE', '256')),
+            'cache_dir': os.getenv('RECONSTRUCTION_CACHE_DIR', ''),
+            'cache_disk_entries': int(os.getenv('RECONSTRUCTION_CACHE_DISK_ENTRIES', '10000')),
+            # Assisted (speculative) decoding: none, prompt_lookup or draft
+            'assist_mode': os.getenv('RECONSTRUCTION_ASSIST_MODE', 'none').lower(),
+            'prompt_lookup_tokens': int(os.getenv('RECONSTRUCTION_PROMPT_LOOKUP_TOKENS', '10')),
+            'draft_model_id': os.getenv('RECONSTRUCTION_DRAFT_MODEL_ID', ''),
+            # Chunked (map-reduce) reconstruction of long transcriptions
+            'chunk_chars': int(os.getenv('RECONSTRUCTION_CHUNK_CHARS', '1500')),
+            'chunk_overlap_segments': int(os.getenv('RECONSTRUCTION_CHUNK_OVERLAP_SEGMENTS', '1')),
+            'chunk_stitch_threshold': float(os.getenv('RECONSTRUCTION_CHUNK_STITCH_THRESHOLD', '60')),
+        }
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.settings.get(key, default)
+
+
+class TTSConfig:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._load_config()
+        return cls._instance
+
+    def _load_config(self) -> None:
+        self.settings = {
+            'sample_rate': int(os.getenv('TTS_SAMPLE_RATE', '48000')),
+            # Generated files in static/audio: total size cap (least recently used first) and TTL
+            'cache_max_mb': int(os.getenv('TTS_CACHE_MAX_MB', '512')),
+            'file_ttl_seconds': int(os.getenv('TTS_FILE_TTL_SECONDS', str(7 * 24 * 3600))),
+            'sweep_interval_seconds': int(os.getenv('TTS_SWEEP_INTERVAL_SECONDS', '300')),
+            # Keep recent outputs in memory and serve them from /tts/audio/<file> (0 disables)
+            'memory_cache_mb': int(os.getenv('TTS_MEMORY_CACHE_MB', '0')),
+            # /tts/stream: longest piece of text passed to the model at once
+            'stream_max_chars': int(os.getenv('TTS_STREAM_MAX_CHARS', '800')),
+        }
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.settings.get(key, default)
+
+
+class AdmissionConfig:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._load_config()
+        return cls._instance
+
+    def _load_config(self) -> None:
+        weights_env = os.getenv('ADMISSION_MODEL_WEIGHTS', 'tiny:0.5,base:1,small:2,medium:4,large:8,turbo:3')
+        model_weights = {}
+        for item in weights_env.split(','):
+            name, _, weight = item.partition(':')
+            if name.strip() and weight.strip():
+                model_weights[name.strip().lower()] = float(weight)
+
+        self.settings = {
+            'enabled': str_to_bool(os.getenv('ADMISSION_ENABLED', 'true')),
+            # Cost = audio seconds x model weight, charged per API key in fixed windows (0 = no budget)
+            'budget': float(os.getenv('ADMISSION_BUDGET', '0')),
+            'window_seconds': int(os.getenv('ADMISSION_WINDOW_SECONDS', '3600')),
+            'model_weights': model_weights,
+            # Rejected up front (0 disables each check)
+            'max_duration_sec': float(os.getenv('ADMISSION_MAX_DURATION_SEC', '0')),
+            'max_queue_wait_sec': float(os.getenv('ADMISSION_MAX_QUEUE_WAIT_SEC', '0')),
+            'initial_seconds_per_cost': float(os.getenv('ADMISSION_INITIAL_SECONDS_PER_COST', '0.5')),
+            # Shared budget counters: sqlite:///path/to/file.sqlite3 or redis://host:6379/0
+            'store_uri': os.getenv('ADMISSION_STORE_URI', 'sqlite:////tmp/admission.sqlite3'),
+        }
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.settings.get(key, default)
+
+
+class ResourceConfig:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._load_config()
+        return cls._instance
+
+    def _load_config(self) -> None:
+        self.settings = {
+            # Cores this worker may use (0 = CPU affinity / cgroup quota of the process)
+            'cpu_cores': int(os.getenv('RESOURCE_CPU_CORES', '0')),
+            # Transcriptions running model inference at the same time; each gets an equal share
+            'inference_slots': int(os.getenv('RESOURCE_INFERENCE_SLOTS', '1')),
+            # Explicit thread counts; 0 derives them from the cores and slots
+            'torch_threads': int(os.getenv('RESOURCE_TORCH_THREADS', '0')),
+            'interop_threads': int(os.getenv('RESOURCE_INTEROP_THREADS', '0')),
+            'blas_threads': int(os.getenv('RESOURCE_BLAS_THREADS', '0')),
+        }
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.settings.get(key, default)
+
+
+class JobsConfig:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._load_config()
+        return cls._instance
+
+    def _load_config(self) -> None:
+        self.settings = {
+            'enabled': str_to_bool(os.getenv('JOBS_ENABLED', 'true')),
+            # SQLite file with jobs and finished segments (empty = jobs.sqlite3 in UPLOAD_FOLDER)
+            'db_path': os.getenv('JOBS_DB_PATH', ''),
+            # Jobs of a worker that stopped heartbeating for this long are taken over and resumed
+            'lease_seconds': int(os.getenv('JOBS_LEASE_SECONDS', '60')),
+            'heartbeat_seconds': int(os.getenv('JOBS_HEARTBEAT_SECONDS', '15')),
+            # A job that brought its worker down this many times is marked failed
+            'max_attempts': int(os.getenv('JOBS_MAX_ATTEMPTS', '3')),
+            # Finished jobs are deleted after this long
+            'retention_seconds': int(os.getenv('JOBS_RETENTION_SECONDS', str(24 * 3600))),
+        }
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.settings.get(key, default)
+
+
+class WebhookConfig:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._load_config()
+        return cls._instance
+
+    def _load_config(self) -> None:
+        self.settings = {
+            'timeout': float(os.getenv('WEBHOOK_TIMEOUT', '10')),
+            # Failed deliveries are retried with exponential backoff: base x 2^attempt, capped
+            'max_attempts': int(os.getenv('WEBHOOK_MAX_ATTEMPTS', '6')),
+            'backoff_base': float(os.getenv('WEBHOOK_BACKOFF_BASE', '1.0')),
+            'backoff_max': float(os.getenv('WEBHOOK_BACKOFF_MAX', '300')),
+            # Deliveries waiting to be sent or retried; new ones are dropped beyond this
+            'queue_size': int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000')),
+            # Small results for the same URL are sent together (1 = one delivery per result)
+            'batch_max_items': int(os.getenv('WEBHOOK_BATCH_MAX_ITEMS', '1')),
+            'batch_max_bytes': int(os.getenv('WEBHOOK_BATCH_MAX_BYTES', str(16 * 1024))),
+            'batch_window_ms': int(os.getenv('WEBHOOK_BATCH_WINDOW_MS', '500')),
+            'pool_connections': int(os.getenv('WEBHOOK_POOL_CONNECTIONS', '10')),
+            'per_host_connections': int(os.getenv('WEBHOOK_PER_HOST_CONNECTIONS', '4')),
+            # Signs each body with HMAC-SHA256 in X-Webhook-Signature when set
+            'secret': os.getenv('WEBHOOK_SECRET', ''),
+        }
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.settings.get(key, default)
@@ -0,0 +1,312 @@
+import mimetypes
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from logging import getLogger
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+from urllib3.util.retry import Retry
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+
+from app.config import DownloadConfig
+
+logger = getLogger(__name__)
+
+# Errors raised mid-body that are worth resuming with a Range request
+_INTERRUPTED_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    ProtocolError,
+    ReadTimeoutError,
+)
+
+# Common audio types mimetypes does not map (or maps inconsistently across platforms)
+_CONTENT_TYPE_EXTENSIONS = {
+    'audio/mpeg': 'mp3',
+    'audio/mp3': 'mp3',
+    'audio/wav': 'wav',
+    'audio/x-wav': 'wav',
+    'audio/wave': 'wav',
+    'audio/ogg': 'ogg',
+    'audio/flac': 'flac',
+    'audio/x-flac': 'flac',
+    'audio/mp4': 'm4a',
+    'audio/x-m4a': 'm4a',
+}
+
+
+class DownloadService:
+    """Service for downloading remote audio files through a shared, pooled HTTP session."""
+
+    _session = None
+    _host_slots: Dict[str, threading.BoundedSemaphore] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_session() -> requests.Session:
+        """Return the process-wide session, creating it with connection pooling and retries."""
+        with DownloadService._lock:
+            if DownloadService._session is None:
+                config = DownloadConfig()
+                retry = Retry(
+                    total=config.get('retries', 3),
+                    backoff_factor=config.get('backoff_factor', 0.5),
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=frozenset(['GET', 'HEAD']),
+                    respect_retry_after_header=True,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=config.get('pool_connections', 10),
+                    pool_maxsize=config.get('per_host_connections', 4),
+                    max_retries=retry,
+                    pool_block=True,
+                )
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                DownloadService._session = session
+            return DownloadService._session
+
+    @staticmethod
+    def _host_slot(file_url: str) -> threading.BoundedSemaphore:
+        """Return the semaphore limiting concurrent downloads from the URL's host."""
+        host = urlparse(file_url).netloc.lower()
+        with DownloadService._lock:
+            slot = DownloadService._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(DownloadConfig().get('per_host_connections', 4))
+                DownloadService._host_slots[host] = slot
+            return slot
+
+    @staticmethod
+    def build_filename(
+            file_url: str,
+            content_type: Optional[str] = None,
+            allowed_extensions: Optional[Set[str]] = None
+    ) -> str:
+        """
+        Derive a unique, safe local filename from the URL path.
+
+        The URL's own extension is kept when it is allowed; otherwise one is guessed from the
+        response Content-Type, falling back to appending .mp3.
+        """
+        path_parts = urlparse(file_url).path.split('/')
+        original_filename = path_parts[-1] if path_parts[-1] else "audio"
+
+        allowed = {ext.lower() for ext in (allowed_extensions or {'mp3'})}
+        extension = os.path.splitext(original_filename)[1].lstrip('.').lower()
+
+        if extension not in allowed:
+            mime_type = (content_type or '').split(';')[0].strip().lower()
+            guessed = _CONTENT_TYPE_EXTENSIONS.get(mime_type) or \
+                (mimetypes.guess_extension(mime_type) or '').lstrip('.')
+            original_filename += f".{guessed if guessed in allowed else 'mp3'}"
+
+        return f"{uuid.uuid4().hex}_{secure_filename(original_filename)}"
+
+    @staticmethod
+    def _expected_size(response: requests.Response) -> Optional[int]:
+        """Total size of the remote file from Content-Range or Content-Length, if known."""
+        content_range = response.headers.get('Content-Range', '')
+        if '/' in content_range:
+            total = content_range.rsplit('/', 1)[1]
+            return int(total) if total.isdigit() else None
+
+        content_length = response.headers.get('Content-Length', '')
+        return int(content_length) if content_length.isdigit() else None
+
+    @staticmethod
+    def _stream_to_file(response: requests.Response, file_path: str, offset: int, max_bytes: Optional[int]) -> None:
+        """
+        Append the response body to file_path starting at offset.
+
+        Reads with an adaptive chunk size: it grows while reads return full chunks quickly
+        and shrinks when a read stalls, so fast links use few large writes.
+        """
+        config = DownloadConfig()
+        min_chunk = config.get('min_chunk_size', 64 * 1024)
+        max_chunk = max(min_chunk, config.get('max_chunk_size', 1024 * 1024))
+        chunk_size = min_chunk
+        written = offset
+
+        with open(file_path, 'r+b' if offset and os.path.exists(file_path) else 'wb') as f:
+            f.seek(offset)
+            f.truncate()
+
+            while True:
+                read_start = time.monotonic()
+                chunk = response.raw.read(chunk_size, decode_content=True)
+                if not chunk:
+                    break
+
+                f.write(chunk)
+                written += len(chunk)
+                if max_bytes is not None and written > max_bytes:
+                    raise RequestEntityTooLarge(f"Remote file exceeds {max_bytes} bytes")
+
+                elapsed = time.monotonic() - read_start
+                if len(chunk) == chunk_size and elapsed < 0.05:
+                    chunk_size = min(chunk_size * 2, max_chunk)
+                elif elapsed > 0.5:
+                    chunk_size = max(chunk_size // 2, min_chunk)
+
+    @staticmethod
+    def download(
+            file_url: str,
+            upload_folder: str,
+            max_bytes: Optional[int] = None,
+            allowed_extensions: Optional[Set[str]] = None
+    ) -> str:
+        """
+        Download a remote file into the upload folder.
+
+        The declared size is checked against max_bytes before anything is written and the
+        stream is aborted as soon as it grows past it. Interrupted transfers are resumed
+        with HTTP Range requests when the server supports them.
+
+        Args:
+            file_url: URL of the file to download
+            upload_folder: Directory the file is written to
+            max_bytes: Maximum accepted file size, None for no limit
+            allowed_extensions: Extensions accepted for the local filename
+
+        Returns:
+            str: Path to the downloaded file
+
+        Raises:
+            requests.exceptions.RequestException: If the download fails
+            RequestEntityTooLarge: If the remote file exceeds max_bytes
+        """
+        config = DownloadConfig()
+        session = DownloadService.get_session()
+        timeout = config.get('timeout', 30)
+        max_resumes = config.get('max_resumes', 5)
+        # Byte offsets must match the file on disk, so ask for the body as-is
+        headers = {'Accept-Encoding': 'identity'}
+
+        file_path = None
+        expected_size = None
+        validator = None
+        written = 0
+        resumes = 0
+
+        logger.info(f"Attempting to download file from: {file_url}")
+        with DownloadService._host_slot(file_url):
+            try:
+                response = session.get(file_url, stream=True, timeout=timeout, headers=headers)
+                while True:
+                    with response:
+                        if response.status_code == 416 and file_path is not None:
+                            # Nothing past our offset: either we already have the whole file, or it shrank
+                            total = DownloadService._expected_size(response) or expected_size
+                            if total is not None and written == total:
+                                break
+                            logger.warning(f"Server rejected the resume range of {file_url} at {written} bytes, "
+                                           f"restarting")
+                            written = 0
+                            interruption = None
+                        else:
+                            response.raise_for_status()  # Raise exception for 4XX/5XX responses
+
+                            if file_path is None or response.status_code == 200:
+                                if written:
+                                    # Server ignored the range (or the file changed): start over
+                                    logger.warning(f"Server did not resume {file_url} "
+                                                   f"(status {response.status_code}), restarting")
+                                    written = 0
+                                # Size and validator of the file this body belongs to
+                                expected_size = DownloadService._expected_size(response)
+                                if max_bytes is not None and expected_size is not None and expected_size > max_bytes:
+                                    raise RequestEntityTooLarge(
+                                        f"Remote file is {expected_size} bytes, limit is {max_bytes} bytes"
+                                    )
+                                validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+                            if file_path is None:
+                                file_path = os.path.join(upload_folder, DownloadService.build_filename(
+                                    file_url, response.headers.get('Content-Type'), allowed_extensions
+                                ))
+
+                            try:
+                                DownloadService._stream_to_file(response, file_path, written, max_bytes)
+                                interruption = None
+                            except _INTERRUPTED_ERRORS as e:
+                                interruption = e
+
+                            written = os.path.getsize(file_path)
+                            if interruption is None and (expected_size is None or written >= expected_size):
+                                break
+
+                    if resumes >= max_resumes:
+                        raise requests.exceptions.ConnectionError(
+                            f"Download interrupted after {written} bytes and {resumes} resume attempts"
+                        )
+                    resumes += 1
+                    logger.warning(f"Download of {file_url} interrupted at {written} bytes "
+                                   f"({interruption or 'incomplete body'}); resuming ({resumes}/{max_resumes})")
+
+                    range_headers = dict(headers)
+                    if written:
+                        range_headers['Range'] = f"bytes={written}-"
+                        if validator:
+                            range_headers['If-Range'] = validator
+                    response = session.get(file_url, stream=True, timeout=timeout, headers=range_headers)
+            except Exception:
+                if file_path and os.path.exists(file_path):
+                    os.remove(file_path)
+                raise
+
+        logger.info(f"File downloaded and saved to: {file_path} ({written} bytes, {resumes} resumes)")
+        return file_path
+
+    @staticmethod
+    def download_many(
+            file_urls: List[str],
+            upload_folder: str,
+            max_bytes: Optional[int] = None,
+            allowed_extensions: Optional[Set[str]] = None
+    ) -> Iterator[Tuple[int, Union[str, Exception]]]:
+        """
+        Download several files concurrently, yielding results as downloads finish.
+
+        Args:
+            file_urls: URLs to download
+            upload_folder: Directory the files are written to
+            max_bytes: Maximum accepted size per file, None for no limit
+            allowed_extensions: Extensions accepted for the local filenames
+
+        Yields:
+            (index into file_urls, downloaded file path or the exception raised)
+        """
+        workers = max(1, min(DownloadConfig().get('batch_workers', 8), len(file_urls) or 1))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='download')
+        futures = {
+            executor.submit(DownloadService.download, url, upload_folder, max_bytes, allowed_extensions): index
+            for index, url in enumerate(file_urls)
+        }
+        pending = set(futures)
+        try:
+            for future in as_completed(futures):
+                pending.discard(future)
+                index = futures[future]
+                try:
+                    file_path = future.result()
+                except Exception as e:
+                    logger.error(f"Error downloading {file_urls[index]}: {e}")
+                    yield index, e
+                else:
+                    yield index, file_path
+        finally:
+            # The consumer stopped early: drop queued downloads and remove files nobody will read
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            for future in pending:
+                if not future.cancelled() and future.exception() is None:
+                    os.remove(future.result())
@@ -14,3 +14,29 @@ class SilenceError(CodedError):
     """Exception raised for silent audio errors."""
     def __init__(self):
         super().__init__(1001, "Audio appears to be silent - transcription may not be meaningful")
+
+
+class ModelLoadError(RuntimeError):
+    """Exception raised when a Whisper model cannot be loaded."""
+
+
+class AdmissionError(CodedError):
+    """Exception raised when a request is rejected before any work is done."""
+    def __init__(self, code: int, message: str, http_status: int = 429, retry_after: int = None):
+        super().__init__(code, message)
+        self.http_status = http_status
+        self.retry_after = retry_after
+
+    @classmethod
+    def too_long(cls, duration: float, max_duration: float) -> 'AdmissionError':
+        return cls(1002, f"Audio is {duration:.0f} seconds long, the limit is {max_duration:.0f} seconds", 413)
+
+    @classmethod
+    def budget_exceeded(cls, used: float, budget: float, retry_after: int) -> 'AdmissionError':
+        return cls(1003, f"Audio budget exhausted ({used:.0f} of {budget:.0f} units used in this window)",
+                   429, retry_after)
+
+    @classmethod
+    def queue_full(cls, wait: float, max_wait: float) -> 'AdmissionError':
+        return cls(1004, f"Server is busy: estimated wait {wait:.0f}s exceeds {max_wait:.0f}s", 503,
+                   int(wait - max_wait) + 1)
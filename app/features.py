@@ -0,0 +1,89 @@
+import math
+from logging import getLogger
+from typing import Any, Optional
+
+import numpy as np
+import torch
+import whisper
+from whisper.audio import HOP_LENGTH, N_FFT, N_FRAMES
+
+logger = getLogger(__name__)
+
+# detect_silence thresholds were tuned on a 2048-point STFT; mean bin magnitudes of noise-like
+# signals scale with the square root of the window length
+_SILENCE_ENERGY_SCALE = math.sqrt(2048 / N_FFT)
+
+# Log10 power of an all-zero frame, as Whisper's clamp produces for padding
+_LOG_FLOOR = -10.0
+
+
+class SpectralFeatures:
+    """
+    Spectral features of one recording, computed once at 16 kHz with Whisper's n_fft/hop.
+
+    Holds the mel power spectrogram and the per-frame mean STFT magnitude. Silence checks
+    read frame energies from it and the Whisper encoder input for any segment is a slice of
+    the mel spectrogram, so transcription runs no other STFT. Noise reduction during
+    preprocessing keeps its own: it needs the phase to resynthesize audio and runs before
+    these features exist.
+    """
+
+    def __init__(self, audio: Any, n_mels: int = 80, device: Optional[Any] = None, chunk_frames: int = 30000):
+        """
+        Args:
+            audio: Mono float32 signal at 16 kHz (numpy array or tensor)
+            n_mels: Mel bands of the Whisper model (80, or 128 for large-v3)
+            device: Device the STFT runs on; results are kept on the CPU
+            chunk_frames: Frames per STFT block, bounding peak memory on long recordings
+        """
+        self.n_mels = n_mels
+        self.num_samples = len(audio)
+
+        signal = audio if torch.is_tensor(audio) else torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32))
+        signal = signal.to(device or 'cpu', dtype=torch.float32)
+
+        # Equivalent to a centered STFT over the whole signal, computed block by block
+        n_frames = self.num_samples // HOP_LENGTH + 1
+        padded = torch.nn.functional.pad(signal[None, None, :], (N_FFT // 2, N_FFT // 2), mode='reflect')[0, 0] \
+            if self.num_samples > N_FFT // 2 else \
+            torch.nn.functional.pad(signal, (N_FFT // 2, N_FFT // 2))
+        window = torch.hann_window(N_FFT, device=signal.device)
+        filters = whisper.audio.mel_filters(signal.device, n_mels)
+
+        mel_blocks, energy_blocks = [], []
+        for first in range(0, n_frames, chunk_frames):
+            last = min(first + chunk_frames, n_frames)
+            block = padded[first * HOP_LENGTH:(last - 1) * HOP_LENGTH + N_FFT]
+            stft = torch.stft(block, N_FFT, HOP_LENGTH, window=window, center=False, return_complex=True)
+            magnitudes = stft.abs()
+            mel_blocks.append((filters @ magnitudes ** 2).cpu())
+            energy_blocks.append(magnitudes.mean(dim=0).cpu())
+
+        self.mel_power = torch.cat(mel_blocks, dim=1)
+        self.frame_energy = torch.cat(energy_blocks).numpy()
+        logger.info(f"Spectral features: {self.mel_power.shape[1]} frames, {n_mels} mel bands")
+
+    @staticmethod
+    def _frames(start_sample: int, end_sample: int) -> slice:
+        first = start_sample // HOP_LENGTH
+        return slice(first, first + max(1, math.ceil((end_sample - start_sample) / HOP_LENGTH)))
+
+    def silence_energy(self, start_sample: int = 0, end_sample: Optional[int] = None) -> np.ndarray:
+        """Per-frame energies of a span, on the scale detect_silence's threshold expects."""
+        end_sample = self.num_samples if end_sample is None else end_sample
+        return self.frame_energy[self._frames(start_sample, end_sample)] * _SILENCE_ENERGY_SCALE
+
+    def log_mel(self, start_sample: int = 0, end_sample: Optional[int] = None, device: Optional[Any] = None) -> torch.Tensor:
+        """
+        Whisper encoder input for a span of up to 30 seconds: (n_mels, 3000) log-mel, zero padded
+        and normalized the way whisper.log_mel_spectrogram + pad_or_trim normalize a segment.
+        """
+        end_sample = self.num_samples if end_sample is None else end_sample
+        frames = self._frames(start_sample, end_sample)
+        span = self.mel_power[:, frames][:, :N_FRAMES].to(device or 'cpu')
+
+        log_spec = span.clamp(min=1e-10).log10()
+        if log_spec.shape[1] < N_FRAMES:
+            log_spec = torch.nn.functional.pad(log_spec, (0, N_FRAMES - log_spec.shape[1]), value=_LOG_FLOOR)
+        log_spec = torch.maximum(log_spec, log_spec.max() - 8.0)
+        return (log_spec + 4.0) / 4.0
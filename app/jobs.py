@@ -0,0 +1,329 @@
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from logging import getLogger
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import JobsConfig
+from app.exceptions import CodedError
+
+logger = getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+SegmentCallback = Callable[[str, Dict[str, Any]], None]
+# handler(file_path, options, on_segment, completed_segments) -> transcription result
+JobHandler = Callable[[str, Dict[str, Any], SegmentCallback, Dict[str, List[Dict[str, Any]]]], Dict[str, Any]]
+# Called with the stored job once it has completed or failed
+JobCallback = Callable[[Dict[str, Any]], None]
+
+
+class JobStore:
+    """
+    Transcription jobs and their finished segments in a SQLite file.
+
+    Every decoded segment is written as soon as it is finished, so a job interrupted by a
+    crash can be resumed from its last finished segment. Jobs are leased to one worker
+    process at a time; a worker that stops heartbeating loses its jobs to the others.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, file_path TEXT NOT NULL, options TEXT NOT NULL, "
+            "result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, owner TEXT, heartbeat_at REAL, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_segments ("
+            "job_id TEXT NOT NULL, language TEXT NOT NULL, start REAL NOT NULL, speaker TEXT NOT NULL, "
+            "segment TEXT NOT NULL, PRIMARY KEY (job_id, language, start, speaker))"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def create(self, file_path: str, options: Dict[str, Any], owner: str) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO jobs (id, status, file_path, options, owner, heartbeat_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, QUEUED, file_path, json.dumps(options), owner, now, now, now)
+        )
+        return job_id
+
+    def claimable(self, owner: str, lease_seconds: float) -> List[str]:
+        """Unfinished jobs whose worker stopped heartbeating, oldest first."""
+        rows = self._connection().execute(
+            "SELECT id FROM jobs WHERE status IN (?, ?) AND (owner IS NULL OR (owner != ? AND heartbeat_at < ?)) "
+            "ORDER BY created_at",
+            (QUEUED, RUNNING, owner, time.time() - lease_seconds)
+        ).fetchall()
+        return [row['id'] for row in rows]
+
+    def claim(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """Take over an abandoned job; False when another worker got it first."""
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE jobs SET owner = ?, heartbeat_at = ? WHERE id = ? AND status IN (?, ?) "
+            "AND (owner IS NULL OR (owner != ? AND heartbeat_at < ?))",
+            (owner, now, job_id, QUEUED, RUNNING, owner, now - lease_seconds)
+        )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, owner: str) -> None:
+        self._connection().execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status IN (?, ?)",
+            (time.time(), owner, QUEUED, RUNNING)
+        )
+
+    def start(self, job_id: str) -> int:
+        """Mark a job running and return how many times it has been started."""
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "UPDATE jobs SET status = ?, attempts = attempts + 1, heartbeat_at = ?, updated_at = ? WHERE id = ?",
+            (RUNNING, now, now, job_id)
+        )
+        return conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()['attempts']
+
+    def add_segment(self, job_id: str, language: str, segment: Dict[str, Any]) -> None:
+        # Segments replayed on resume are already stored
+        self._connection().execute(
+            "INSERT OR IGNORE INTO job_segments (job_id, language, start, speaker, segment) VALUES (?, ?, ?, ?, ?)",
+            (job_id, language, segment['start'], segment.get('speaker') or '', json.dumps(segment))
+        )
+
+    def segments(self, job_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Finished segments of a job per language, ordered by time."""
+        rows = self._connection().execute(
+            "SELECT language, segment FROM job_segments WHERE job_id = ? ORDER BY start, speaker", (job_id,)
+        ).fetchall()
+        segments: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            segments.setdefault(row['language'], []).append(json.loads(row['segment']))
+        return segments
+
+    def finish(self, job_id: str, result: Optional[Dict[str, Any]] = None, error: Optional[Dict[str, Any]] = None) -> None:
+        """Store the outcome; the per-segment progress is no longer needed once the result is kept."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, owner = NULL, updated_at = ? WHERE id = ?",
+                (FAILED if error is not None else COMPLETED,
+                 json.dumps(result) if result is not None else None,
+                 json.dumps(error) if error is not None else None,
+                 time.time(), job_id)
+            )
+            conn.execute("DELETE FROM job_segments WHERE job_id = ?", (job_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connection()
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['options'] = json.loads(job['options'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['error'] = json.loads(job['error']) if job['error'] else None
+        job['segments_done'] = conn.execute(
+            "SELECT COUNT(*) FROM job_segments WHERE job_id = ?", (job_id,)
+        ).fetchone()[0]
+        return job
+
+    def purge(self, older_than: float) -> int:
+        """Delete finished jobs last updated before the given time."""
+        cursor = self._connection().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (COMPLETED, FAILED, older_than)
+        )
+        return cursor.rowcount
+
+
+class JobRunner:
+    """
+    Runs transcription jobs on a background thread of the worker.
+
+    Jobs are persisted in a JobStore before they are queued, and each finished segment is
+    recorded as it is decoded. On start, and periodically afterwards, the runner takes over
+    unfinished jobs whose worker stopped heartbeating (e.g. after a crash) and resumes them,
+    skipping the segments that were already finished.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._init()
+        return cls._instance
+
+    def _init(self) -> None:
+        config = JobsConfig()
+        self.enabled = config.get('enabled', True)
+        self.lease_seconds = max(1, config.get('lease_seconds', 60))
+        self.heartbeat_seconds = max(1, min(config.get('heartbeat_seconds', 15), self.lease_seconds / 2))
+        self.max_attempts = max(1, config.get('max_attempts', 3))
+        self.retention_seconds = config.get('retention_seconds', 24 * 3600)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.store: Optional[JobStore] = None
+        self._app = None
+        self._handler: Optional[JobHandler] = None
+        self._on_finish: Optional[JobCallback] = None
+        self._queue: 'queue.Queue[str]' = queue.Queue()
+        # Admission tickets of jobs submitted to this worker, released when they finish
+        self._tickets: Dict[str, Any] = {}
+        self._started = False
+
+    def start(self, app: Any, handler: JobHandler, on_finish: Optional[JobCallback] = None) -> None:
+        """Open the store, resume abandoned jobs and start the worker threads (once per process)."""
+        with self._lock:
+            if self._started or not self.enabled:
+                return
+            self._started = True
+
+        self._app = app
+        self._handler = handler
+        self._on_finish = on_finish
+        self.store = JobStore(JobsConfig().get('db_path') or os.path.join(app.config['UPLOAD_FOLDER'], 'jobs.sqlite3'))
+        self._reclaim()
+        threading.Thread(target=self._work, name='job-runner', daemon=True).start()
+        threading.Thread(target=self._maintain, name='job-heartbeat', daemon=True).start()
+        logger.info(f"Job runner started as {self.owner}")
+
+    def submit(self, file_path: str, options: Dict[str, Any], ticket: Any = None) -> str:
+        """
+        Persist and queue a job.
+
+        Args:
+            file_path: Audio in UPLOAD_FOLDER; removed when the job finishes
+            options: JSON-serializable transcription options
+            ticket: Admission ticket to release when the job finishes
+        """
+        if self.store is None:
+            raise RuntimeError("Job runner is not started")
+        job_id = self.store.create(file_path, options, self.owner)
+        if ticket is not None:
+            self._tickets[job_id] = ticket
+        self._queue.put(job_id)
+        logger.info(f"Queued job {job_id}")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id) if self.store is not None else None
+
+    def _reclaim(self) -> None:
+        for job_id in self.store.claimable(self.owner, self.lease_seconds):
+            if self.store.claim(job_id, self.owner, self.lease_seconds):
+                logger.info(f"Resuming job {job_id}")
+                self._queue.put(job_id)
+
+    def _maintain(self) -> None:
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            try:
+                self.store.heartbeat(self.owner)
+                self._reclaim()
+                if self.retention_seconds > 0:
+                    self.store.purge(time.time() - self.retention_seconds)
+            except Exception as e:
+                logger.error(f"Job maintenance failed: {e}")
+
+    def _work(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            except Exception as e:
+                logger.exception(f"Job {job_id} could not be processed: {e}")
+
+    def _run(self, job_id: str) -> None:
+        job = self.store.get(job_id)
+        if job is None or job['status'] not in (QUEUED, RUNNING):
+            return
+
+        failure = None
+        try:
+            attempts = self.store.start(job_id)
+            if attempts > self.max_attempts:
+                logger.error(f"Job {job_id} gave up after {attempts - 1} attempts")
+                self.store.finish(job_id, error={"error": f"Job failed after {attempts - 1} attempts"})
+                return
+
+            completed = self.store.segments(job_id)
+            resumed = sum(len(segments) for segments in completed.values())
+            if resumed:
+                logger.info(f"Job {job_id}: resuming after {resumed} finished segments")
+
+            def on_segment(language: str, segment: Dict[str, Any]) -> None:
+                # Failed segments are not recorded so a resumed job decodes them again
+                if language and 'error' not in segment:
+                    self.store.add_segment(job_id, language, segment)
+
+            try:
+                with self._app.app_context():
+                    result = self._handler(job['file_path'], job['options'], on_segment, completed)
+            except CodedError as e:
+                failure = e
+                self.store.finish(job_id, error=e.to_dict())
+                return
+            except Exception as e:
+                failure = e
+                logger.exception(f"Job {job_id} failed: {e}")
+                self.store.finish(job_id, error={"error": str(e)})
+                return
+
+            if result.get('error') is not None:
+                self.store.finish(job_id, error=result)
+                return
+            if resumed:
+                result['resumed_segments'] = resumed
+            self.store.finish(job_id, result=result)
+            logger.info(f"Job {job_id} completed")
+        finally:
+            ticket = self._tickets.pop(job_id, None)
+            if ticket is not None:
+                ticket.release(failure)
+            job = self.store.get(job_id)
+            if job is not None and job['status'] in (COMPLETED, FAILED):
+                self._remove_audio(job['file_path'])
+                if self._on_finish is not None:
+                    try:
+                        self._on_finish(job)
+                    except Exception as e:
+                        logger.error(f"Job {job_id} finish callback failed: {e}")
+
+    @staticmethod
+    def _remove_audio(file_path: str) -> None:
+        try:
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+        except OSError as e:
+            logger.error(f"Error removing job audio {file_path}: {e}")
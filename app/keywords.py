@@ -35,27 +35,11 @@ class KeyWordsService:
             logger.info("No keywords provided for spotting")
             return {lang: {} for lang in languages}
 
-        # Separate regular keywords from negated keywords
-        regular_keywords = []
-        negated_keywords = []
-        display_keywords = []  # Original keywords for display
-
-        for keyword in keywords:
-            if keyword.startswith('!'):
-                negated_keywords.append(keyword[1:].lower())  # Remove '!' and lowercase
-                display_keywords.append(keyword)  # Keep original for display
-            else:
-                regular_keywords.append(keyword.lower())
-                display_keywords.append(keyword)
-
-        logger.info(f"Processing keywords: {display_keywords}")
+        logger.info(f"Processing keywords: {keywords}")
         logger.info(f"Regular keywords: {[kw for kw in keywords if not kw.startswith('!')]}")
         logger.info(f"Negated keywords: {[kw for kw in keywords if kw.startswith('!')]}")
 
-        keyword_spots = {
-            lang: {keyword: [] for keyword in display_keywords}
-            for lang in languages
-        }
+        keyword_spots = KeyWordsService.init_keyword_spots(keywords, languages)
 
         for language in languages:
             segments = transcription_results.get(language, [])
@@ -65,29 +49,67 @@ class KeyWordsService:
                 continue
 
             for segment_data in segments:
-                # Process regular keywords
-                if regular_keywords:
-                    KeyWordsService._process_segment(
-                        segment_data,
-                        [kw for kw in keywords if not kw.startswith('!')],
-                        regular_keywords,
-                        keyword_spots[language],
-                        confidence_threshold,
-                        is_negated=False
-                    )
-
-                # Process negated keywords
-                if negated_keywords:
-                    KeyWordsService._process_segment_negation(
-                        segment_data,
-                        [kw for kw in keywords if kw.startswith('!')],
-                        negated_keywords,
-                        keyword_spots[language],
-                        confidence_threshold
-                    )
+                KeyWordsService.spot_segment(
+                    segment_data,
+                    keywords,
+                    keyword_spots[language],
+                    confidence_threshold
+                )
 
         return keyword_spots
 
+    @staticmethod
+    def init_keyword_spots(
+            keywords: List[str],
+            languages: List[str]
+    ) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """Create the empty per-language keyword spot structure filled by spot_segment."""
+        return {
+            lang: {keyword: [] for keyword in keywords}
+            for lang in languages
+        }
+
+    @staticmethod
+    def spot_segment(
+            segment_data: Dict[str, Any],
+            keywords: List[str],
+            keyword_spots: Dict[str, List[Dict[str, Any]]],
+            confidence_threshold: int = 80
+    ) -> None:
+        """
+        Spot keywords in a single finished segment, so spotting can run while
+        later segments are still being transcribed.
+
+        Args:
+            segment_data: Segment result with text and timing information
+            keywords: List of keywords (negated keywords carry a "!" prefix)
+            keyword_spots: Keyword spots of the segment's language, updated in place
+            confidence_threshold: Minimum confidence level to consider a match
+        """
+        regular_keywords = [kw for kw in keywords if not kw.startswith('!')]
+        negated_keywords = [kw for kw in keywords if kw.startswith('!')]
+
+        # Process regular keywords
+        if regular_keywords:
+            KeyWordsService._process_segment(
+                segment_data,
+                regular_keywords,
+                [kw.lower() for kw in regular_keywords],
+                keyword_spots,
+                confidence_threshold,
+                is_negated=False
+            )
+
+        # Process negated keywords
+        if negated_keywords:
+            KeyWordsService._process_segment_negation(
+                segment_data,
+                negated_keywords,
+                [kw[1:].lower() for kw in negated_keywords],
+                keyword_spots,
+                confidence_threshold
+            )
+
     @staticmethod
     def _process_segment(
             segment_data: Dict[str, Any],
@@ -1,10 +1,339 @@
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+from logging import getLogger
+from typing import Any, Optional, Tuple
+
+from flask import request
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
+from app.config import AdmissionConfig, is_prod
+from app.exceptions import AdmissionError, ModelLoadError, SilenceError
+
+logger = getLogger(__name__)
+
+
 def init_limiter(app):
     return Limiter(
         get_remote_address,
         app=app,
         default_limits=["10000 per hour", "30 per second"],
-        storage_uri="memory://",
+        # Use a shared store (e.g. redis://host:6379) so replicas enforce one set of counters
+        storage_uri=os.getenv('RATE_LIMIT_STORAGE_URI', 'memory://'),
     )
+
+
+def probe_duration(file_path: str) -> Optional[float]:
+    """
+    Read the audio duration without decoding the samples.
+
+    The container header is read with soundfile first; ffprobe covers formats libsndfile
+    does not parse. Returns None when neither can tell.
+    """
+    try:
+        import soundfile as sf
+
+        info = sf.info(file_path)
+        if info.duration > 0:
+            return float(info.duration)
+    except Exception:
+        pass
+
+    try:
+        completed = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', file_path],
+            capture_output=True, text=True, timeout=10
+        )
+        return float(completed.stdout.strip())
+    except (OSError, ValueError, subprocess.SubprocessError) as e:
+        logger.warning(f"Could not probe duration of {file_path}: {e}")
+        return None
+
+
+class SQLiteCostStore:
+    """Per-key cost counters in fixed windows, in a SQLite file shared by local processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS admission_usage ("
+                "key TEXT NOT NULL, window INTEGER NOT NULL, cost REAL NOT NULL, "
+                "PRIMARY KEY (key, window))"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def charge(self, key: str, window: int, cost: float, budget: float) -> Tuple[bool, float]:
+        """
+        Add cost to the key's usage in the window unless that would exceed the budget.
+
+        Returns:
+            (whether the cost was charged, usage in the window after the call)
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT cost FROM admission_usage WHERE key = ? AND window = ?", (key, window)
+            ).fetchone()
+            used = row[0] if row else 0.0
+            if used + cost > budget:
+                conn.execute("COMMIT")
+                return False, used
+
+            conn.execute(
+                "INSERT INTO admission_usage (key, window, cost) VALUES (?, ?, ?) "
+                "ON CONFLICT(key, window) DO UPDATE SET cost = cost + excluded.cost",
+                (key, window, cost)
+            )
+            conn.execute("DELETE FROM admission_usage WHERE window < ?", (window,))
+            conn.execute("COMMIT")
+            return True, used + cost
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def refund(self, key: str, window: int, cost: float) -> None:
+        """Take a previously charged cost back off the key's usage in the window."""
+        self._connection().execute(
+            "UPDATE admission_usage SET cost = MAX(0, cost - ?) WHERE key = ? AND window = ?",
+            (cost, key, window)
+        )
+
+
+class RedisCostStore:
+    """Per-key cost counters in fixed windows, in Redis shared by all replicas."""
+
+    # Check and increment atomically; the counter expires with its window
+    _CHARGE_SCRIPT = """
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+local cost = tonumber(ARGV[1])
+if used + cost > tonumber(ARGV[2]) then
+  return {0, tostring(used)}
+end
+used = redis.call('INCRBYFLOAT', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {1, tostring(used)}
+"""
+
+    # Never below zero, and never recreating a counter whose window has expired
+    _REFUND_SCRIPT = """
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+if used <= 0 then
+  return 0
+end
+redis.call('INCRBYFLOAT', KEYS[1], -math.min(used, tonumber(ARGV[1])))
+return 1
+"""
+
+    def __init__(self, url: str, window_seconds: int):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Redis admission store requires the 'redis' package")
+
+        self._client = redis.Redis.from_url(url)
+        self._charge = self._client.register_script(self._CHARGE_SCRIPT)
+        self._refund = self._client.register_script(self._REFUND_SCRIPT)
+        self._ttl = max(1, int(window_seconds) * 2)
+
+    def charge(self, key: str, window: int, cost: float, budget: float) -> Tuple[bool, float]:
+        allowed, used = self._charge(keys=[f"admission:{key}:{window}"], args=[cost, budget, self._ttl])
+        return bool(allowed), float(used)
+
+    def refund(self, key: str, window: int, cost: float) -> None:
+        self._refund(keys=[f"admission:{key}:{window}"], args=[cost])
+
+
+# Failures after admission that leave the caller's budget untouched: nothing was transcribed
+_REFUNDED_ERRORS = (SilenceError, ModelLoadError)
+
+
+class AdmissionTicket:
+    """Admitted work; counts towards the queue until the request finishes."""
+
+    def __init__(
+            self,
+            controller: 'AdmissionController',
+            cost: float,
+            key: Optional[str] = None,
+            window: Optional[int] = None
+    ):
+        self.controller = controller
+        self.cost = cost
+        # Budget charge to refund; None when no budget was charged
+        self.key = key
+        self.window = window
+        self.started = time.monotonic()
+        self._released = False
+
+    def release(self, error: Optional[BaseException] = None) -> None:
+        """Finish the work; the budget charge is refunded when it failed with silent audio or no model."""
+        if self._released:
+            return
+        self._released = True
+        self.controller._finish(self.cost, time.monotonic() - self.started)
+        if isinstance(error, _REFUNDED_ERRORS) and self.key is not None:
+            self.controller._refund(self.key, self.window, self.cost)
+
+    def __enter__(self) -> 'AdmissionTicket':
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Optional[BaseException], traceback: Any) -> None:
+        self.release(exc_value)
+
+
+class AdmissionController:
+    """
+    Cost-aware admission for transcription requests.
+
+    Each request costs its audio duration times a weight for the model size. Requests are
+    rejected up front when the audio is longer than the configured maximum, when the
+    estimated wait behind already admitted work is too long, or when the caller's API key
+    has spent its budget for the current window. Budgets are kept in a shared store: Redis
+    across replicas, or a SQLite file shared only by the processes of one host (development
+    and tests). The queue estimate is local to this process. Requests that then fail on
+    silent audio or a model that cannot be loaded get their charge refunded.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._init()
+        return cls._instance
+
+    def _init(self) -> None:
+        config = AdmissionConfig()
+        self.enabled = config.get('enabled', True)
+        self.budget = config.get('budget', 0)
+        self.window_seconds = max(1, config.get('window_seconds', 3600))
+        self.max_duration = config.get('max_duration_sec', 0)
+        self.max_queue_wait = config.get('max_queue_wait_sec', 0)
+        self.model_weights = config.get('model_weights', {})
+        self._store_uri = config.get('store_uri', '')
+        self._store = None
+        self._state_lock = threading.Lock()
+        self._outstanding = 0.0
+        # Processing seconds per unit of cost, learned from finished requests
+        self._seconds_per_cost = config.get('initial_seconds_per_cost', 0.5)
+
+    def _uses_redis(self) -> bool:
+        return self._store_uri.startswith('redis://') or self._store_uri.startswith('rediss://')
+
+    def check_store(self) -> None:
+        """
+        Startup check that budgets are shared between replicas.
+
+        Raises:
+            RuntimeError: If budgets are enabled in production without a Redis store
+        """
+        if not self.enabled or not self.budget or self._uses_redis():
+            return
+        message = (f"Admission budgets are kept in SQLite ({self._store_uri or 'sqlite:////tmp/admission.sqlite3'}), "
+                   f"which is local to this host: every replica enforces its own budget")
+        if is_prod:
+            raise RuntimeError(f"{message}. Set ADMISSION_STORE_URI to a redis:// URI in production")
+        logger.warning(message)
+
+    def _get_store(self) -> Any:
+        with self._state_lock:
+            if self._store is None:
+                if self._uses_redis():
+                    self._store = RedisCostStore(self._store_uri, self.window_seconds)
+                else:
+                    path = self._store_uri[len('sqlite:///'):] if self._store_uri.startswith('sqlite:///') \
+                        else (self._store_uri or '/tmp/admission.sqlite3')
+                    self._store = SQLiteCostStore(path)
+            return self._store
+
+    def model_weight(self, model_type: str) -> float:
+        """Relative cost of a Whisper model; variants like large-v3 use their family weight."""
+        name = (model_type or 'base').lower()
+        if name in self.model_weights:
+            return self.model_weights[name]
+        return self.model_weights.get(name.split('-')[0].split('.')[0], 1.0)
+
+    @staticmethod
+    def caller_key() -> str:
+        """Budget key of the current request: its API key, or the client address without one."""
+        return request.headers.get('X-API-Key') or f"ip:{get_remote_address()}"
+
+    def estimated_wait(self) -> float:
+        with self._state_lock:
+            return self._outstanding * self._seconds_per_cost
+
+    def admit(self, file_path: str, model_type: str, key: Optional[str] = None) -> AdmissionTicket:
+        """
+        Probe the file and admit or reject it.
+
+        Returns:
+            AdmissionTicket: Release it (or use it as a context manager) when the work is done
+
+        Raises:
+            AdmissionError: If the request is over a limit
+        """
+        if not self.enabled:
+            return AdmissionTicket(self, 0.0)
+
+        duration = probe_duration(file_path)
+        if duration is None:
+            # Unknown length: admit, charging by file size as a rough stand-in (~16 kB/s MP3)
+            duration = os.path.getsize(file_path) / 16000
+
+        if self.max_duration and duration > self.max_duration:
+            raise AdmissionError.too_long(duration, self.max_duration)
+
+        cost = duration * self.model_weight(model_type)
+
+        wait = self.estimated_wait()
+        if self.max_queue_wait and wait > self.max_queue_wait:
+            raise AdmissionError.queue_full(wait, self.max_queue_wait)
+
+        window = None
+        if self.budget:
+            key = key or self.caller_key()
+            now = time.time()
+            window = int(now // self.window_seconds)
+            allowed, used = self._get_store().charge(key, window, cost, self.budget)
+            if not allowed:
+                retry_after = int((window + 1) * self.window_seconds - now) + 1
+                raise AdmissionError.budget_exceeded(used, self.budget, retry_after)
+
+        with self._state_lock:
+            self._outstanding += cost
+
+        logger.info(f"Admitted {duration:.1f}s of audio on {model_type} (cost {cost:.1f}, "
+                    f"estimated wait {wait:.1f}s)")
+        return AdmissionTicket(self, cost, key if self.budget else None, window)
+
+    def _refund(self, key: str, window: int, cost: float) -> None:
+        try:
+            self._get_store().refund(key, window, cost)
+            logger.info(f"Refunded cost {cost:.1f} to {key}")
+        except Exception as e:
+            logger.error(f"Could not refund admission cost to {key}: {e}")
+
+    def _finish(self, cost: float, elapsed: float) -> None:
+        with self._state_lock:
+            self._outstanding = max(0.0, self._outstanding - cost)
+            if cost > 0:
+                self._seconds_per_cost = 0.8 * self._seconds_per_cost + 0.2 * (elapsed / cost)
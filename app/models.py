@@ -1,17 +1,23 @@
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
 from logging import getLogger
 from typing import Optional, Any, Tuple
 import whisper
 import threading
 import time
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import AutoConfig, AutoTokenizer, AutoModelForCausalLM
+
+from app.config import ReconstructionConfig
 
 logger = getLogger(__name__)
 
 
 class ModelCache:
     _instance = None
-    _lock = threading.Lock()
+    # Reentrant: get_model falls back to load_model while holding the lock
+    _lock = threading.RLock()
 
     def __new__(cls):
         if not cls._instance:
@@ -98,7 +104,70 @@ class ModelCache:
             return self._models.get(model_type) or self.load_model(model_type)
 
 
+# CPU loading modes: bytes per parameter once loaded, and peak bytes per parameter while loading
+CPU_LOAD_MODES = {
+    'float32': (4, 4),
+    'bfloat16': (2, 2),
+    # Dynamic int8 quantization starts from float32 weights, so the load peaks above the result
+    'int8': (1, 5),
+}
+
+
+def available_memory_bytes() -> Optional[int]:
+    """Memory available for new allocations (MemAvailable on Linux), None if unknown."""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def estimate_parameter_count(model_id: str) -> Optional[int]:
+    """Count model parameters from its config without allocating the weights."""
+    try:
+        from accelerate import init_empty_weights
+
+        config = AutoConfig.from_pretrained(model_id)
+        with init_empty_weights():
+            model = AutoModelForCausalLM.from_config(config)
+        return sum(p.numel() for p in model.parameters())
+    except Exception as e:
+        logger.warning(f"Could not estimate parameter count of {model_id}: {e}")
+        return None
+
+
+def quantize_int8(model: Any) -> Any:
+    """Apply dynamic int8 quantization to the Linear layers of a CPU model."""
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class _GemmaEntry:
+    """A loaded causal LM with its tokenizer and the number of requests currently using it."""
+
+    def __init__(self, model: Any, tokenizer: Any, device: str, size_bytes: Optional[int] = None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.refcount = 0
+        # Quantized weights live in packed params, so callers pass an estimate for those
+        self.size_bytes = size_bytes or sum(p.numel() * p.element_size() for p in model.parameters()) + \
+            sum(b.numel() * b.element_size() for b in model.buffers())
+
+
 class GemmaModelCache:
+    """
+    Keyed cache of causal LMs used for text reconstruction.
+
+    Several models stay loaded at once, bounded by a model count and a memory budget.
+    Least recently used models are evicted first, but only when no request holds them:
+    use acquire()/release() (or the use() context manager) around generation.
+    """
     _instance = None
     _lock = threading.Lock()
 
@@ -106,20 +175,122 @@ class GemmaModelCache:
         if not cls._instance:
             with cls._lock:
                 if not cls._instance:
+                    config = ReconstructionConfig()
                     cls._instance = super().__new__(cls)
-                    cls._instance._model = None
-                    cls._instance._tokenizer = None
-                    cls._instance._model_id = None
+                    cls._instance._entries = OrderedDict()
+                    # Estimated sizes of models being loaded, counted against the budget
+                    cls._instance._reserved = {}
+                    cls._instance._load_locks = {}
+                    cls._instance._state_lock = threading.Lock()
                     cls._instance._device = 'cuda' if torch.cuda.is_available() else 'cpu'
+                    cls._instance._max_models = max(1, config.get('max_models', 2))
+                    cls._instance._memory_budget = config.get('model_memory_mb', 0) * 1024 ** 2
+                    cls._instance._cpu_mode = config.get('cpu_dtype', 'float32')
+                    if cls._instance._cpu_mode not in CPU_LOAD_MODES:
+                        logger.warning(f"Unknown CPU load mode {cls._instance._cpu_mode}, using float32")
+                        cls._instance._cpu_mode = 'float32'
         return cls._instance
 
-    def load_model(self, model_id: str = "google/gemma-2b-it") -> bool:
-        with self._lock:
-            if self._model and self._tokenizer and self._model_id == model_id:
-                logger.info(f"Gemma model {model_id} already loaded, reusing")
-                return True
+    def _estimated_size(self, parameters: Optional[int], device: str) -> Optional[int]:
+        """Resident size in bytes of a model with this many parameters once loaded on the device."""
+        if parameters is None:
+            return None
+        if device.startswith('cuda'):
+            return parameters * 2  # float16
+        return parameters * CPU_LOAD_MODES[self._cpu_mode][0]
+
+    def _check_cpu_memory(self, model_id: str, parameters: Optional[int]) -> Optional[int]:
+        """
+        Refuse CPU loads that would not fit in available RAM.
+
+        Returns:
+            Estimated resident size of the loaded model in bytes (None if unknown)
+
+        Raises:
+            MemoryError: If the load is expected to exceed available memory
+        """
+        if parameters is None:
+            return None
+
+        loaded_bytes_per_param, peak_bytes_per_param = CPU_LOAD_MODES[self._cpu_mode]
+        required = parameters * peak_bytes_per_param
+        available = available_memory_bytes()
+        logger.info(f"Gemma model {model_id}: {parameters / 1e9:.2f}B parameters, {self._cpu_mode} load needs "
+                    f"~{required / 1024 ** 3:.1f} GB, available {available / 1024 ** 3 if available else -1:.1f} GB")
+
+        if available is not None and required > available:
+            raise MemoryError(
+                f"Loading {model_id} in {self._cpu_mode} needs ~{required / 1024 ** 3:.1f} GB, "
+                f"only {available / 1024 ** 3:.1f} GB available"
+            )
+        return parameters * loaded_bytes_per_param
+
+    def _load_on_cpu(self, model_id: str, parameters: Optional[int]) -> Tuple[Any, Optional[int]]:
+        """Load a model on CPU using the configured mode (float32, bfloat16 or dynamic int8)."""
+        size_bytes = self._check_cpu_memory(model_id, parameters)
+
+        model = AutoModelForCausalLM.from_pretrained(
+            model_id,
+            device_map=None,
+            torch_dtype=torch.bfloat16 if self._cpu_mode == 'bfloat16' else torch.float32
+        )
+        model.to('cpu')
+
+        if self._cpu_mode == 'int8':
+            logger.info(f"Applying dynamic int8 quantization to {model_id}")
+            model = quantize_int8(model)
+
+        return model, size_bytes
+
+    def _load_lock(self, model_id: str) -> threading.Lock:
+        with self._state_lock:
+            return self._load_locks.setdefault(model_id, threading.Lock())
+
+    def _reserve(self, model_id: str, size_bytes: int) -> None:
+        """
+        Make room for a model about to be loaded by evicting idle models, and count its
+        estimated size against the budget until the load finishes.
+
+        Raises:
+            MemoryError: If the models in use leave no room for it within the memory budget
+        """
+        with self._state_lock:
+            self._reserved[model_id] = size_bytes
+            self._evict_idle()
+            used = self._memory_used()
+            if self._memory_budget > 0 and used > self._memory_budget:
+                del self._reserved[model_id]
+                in_use = [name for name, entry in self._entries.items() if entry.refcount > 0]
+                raise MemoryError(
+                    f"Loading {model_id} needs ~{size_bytes / 1024 ** 2:.0f} MB, but models in use "
+                    f"({', '.join(in_use) or 'none'}) leave {max(0, self._memory_budget - used + size_bytes) / 1024 ** 2:.0f} MB "
+                    f"of the {self._memory_budget / 1024 ** 2:.0f} MB budget"
+                )
 
-            if self._device.startswith('cuda'):
+    def load_model(self, model_id: str = "google/gemma-2b-it") -> bool:
+        """
+        Load a model unless it is already cached.
+
+        Idle models are evicted before the weights are loaded so the new one fits the budget.
+
+        Raises:
+            MemoryError: If the model would not fit in the memory budget or in available RAM
+        """
+        # Loads of different models run in parallel; loads of the same model happen once
+        with self._load_lock(model_id):
+            with self._state_lock:
+                if model_id in self._entries:
+                    self._entries.move_to_end(model_id)
+                    logger.info(f"Gemma model {model_id} already loaded, reusing")
+                    return True
+
+            device = self._device
+            parameters = estimate_parameter_count(model_id)
+            estimated_size = self._estimated_size(parameters, device)
+            if estimated_size is not None:
+                self._reserve(model_id, estimated_size)
+
+            if device.startswith('cuda'):
                 torch.cuda.empty_cache()
                 torch.cuda.synchronize()
                 initial_allocated = torch.cuda.memory_allocated()
@@ -133,40 +304,32 @@ class GemmaModelCache:
             start_time = time.time()
 
             try:
-                self._tokenizer = AutoTokenizer.from_pretrained(model_id)
-
-                if self._device.startswith("cuda"):
-                    torch_dtype = torch.float16
-                else:
-                    torch_dtype = torch.float32
+                tokenizer = AutoTokenizer.from_pretrained(model_id)
 
+                size_bytes = None
                 try:
-                    self._model = AutoModelForCausalLM.from_pretrained(
-                        model_id,
-                        device_map=None,
-                        torch_dtype=torch_dtype
-                    )
-                    self._model.to(self._device)
+                    if device.startswith("cuda"):
+                        model = AutoModelForCausalLM.from_pretrained(
+                            model_id,
+                            device_map=None,
+                            torch_dtype=torch.float16
+                        )
+                        model.to(device)
+                    else:
+                        model, size_bytes = self._load_on_cpu(model_id, parameters)
                 except RuntimeError as mem_error:
-                    if 'CUDA out of memory' in str(mem_error) and self._device.startswith('cuda'):
+                    if 'CUDA out of memory' in str(mem_error) and device.startswith('cuda'):
                         logger.warning(f"CUDA out of memory when loading Gemma model {model_id}")
                         torch.cuda.empty_cache()
                         torch.cuda.synchronize()
 
                         logger.warning(f"Falling back to CPU for Gemma model {model_id}")
-                        self._model = AutoModelForCausalLM.from_pretrained(
-                            model_id,
-                            device_map=None,
-                            torch_dtype=torch.float32
-                        )
-                        self._model.to('cpu')
-                        self._device = 'cpu'  # Update device to reflect fallback
+                        model, size_bytes = self._load_on_cpu(model_id, parameters)
+                        device = 'cpu'  # Reflect the fallback for this model only
                     else:
                         raise
 
-                self._model_id = model_id
-
-                if self._device.startswith('cuda'):
+                if device.startswith('cuda'):
                     final_allocated = torch.cuda.memory_allocated()
                     final_reserved = torch.cuda.memory_reserved()
                     allocated_diff = (final_allocated - initial_allocated) / 1024 ** 2
@@ -176,28 +339,106 @@ class GemmaModelCache:
                             allocated_diff, reserved_diff)
                     )
 
-                logger.info(f"Gemma model loaded successfully on {self._device}")
+                entry = _GemmaEntry(model, tokenizer, device, size_bytes)
+                with self._state_lock:
+                    self._reserved.pop(model_id, None)
+                    self._entries[model_id] = entry
+                    # Only needed when the size could not be estimated up front (or was off)
+                    self._evict_idle(keep=model_id)
+
+                logger.info(f"Gemma model {model_id} loaded successfully on {device} "
+                            f"({entry.size_bytes / 1024 ** 2:.0f} MB)")
                 return True
 
+            except MemoryError as e:
+                logger.error(f"Refusing to load Gemma model {model_id}: {e}")
+                raise
+
             except Exception as e:
                 logger.exception(f"Error loading Gemma model {model_id}: {str(e)}")
                 # Clean up GPU memory after failure
-                if self._device.startswith('cuda'):
+                if device.startswith('cuda'):
                     torch.cuda.empty_cache()
                     torch.cuda.synchronize()
-
-                self._model = None
-                self._tokenizer = None
-                self._model_id = None
                 return False
 
             finally:
+                with self._state_lock:
+                    self._reserved.pop(model_id, None)
                 load_time = time.time() - start_time
                 logger.info(f"Gemma model loading time: {load_time:.2f} seconds")
 
-    def get_model_and_tokenizer(self, model_id: str = "google/gemma-2b-it") -> Tuple[Optional[Any], Optional[Any]]:
-        if not self._model or not self._tokenizer or self._model_id != model_id:
-            success = self.load_model(model_id)
-            if not success:
+    def _memory_used(self) -> int:
+        """Size of the loaded models plus the estimates of those being loaded. Caller holds _state_lock."""
+        return sum(entry.size_bytes for entry in self._entries.values()) + sum(self._reserved.values())
+
+    def _over_budget(self) -> bool:
+        if len(self._entries) + len(self._reserved) > self._max_models:
+            return True
+        if self._memory_budget > 0:
+            return self._memory_used() > self._memory_budget
+        return False
+
+    def _evict_idle(self, keep: Optional[str] = None) -> None:
+        """Evict least recently used models nobody is using until within budget. Caller holds _state_lock."""
+        evicted_cuda = False
+        for model_id in list(self._entries):
+            if not self._over_budget():
+                break
+            entry = self._entries[model_id]
+            if model_id == keep or entry.refcount > 0:
+                continue
+            logger.info(f"Evicting Gemma model {model_id} ({entry.size_bytes / 1024 ** 2:.0f} MB)")
+            evicted_cuda = evicted_cuda or entry.device.startswith('cuda')
+            del self._entries[model_id]
+
+        if self._over_budget():
+            logger.warning("Gemma model cache is over budget; models in use will be evicted once released")
+        if evicted_cuda:
+            torch.cuda.empty_cache()
+
+    def acquire(self, model_id: str = "google/gemma-2b-it") -> Tuple[Optional[Any], Optional[Any]]:
+        """
+        Load (if needed) and pin a model so it cannot be evicted until release() is called.
+        Returns (None, None) if loading fails; nothing is pinned in that case.
+
+        Raises:
+            MemoryError: If the model does not fit next to the models in use
+        """
+        while True:
+            with self._state_lock:
+                entry = self._entries.get(model_id)
+                if entry is not None:
+                    entry.refcount += 1
+                    self._entries.move_to_end(model_id)
+                    return entry.model, entry.tokenizer
+
+            if not self.load_model(model_id):
                 return None, None
-        return self._model, self._tokenizer
+
+    def release(self, model_id: str) -> None:
+        with self._state_lock:
+            entry = self._entries.get(model_id)
+            if entry is None:
+                return
+            entry.refcount = max(0, entry.refcount - 1)
+            if entry.refcount == 0:
+                self._evict_idle()
+
+    @contextmanager
+    def use(self, model_id: str = "google/gemma-2b-it"):
+        """Context manager yielding a pinned (model, tokenizer) pair."""
+        model, tokenizer = self.acquire(model_id)
+        if not model or not tokenizer:
+            raise RuntimeError("Failed to load Gemma2 model")
+        try:
+            yield model, tokenizer
+        finally:
+            self.release(model_id)
+
+    def get_model_and_tokenizer(self, model_id: str = "google/gemma-2b-it") -> Tuple[Optional[Any], Optional[Any]]:
+        """Unpinned lookup; prefer use()/acquire() when the model is used beyond this call."""
+        model, tokenizer = self.acquire(model_id)
+        if model is not None:
+            self.release(model_id)
+        return model, tokenizer
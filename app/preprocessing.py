@@ -35,16 +35,8 @@ class PreprocessingService:
             RuntimeError: If audio preprocessing fails.
         """
         try:
-            logger.info(f"Starting audio processing: {file_path}")
-
-            audio, sr = PreprocessingService._load_audio(file_path)
-
-            audio = PreprocessingService._apply_processing_pipeline(audio)
-
-            max_val = np.max(np.abs(audio))
-            if max_val > 1.0:
-                logger.info(f"Audio amplitude is too high (max {max_val:.2f}); normalizing.")
-                audio = audio / max_val
+            audio = PreprocessingService.process_audio(file_path)
+            sr = config.get('sample_rate', 16000)
 
             output_path = Path(file_path).with_suffix('').as_posix() + '_preprocessed.wav'
             sf.write(output_path, audio, sr)
@@ -56,6 +48,45 @@ class PreprocessingService:
             logger.error(traceback.format_exc())
             raise RuntimeError(f"Audio preprocessing failed: {e}")
 
+    @staticmethod
+    def process_audio(file_path: str) -> np.ndarray:
+        """
+        Loads an audio file and runs the configured processing pipeline in memory.
+
+        Args:
+            file_path: Path to the audio file to process.
+
+        Returns:
+            np.ndarray: The processed float32 signal at the configured sample rate.
+        """
+        logger.info(f"Starting audio processing: {file_path}")
+
+        audio, _ = PreprocessingService._load_audio(file_path)
+
+        return PreprocessingService.process_array(audio)
+
+    @staticmethod
+    def process_array(audio: np.ndarray, trim_silence: bool = True) -> np.ndarray:
+        """
+        Runs the configured processing pipeline on an already decoded signal.
+
+        Args:
+            audio: The audio signal at the configured sample rate.
+            trim_silence: Whether silence trimming may run; disable it when timings must be
+                kept, e.g. for channels of one recording that are transcribed separately.
+
+        Returns:
+            np.ndarray: The processed float32 signal.
+        """
+        audio = PreprocessingService._apply_processing_pipeline(audio, trim_silence)
+
+        max_val = np.max(np.abs(audio))
+        if max_val > 1.0:
+            logger.info(f"Audio amplitude is too high (max {max_val:.2f}); normalizing.")
+            audio = audio / max_val
+
+        return audio.astype(np.float32, copy=False)
+
     @staticmethod
     @lru_cache(maxsize=8)
     def _load_audio(file_path: str) -> Tuple[np.ndarray, int]:
@@ -73,14 +104,14 @@ class PreprocessingService:
         return librosa.load(file_path, sr=target_sr, mono=True)
 
     @staticmethod
-    def _apply_processing_pipeline(audio: np.ndarray) -> np.ndarray:
+    def _apply_processing_pipeline(audio: np.ndarray, trim_silence: bool = True) -> np.ndarray:
         """
         Applies a series of processing steps based on the configuration:
         silence trimming, DC offset removal, normalization, pre-emphasis, noise reduction,
         and dynamic range compression.
         """
         # Trim silence first
-        if config.get('enable_trim_silence', True):
+        if trim_silence and config.get('enable_trim_silence', True):
             trim_db = config.get('trim_db', 60)
             logger.info(f"Trimming silence with top_db = {trim_db}")
             
@@ -149,6 +180,10 @@ class PreprocessingService:
         Applies spectral gating for noise reduction using STFT.
         Uses a soft mask with Gaussian smoothing.
 
+        This STFT is not shared with SpectralFeatures: the gate is applied to the complex
+        spectrum and resynthesized with an inverse STFT, while the shared features keep only
+        magnitudes and are computed from the cleaned audio afterwards.
+
         Args:
             audio: The audio signal.
 
@@ -164,8 +199,7 @@ class PreprocessingService:
         D = librosa.stft(audio, n_fft=frame_length, hop_length=hop_length)
         D_mag = np.abs(D)
 
-        noise_frames = min(10, D_mag.shape[1])
-        noise_estimate = np.mean(D_mag[:, :noise_frames], axis=1, keepdims=True)
+        noise_estimate = PreprocessingService._estimate_noise_floor(D_mag, hop_length)
 
         mask = (D_mag > noise_threshold * noise_estimate).astype(float)
         smoothed_mask = ndimage.gaussian_filter(mask, sigma=2)
@@ -175,7 +209,52 @@ class PreprocessingService:
         return audio_clean
 
     @staticmethod
-    def detect_silence(audio: np.ndarray, threshold: Optional[float] = None) -> bool:
+    def _estimate_noise_floor(D_mag: np.ndarray, hop_length: int) -> np.ndarray:
+        """
+        Estimates a time-varying noise floor for every STFT bin in one vectorized pass.
+
+        Combines a global profile averaged over the quietest frames (picked by frame
+        energy) with minimum statistics tracked over a sliding window, so the estimate
+        follows slowly changing background noise without relying on leading silence.
+
+        Args:
+            D_mag: STFT magnitude of shape (n_bins, n_frames).
+            hop_length: Hop length used for the STFT, in samples.
+
+        Returns:
+            np.ndarray: Noise floor broadcastable against D_mag.
+        """
+        sample_rate = config.get('sample_rate', 16000)
+        percentile = config.get('noise_floor_percentile', 10.0)
+        window_sec = config.get('noise_floor_window_sec', 1.5)
+        bias = config.get('noise_floor_bias', 1.5)
+
+        n_frames = D_mag.shape[1]
+        if n_frames == 0:
+            return np.zeros((D_mag.shape[0], 1), dtype=D_mag.dtype)
+
+        # Global profile from the low-energy frames, wherever they are in the signal
+        frame_energy = np.mean(D_mag, axis=0)
+        quiet_frames = frame_energy <= np.percentile(frame_energy, percentile)
+        global_floor = np.mean(D_mag[:, quiet_frames], axis=1, keepdims=True)
+
+        # Minimum statistics: smooth over a few frames, then track the running minimum.
+        # The minimum is biased low, so compensate before comparing with the global floor.
+        window = int(np.clip(round(window_sec * sample_rate / hop_length), 1, n_frames))
+        smoothed = ndimage.uniform_filter1d(D_mag, size=min(3, n_frames), axis=1, mode='nearest')
+        local_floor = ndimage.minimum_filter1d(smoothed, size=window, axis=1, mode='nearest')
+
+        noise_floor = np.maximum(local_floor * bias, global_floor)
+        logger.info(f"Noise floor estimated from {int(np.sum(quiet_frames))}/{n_frames} quiet frames "
+                    f"(percentile={percentile}, window={window} frames)")
+        return noise_floor
+
+    @staticmethod
+    def detect_silence(
+            audio: np.ndarray,
+            threshold: Optional[float] = None,
+            frame_energy: Optional[np.ndarray] = None
+    ) -> bool:
         """
         Determines whether the audio is silent by evaluating its RMS amplitude and energy distribution.
         Uses a more lenient approach that considers both overall RMS and local energy peaks.
@@ -183,6 +262,9 @@ class PreprocessingService:
         Args:
             audio: The audio signal (numpy array).
             threshold: Optional threshold. If None, uses the configured value.
+            frame_energy: Precomputed per-frame energies of the audio (SpectralFeatures.silence_energy);
+                computed with a local STFT when omitted, which only happens without shared
+                features (stereo channels or TRANSCRIPTION_SHARED_FEATURES off).
 
         Returns:
             bool: True if the audio is considered silent, False otherwise.
@@ -202,11 +284,14 @@ class PreprocessingService:
         energy_above_threshold = np.mean(energy > threshold)
         
         # Calculate local energy peaks
-        frame_length = 2048  # About 128ms at 16kHz
-        hop_length = 512
-        D = librosa.stft(audio, n_fft=frame_length, hop_length=hop_length)
-        D_mag = np.abs(D)
-        local_energy = np.mean(D_mag, axis=0)
+        if frame_energy is not None and len(frame_energy):
+            local_energy = frame_energy
+        else:
+            frame_length = 2048  # About 128ms at 16kHz
+            hop_length = 512
+            D = librosa.stft(audio, n_fft=frame_length, hop_length=hop_length)
+            D_mag = np.abs(D)
+            local_energy = np.mean(D_mag, axis=0)
         peak_energy = np.max(local_energy)
         
         # Log detailed audio statistics
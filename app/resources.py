@@ -0,0 +1,194 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from logging import getLogger
+from typing import Any, Iterator, NamedTuple, Optional
+
+from app.config import AudioConfig, ResourceConfig
+
+logger = getLogger(__name__)
+
+# Thread-count variables read by the BLAS/OpenMP runtimes behind NumPy, SciPy and librosa
+BLAS_ENV_VARS = (
+    'OMP_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+)
+
+# Seconds between cancellation checks while waiting for an inference slot
+SLOT_POLL_INTERVAL = 0.5
+
+
+class ThreadPlan(NamedTuple):
+    cores: int
+    inference_slots: int
+    torch_threads: int
+    interop_threads: int
+    blas_threads: int
+    decode_workers: int
+
+
+def available_cores() -> int:
+    """Cores the process may run on: its CPU affinity, capped by a cgroup v2 CPU quota."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cores = os.cpu_count() or 1
+
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cores = min(cores, max(1, math.floor(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cores)
+
+
+def plan_threads(
+        cores: int,
+        inference_slots: int = 1,
+        decode_workers: int = 0,
+        torch_threads: int = 0,
+        interop_threads: int = 0,
+        blas_threads: int = 0
+) -> ThreadPlan:
+    """
+    Split cores between concurrent inference slots.
+
+    Each audio decode worker process keeps one core for itself; the remaining cores are
+    divided evenly among the slots, so slots x torch threads never exceeds them. NumPy/librosa
+    work runs on the same request threads as inference and gets the same share. Explicit
+    (non-zero) counts override the derived ones.
+    """
+    cores = max(1, cores)
+    slots = max(1, inference_slots)
+    compute_cores = max(1, cores - max(0, decode_workers))
+    share = max(1, compute_cores // slots)
+
+    return ThreadPlan(
+        cores=cores,
+        inference_slots=slots,
+        torch_threads=torch_threads or share,
+        # Whisper decoding has little inter-op parallelism; more threads only add contention
+        interop_threads=interop_threads or 1,
+        blas_threads=blas_threads or share,
+        decode_workers=max(0, decode_workers),
+    )
+
+
+def limit_process_threads(threads: int) -> None:
+    """
+    Limit the BLAS/OpenMP and torch threads of the current process.
+
+    The environment variables only reach runtimes loaded afterwards (and child processes);
+    threadpoolctl, when installed, also resizes pools that are already running.
+    """
+    for name in BLAS_ENV_VARS:
+        os.environ[name] = str(threads)
+
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads)
+    except ImportError:
+        pass
+
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+class ResourceManager:
+    """
+    Per-worker CPU budget: thread counts for torch and the BLAS runtimes, and a fixed number of
+    inference slots so concurrent requests share the cores instead of oversubscribing them.
+
+    apply() is called from the gunicorn post_fork hook, before the worker loads the app or
+    runs any inference, and again from create_app for servers without that hook; it only
+    acts once.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._init()
+        return cls._instance
+
+    def _init(self) -> None:
+        config = ResourceConfig()
+        self.plan = plan_threads(
+            config.get('cpu_cores', 0) or available_cores(),
+            config.get('inference_slots', 1),
+            AudioConfig().get('decode_workers', 0),
+            config.get('torch_threads', 0),
+            config.get('interop_threads', 0),
+            config.get('blas_threads', 0),
+        )
+        self._slots = threading.BoundedSemaphore(self.plan.inference_slots)
+        self._applied = False
+
+    def apply(self) -> ThreadPlan:
+        """Set the thread counts of this process according to the plan."""
+        with self._lock:
+            if self._applied:
+                return self.plan
+            self._applied = True
+
+        plan = self.plan
+        limit_process_threads(plan.blas_threads)
+
+        try:
+            import torch
+            torch.set_num_threads(plan.torch_threads)
+            try:
+                torch.set_num_interop_threads(plan.interop_threads)
+            except RuntimeError as e:
+                # Only possible before the first parallel torch operation of the process
+                logger.warning(f"Could not set torch interop threads: {e}")
+        except ImportError:
+            pass
+
+        logger.info(f"Thread plan: {plan.cores} cores, {plan.inference_slots} inference slots x "
+                    f"{plan.torch_threads} torch threads, {plan.interop_threads} interop threads, "
+                    f"{plan.blas_threads} BLAS threads, {plan.decode_workers} decode workers")
+        return plan
+
+    @contextmanager
+    def inference_slot(self, timeout: Optional[float] = None, cancel_token: Any = None) -> Iterator[bool]:
+        """
+        Hold one of the inference slots while running a model.
+
+        The wait is checked against the cancellation token every SLOT_POLL_INTERVAL seconds;
+        the context yields False, without holding a slot, if the token fires first.
+
+        Raises:
+            TimeoutError: If no slot frees up within the timeout
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            wait = SLOT_POLL_INTERVAL if cancel_token is not None else None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+                wait = remaining if wait is None else min(wait, remaining)
+            if self._slots.acquire(timeout=wait):
+                break
+            if cancel_token is not None and cancel_token.cancelled():
+                yield False
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError("No inference slot available")
+
+        try:
+            yield True
+        finally:
+            self._slots.release()
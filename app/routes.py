@@ -1,22 +1,33 @@
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, Response, request, jsonify, render_template, stream_with_context, url_for
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
 import os
+import json
+from contextlib import ExitStack
 import logging
 import traceback
 import time
+import uuid
+from urllib.parse import urlparse
 from flask import current_app
 
-from app.exceptions import SilenceError
+from app.config import DownloadConfig, ReconstructionConfig
+from app.cancellation import CancellationToken
+from app.downloads import DownloadService
+from app.exceptions import AdmissionError, ModelLoadError, SilenceError
+from app.jobs import JobRunner
 from app.keywords import KeyWordsService
+from app.cache import ResultCache
+from app.limiter import AdmissionController
 from app.models import ModelCache, GemmaModelCache
+from app.resources import ResourceManager
 from app.middleware import api_key_required, check_ui_enabled, version_header
-from app.text_reconstruction import TextReconstructionService
-from app.transcription import TranscriptionService
+from app.singleflight import SingleFlight, file_digest
+from app.text_reconstruction import ASSIST_MODES, ReconstructionBatcher, TextReconstructionService, draft_model
+from app.transcription import AutoLanguage, TranscriptionService
 from app.tts import tts_service
 from app.utils import allowed_file
-from urllib.parse import urlparse
-import uuid
+from app.webhooks import WebhookDispatcher
 import requests
 
 logger = logging.getLogger(__name__)
@@ -24,6 +35,55 @@ routes = Blueprint('routes', __name__)
 
 model_cache = ModelCache()
 gemma_model_cache = GemmaModelCache()
+reconstruction_batcher = ReconstructionBatcher()
+admission_controller = AdmissionController()
+transcription_flights = SingleFlight()
+job_runner = JobRunner()
+webhook_dispatcher = WebhookDispatcher()
+
+
+def _keyword_spotter(keywords, languages, confidence_threshold, enabled):
+    """Return the keyword spots dict and a per-segment callback filling it (None when disabled)."""
+    if not (keywords and enabled):
+        return {}, None
+
+    keyword_spots = KeyWordsService.init_keyword_spots(keywords, languages)
+
+    def on_segment(language, segment_result):
+        # With automatic language identification the languages are only known per segment
+        if language not in keyword_spots:
+            keyword_spots.update(KeyWordsService.init_keyword_spots(keywords, [language]))
+        KeyWordsService.spot_segment(segment_result, keywords, keyword_spots[language], confidence_threshold)
+
+    return keyword_spots, on_segment
+
+
+def _admission_error_response(error):
+    """JSON response for a rejected request, with Retry-After when the client may try again."""
+    logger.warning(f"Request rejected: {error.message}")
+    response = jsonify(error.to_dict())
+    if error.retry_after:
+        response.headers['Retry-After'] = str(error.retry_after)
+    return response, error.http_status
+
+
+def _split_auto_language(languages):
+    """
+    Detect the 'auto' entry in a language list.
+
+    Returns:
+        (languages without 'auto', whether automatic identification was requested); with 'auto'
+        the remaining languages are the candidates to choose from
+    """
+    languages = [language.strip() for language in languages if language.strip()]
+    remaining = [language for language in languages if language.lower() != 'auto']
+    auto_language = len(remaining) != len(languages)
+
+    if auto_language:
+        unknown = [language for language in remaining if AutoLanguage.language_code(language) is None]
+        if unknown:
+            raise BadRequest(f"Unknown languages for automatic detection: {', '.join(unknown)}")
+    return remaining, auto_language
 
 
 @routes.route('/')
@@ -58,6 +118,9 @@ def preload_model():
 def transcribe():
     logger.info(f"Transcription request received")
     try:
+        # Deadline (X-Request-Timeout / timeout field) and client disconnect checks
+        cancel_token = CancellationToken.from_request(request.form)
+
         if 'file' not in request.files:
             logger.error("No file part in request")
             raise BadRequest("No file uploaded")
@@ -72,7 +135,8 @@ def transcribe():
             logger.error("File extension not allowed")
             raise BadRequest("Invalid file type")
 
-        filename = secure_filename(file.filename)
+        # Unique name: concurrent uploads of the same file must not overwrite each other
+        filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
         file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
         logger.info(f"Saving file to: {file_path}")
 
@@ -85,8 +149,7 @@ def transcribe():
         file_size = os.path.getsize(file_path)
         logger.info(f"File size: {file_size} bytes")
 
-        languages = request.form.get('lang', 'Ukrainian,Russian').split(',')
-        model_type = request.form.get('model', 'base')
+        languages, auto_language = _split_auto_language(request.form.get('lang', 'Ukrainian,Russian').split(','))
         keywords = request.form.get('keywords', '').split(',') if request.form.get('keywords') else []
         # Fallback to configured tokens when keywords not provided
         if not keywords:
@@ -95,65 +158,32 @@ def transcribe():
                 keywords = TranscriptionConfig().get('focus_tokens', []) or []
             except Exception:
                 pass
-        # Control whether to run keyword spotting (default true)
-        detect_keywords = request.form.get('detect_keywords', 'true').lower() in ['1', 'true', 't', 'yes', 'y']
 
-        focus_tokens = []
-
-        if not focus_tokens and keywords:
-            focus_tokens = list(keywords)
-        confidence_threshold = int(request.form.get('confidence_threshold', 80))
-        pre_process_file = request.form.get('pre_process_file', 'false').lower() == 'true'
-
-        if model_type not in model_cache._models:
-            model_cache.load_model(model_type)
-
-        logger.info(f"Transcription parameters: "
-                    f"languages={languages}, "
-                    f"model={model_type}, "
-                    f"keywords={keywords}, "
-                    f"detect_keywords={detect_keywords}, "
-                    f"confidence_threshold={confidence_threshold}, "
-                    f"pre_process_file={pre_process_file}")
-
-        start_time = time.time()
-        model = model_cache.get_model(model_type)
-
-        if not model:
-            logger.error(f"Failed to load {model_type} model")
-            raise RuntimeError(f"Failed to load {model_type} model")
-
-        logger.info("Starting audio transcription")
-
-        transcription_result = TranscriptionService.transcribe_audio(
-            file_path,
-            model,
-            languages,
-            keywords,
-            keywords,  # use keywords as bias tokens
-            pre_process_file
-        )
+        options = {
+            'languages': languages,
+            'auto_language': auto_language,
+            'model_type': request.form.get('model', 'base'),
+            'keywords': keywords,
+            # Control whether to run keyword spotting (default true)
+            'detect_keywords': request.form.get('detect_keywords', 'true').lower() in ['1', 'true', 't', 'yes', 'y'],
+            'focus_tokens': list(keywords),  # use keywords as bias tokens
+            'confidence_threshold': int(request.form.get('confidence_threshold', 80)),
+            'pre_process_file': request.form.get('pre_process_file', 'false').lower() == 'true',
+            # Stereo call recordings: transcribe each channel as its own speaker
+            'split_channels': request.form.get('split_channels', 'false').lower() in ['1', 'true', 't', 'yes', 'y'],
+            'channel_labels': [label for label in request.form.get('channel_labels', '').split(',') if label.strip()],
+        }
+
+        transcription_result = _transcribe_file(file_path, options, cancel_token)
 
         if transcription_result.get('error') is not None:
             return jsonify(transcription_result), 400
 
-        keyword_spots = {}
-        if keywords and detect_keywords:
-            keyword_spots = KeyWordsService.spot_keywords(
-                transcription_results=transcription_result["segments"],
-                keywords=keywords,
-                languages=languages,
-                confidence_threshold=confidence_threshold
-            )
-
-        transcription_result["keyword_spots"] = keyword_spots
-
-        end_time = time.time()
-        transcription_result['processing_time'] = round(end_time - start_time, 2)
-
         logger.info(f"Transcription completed in {transcription_result['processing_time']} seconds")
         return jsonify(transcription_result)
 
+    except AdmissionError as e:
+        return _admission_error_response(e)
     except SilenceError as e:
         logger.error(f"Silence error: {e}")
         return jsonify({"error": e.message, "code": e.code}), 400
@@ -175,11 +205,236 @@ def transcribe():
             logger.error(f"Error removing file: {cleanup_error}")
 
 
+def _parse_pull_options(data):
+    """Parse the transcription options shared by /pull and /pull/batch."""
+    # Get optional parameters with defaults
+    languages = data.get('languages', ['Ukrainian', 'Russian'])
+    if isinstance(languages, str):
+        languages = languages.split(',')
+    languages, auto_language = _split_auto_language(languages)
+
+    model_type = data.get('model', 'base')
+    keywords = data.get('keywords', [])
+    if isinstance(keywords, str):
+        keywords = keywords.split(',') if keywords else []
+    if not keywords:
+        try:
+            from app.config import TranscriptionConfig
+            keywords = TranscriptionConfig().get('focus_tokens', []) or []
+        except Exception:
+            pass
+    # Control keyword spotting with default True; accept bool or string
+    detect_keywords = data.get('detect_keywords', True)
+    if isinstance(detect_keywords, str):
+        detect_keywords = detect_keywords.lower() in ['1', 'true', 't', 'yes', 'y']
+
+    # Prepare optional focus tokens (used for biasing the model prompt);
+    # if not provided, we fallback to provided keywords for biasing.
+    focus_tokens = data.get('focus_tokens', [])
+    if isinstance(focus_tokens, str):
+        focus_tokens = [t.strip() for t in focus_tokens.split(',') if t.strip()]
+    if not focus_tokens and keywords:
+        focus_tokens = list(keywords)
+
+    pre_process_file = data.get('pre_process_file', False)
+    if isinstance(pre_process_file, str):
+        pre_process_file = pre_process_file.lower() in ['1', 'true', 't', 'yes', 'y']
+
+    split_channels = data.get('split_channels', False)
+    if isinstance(split_channels, str):
+        split_channels = split_channels.lower() in ['1', 'true', 't', 'yes', 'y']
+    channel_labels = data.get('channel_labels', [])
+    if isinstance(channel_labels, str):
+        channel_labels = [label for label in channel_labels.split(',') if label.strip()]
+
+    return {
+        'languages': languages,
+        'auto_language': auto_language,
+        'model_type': model_type,
+        'keywords': keywords,
+        'detect_keywords': detect_keywords,
+        'focus_tokens': focus_tokens,
+        'confidence_threshold': int(data.get('confidence_threshold', 80)),
+        'pre_process_file': pre_process_file,
+        'split_channels': bool(split_channels),
+        'channel_labels': channel_labels,
+    }
+
+
+def _validate_downloaded_file(file_path):
+    """Check a downloaded file is present, non-empty and of an allowed type."""
+    if not os.path.exists(file_path):
+        raise RuntimeError("File was not saved correctly")
+
+    file_size = os.path.getsize(file_path)
+    logger.info(f"File size: {file_size} bytes")
+
+    if file_size == 0:
+        raise BadRequest("Downloaded file is empty")
+
+    if not allowed_file(os.path.basename(file_path), allowed_extensions=current_app.config['ALLOWED_EXTENSIONS']):
+        logger.error("File extension not allowed")
+        raise BadRequest("Invalid file type, only MP3 files are supported")
+
+
+def _run_transcription(file_path, options, cancel_token=None):
+    """Admit, decode and transcribe a file, spotting keywords on the way."""
+    # Rejected requests are turned away before any decoding
+    with admission_controller.admit(file_path, options['model_type']):
+        return _transcribe_admitted(file_path, options, cancel_token)
+
+
+def _transcribe_admitted(file_path, options, cancel_token=None, on_segment=None, completed_segments=None):
+    """
+    Decode and transcribe an admitted file, spotting keywords on the way.
+
+    on_segment is called with every finished segment after keyword spotting; completed_segments
+    are the results of an interrupted run of the same job, which are not decoded again.
+    """
+    languages = options['languages']
+    model_type = options['model_type']
+    keywords = options['keywords']
+    pre_process_file = options['pre_process_file']
+
+    # Start decoding/preprocessing while the model is being loaded
+    audio_future = TranscriptionService.prefetch_audio(file_path, pre_process_file, options['split_channels'])
+
+    if model_type not in model_cache._models:
+        model_cache.load_model(model_type)
+
+    logger.info(f"Transcription parameters: "
+                f"languages={languages}, "
+                f"auto_language={options['auto_language']}, "
+                f"model={model_type}, "
+                f"keywords={keywords}, "
+                f"detect_keywords={options['detect_keywords']}, "
+                f"confidence_threshold={options['confidence_threshold']}, "
+                f"pre_process_file={pre_process_file}, "
+                f"split_channels={options['split_channels']}"
+                )
+
+    start_time = time.time()
+    model = model_cache.get_model(model_type)
+
+    if not model:
+        logger.error(f"Failed to load {model_type} model")
+        raise ModelLoadError(f"Failed to load {model_type} model")
+
+    logger.info("Starting audio transcription")
+
+    # Keywords are spotted on each segment as soon as it is transcribed
+    keyword_spots, spot_segment = _keyword_spotter(
+        keywords, [] if options['auto_language'] else languages,
+        options['confidence_threshold'], options['detect_keywords']
+    )
+    if on_segment is None:
+        segment_callback = spot_segment
+    else:
+        def segment_callback(language, segment_result):
+            if spot_segment is not None:
+                spot_segment(language, segment_result)
+            on_segment(language, segment_result)
+
+    # Concurrent requests share the cores through a fixed number of inference slots
+    with ResourceManager().inference_slot(cancel_token=cancel_token) as acquired:
+        if not acquired:
+            logger.warning(f"Cancelled while waiting for an inference slot: {cancel_token.reason}")
+            return {"transcriptions": {}, "segments": {}, "keyword_spots": keyword_spots, "truncated": True,
+                    "truncation_reason": cancel_token.reason,
+                    "processing_time": round(time.time() - start_time, 2)}
+
+        transcription_result = TranscriptionService.transcribe_audio(
+            file_path,
+            model,
+            languages,
+            keywords,
+            options['focus_tokens'],  # use focus tokens (fallbacks to keywords)
+            pre_process_file,
+            audio_future,
+            segment_callback,
+            options['auto_language'],
+            cancel_token=cancel_token,
+            split_channels=options['split_channels'],
+            channel_labels=options['channel_labels'],
+            completed_segments=completed_segments
+        )
+
+    if transcription_result.get('error') is not None:
+        return transcription_result
+
+    transcription_result["keyword_spots"] = keyword_spots
+
+    end_time = time.time()
+    transcription_result['processing_time'] = round(end_time - start_time, 2)
+    return transcription_result
+
+
+def _run_job(file_path, options, on_segment, completed_segments):
+    """JobRunner handler: transcribe a queued job, recording each finished segment."""
+    transcription_result = _transcribe_admitted(
+        file_path, options, on_segment=on_segment, completed_segments=completed_segments
+    )
+    if transcription_result.get('error') is None and options.get('file_url'):
+        transcription_result['original_url'] = options['file_url']
+    return transcription_result
+
+
+def _transcribe_file(file_path, options, cancel_token=None):
+    """
+    Transcribe a file, sharing the work with an identical request already in progress.
+
+    Requests are identical when the audio content, the options and the caller match. A shared
+    result that was truncated by the other request's deadline is not reused.
+    """
+    start_time = time.time()
+    key = ResultCache.make_key(
+        audio=file_digest(file_path),
+        caller=AdmissionController.caller_key(),
+        **options
+    )
+    transcription_result, shared = transcription_flights.do(
+        key, lambda: _run_transcription(file_path, options, cancel_token), cancel_token
+    )
+
+    if shared:
+        if transcription_result is None:
+            # Our own deadline passed while waiting for the other request
+            return {"transcriptions": {}, "segments": {}, "keyword_spots": {}, "truncated": True,
+                    "truncation_reason": cancel_token.reason,
+                    "processing_time": round(time.time() - start_time, 2)}
+        if transcription_result.get('truncated'):
+            logger.info("Shared transcription was truncated, transcribing again")
+            return _run_transcription(file_path, options, cancel_token)
+        transcription_result['deduplicated'] = True
+    return transcription_result
+
+
+def _transcribe_pulled_file(file_path, file_url, options, cancel_token=None):
+    """Transcribe a downloaded file and build the /pull response body."""
+    logger.info(f"Transcribing file from {file_url}")
+    transcription_result = _transcribe_file(file_path, options, cancel_token)
+
+    if transcription_result.get('error') is None:
+        transcription_result['original_url'] = file_url
+        logger.info(f"Transcription completed in {transcription_result['processing_time']} seconds")
+    return transcription_result
+
+
+def _remove_file(file_path):
+    try:
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+            logger.info(f"Temporary file {file_path} removed")
+    except Exception as cleanup_error:
+        logger.error(f"Error removing file: {cleanup_error}")
+
+
 @routes.route('/pull', methods=['POST'])
 @api_key_required
 @version_header
 def transcribe_json():
     logger.info("JSON transcription request received")
+    file_path = None
     try:
         # Parse JSON data
         data = request.get_json()
@@ -194,130 +449,257 @@ def transcribe_json():
             logger.error("No file_url provided in JSON")
             raise BadRequest("Missing file_url parameter")
 
-        # Get optional parameters with defaults
-        languages = data.get('languages', ['Ukrainian', 'Russian'])
-        if isinstance(languages, str):
-            languages = languages.split(',')
+        options = _parse_pull_options(data)
+        cancel_token = CancellationToken.from_request(data)
 
-        model_type = data.get('model', 'base')
-        keywords = data.get('keywords', [])
-        if isinstance(keywords, str):
-            keywords = keywords.split(',') if keywords else []
-        if not keywords:
-            try:
-                from app.config import TranscriptionConfig
-                keywords = TranscriptionConfig().get('focus_tokens', []) or []
-            except Exception:
-                pass
-        # Control keyword spotting with default True; accept bool or string
-        detect_keywords = data.get('detect_keywords', True)
-        if isinstance(detect_keywords, str):
-            detect_keywords = detect_keywords.lower() in ['1', 'true', 't', 'yes', 'y']
-
-        # Prepare optional focus tokens (used for biasing the model prompt);
-        # if not provided, we fallback to provided keywords for biasing.
-        focus_tokens = data.get('focus_tokens', [])
-        if isinstance(focus_tokens, str):
-            focus_tokens = [t.strip() for t in focus_tokens.split(',') if t.strip()]
-        if not focus_tokens and keywords:
-            focus_tokens = list(keywords)
-
-        confidence_threshold = int(data.get('confidence_threshold', 80))
-        pre_process_file = data.get('pre_process_file', False)
-
-        # Download file from URL
-        logger.info(f"Attempting to download file from: {file_url}")
-
-        # Generate unique filename
-        parsed_url = urlparse(file_url)
-        path_parts = parsed_url.path.split('/')
-        original_filename = path_parts[-1] if path_parts[-1] else f"audio_{uuid.uuid4().hex}"
-
-        if not original_filename.lower().endswith('.mp3'):
-            original_filename += '.mp3'
-
-        filename = secure_filename(original_filename)
-        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+        callback_url = _parse_callback_url(data)
+        if callback_url and not job_runner.enabled:
+            raise BadRequest("callback_url requires background jobs (JOBS_ENABLED)")
 
-        # Download the file
-        response = requests.get(file_url, stream=True, timeout=30)
-        response.raise_for_status()  # Raise exception for 4XX/5XX responses
+        file_path = DownloadService.download(
+            file_url,
+            current_app.config['UPLOAD_FOLDER'],
+            max_bytes=current_app.config.get('MAX_CONTENT_LENGTH'),
+            allowed_extensions=current_app.config['ALLOWED_EXTENSIONS']
+        )
+        _validate_downloaded_file(file_path)
 
-        with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        if callback_url:
+            # Transcribed as a job and POSTed to the callback; the connection is released now
+            options['file_url'] = file_url
+            options['callback_url'] = callback_url
+            response = _queue_job(file_path, options)
+            file_path = None
+            return response
 
-        logger.info(f"File downloaded and saved to: {file_path}")
+        transcription_result = _transcribe_pulled_file(file_path, file_url, options, cancel_token)
 
-        if not os.path.exists(file_path):
-            raise RuntimeError("File was not saved correctly")
+        if transcription_result.get('error') is not None:
+            return jsonify(transcription_result), 400
 
-        file_size = os.path.getsize(file_path)
-        logger.info(f"File size: {file_size} bytes")
+        return jsonify(transcription_result)
 
-        if file_size == 0:
-            raise BadRequest("Downloaded file is empty")
+    except AdmissionError as e:
+        return _admission_error_response(e)
 
-        if not allowed_file(filename, allowed_extensions=current_app.config['ALLOWED_EXTENSIONS']):
-            logger.error("File extension not allowed")
-            os.remove(file_path)
-            raise BadRequest("Invalid file type, only MP3 files are supported")
+    except SilenceError as e:
+        logger.error(f"Silence error: {e}")
+        return jsonify({"error": e.message, "code": e.code}), 400
 
-        if model_type not in model_cache._models:
-            model_cache.load_model(model_type)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error downloading file: {e}")
+        return jsonify({"error": f"Error downloading file: {str(e)}"}), 400
 
-        logger.info(f"Transcription parameters: "
-                    f"languages={languages}, "
-                    f"model={model_type}, "
-                    f"keywords={keywords}, "
-                    f"detect_keywords={detect_keywords}, "
-                    f"confidence_threshold={confidence_threshold}, "
-                    f"file_url={file_url}, "
-                    f"pre_process_file={pre_process_file}"
-                    )
+    except RequestEntityTooLarge:
+        logger.error("File too large")
+        return jsonify({"error": "File too large. Max 50MB."}), 413
 
-        start_time = time.time()
-        model = model_cache.get_model(model_type)
+    except BadRequest as e:
+        logger.error(f"Bad request: {e}")
+        return jsonify({"error": str(e)}), 400
 
-        if not model:
-            logger.error(f"Failed to load {model_type} model")
-            raise RuntimeError(f"Failed to load {model_type} model")
+    except Exception as e:
+        logger.exception(f"Transcription error: {e}")
+        return jsonify({"error": str(e), "details": traceback.format_exc()}), 500
 
-        logger.info("Starting audio transcription")
+    finally:
+        _remove_file(file_path)
 
-        transcription_result = TranscriptionService.transcribe_audio(
-            file_path,
-            model,
-            languages,
-            keywords,
-            focus_tokens,  # use focus tokens (fallbacks to keywords)
-            pre_process_file
+
+@routes.route('/pull/batch', methods=['POST'])
+@api_key_required
+@version_header
+def transcribe_json_batch():
+    """
+    Batch variant of /pull: downloads all file_urls concurrently over pooled connections
+    and transcribes each file as soon as its download finishes.
+    Returns one result per URL, in request order.
+    """
+    logger.info("Batch JSON transcription request received")
+    try:
+        data = request.get_json()
+
+        if not data:
+            logger.error("No JSON data in request")
+            raise BadRequest("No JSON data provided")
+
+        file_urls = data.get('file_urls')
+        if not file_urls or not isinstance(file_urls, list):
+            logger.error("No file_urls list provided in JSON")
+            raise BadRequest("Missing file_urls parameter")
+
+        max_urls = DownloadConfig().get('batch_max_urls', 100)
+        if len(file_urls) > max_urls:
+            raise BadRequest(f"Too many file_urls, max {max_urls} per request")
+
+        options = _parse_pull_options(data)
+        cancel_token = CancellationToken.from_request(data)
+        start_time = time.time()
+        results = [None] * len(file_urls)
+
+        downloads = DownloadService.download_many(
+            file_urls,
+            current_app.config['UPLOAD_FOLDER'],
+            max_bytes=current_app.config.get('MAX_CONTENT_LENGTH'),
+            allowed_extensions=current_app.config['ALLOWED_EXTENSIONS']
         )
 
-        if transcription_result.get('error') is not None:
-            return jsonify(transcription_result), 400
+        for index, downloaded in downloads:
+            file_url = file_urls[index]
 
-        keyword_spots = {}
-        if keywords and detect_keywords:
-            keyword_spots = KeyWordsService.spot_keywords(
-                transcription_results=transcription_result["segments"],
-                keywords=keywords,
-                languages=languages,
-                confidence_threshold=confidence_threshold
-            )
+            if cancel_token.cancelled():
+                results[index] = {"file_url": file_url, "error": f"Skipped: {cancel_token.reason}"}
+                if not isinstance(downloaded, Exception):
+                    _remove_file(downloaded)
+                continue
 
-        transcription_result["keyword_spots"] = keyword_spots
+            if isinstance(downloaded, RequestEntityTooLarge):
+                results[index] = {"file_url": file_url, "error": "File too large. Max 50MB."}
+                continue
+            if isinstance(downloaded, Exception):
+                results[index] = {"file_url": file_url, "error": f"Error downloading file: {str(downloaded)}"}
+                continue
 
-        end_time = time.time()
-        transcription_result['processing_time'] = round(end_time - start_time, 2)
-        transcription_result['original_url'] = file_url
+            try:
+                _validate_downloaded_file(downloaded)
+                result = _transcribe_pulled_file(downloaded, file_url, options, cancel_token)
+                result["file_url"] = file_url
+                results[index] = result
+            except (SilenceError, AdmissionError) as e:
+                results[index] = {"file_url": file_url, "error": e.message, "code": e.code}
+            except BadRequest as e:
+                results[index] = {"file_url": file_url, "error": e.description}
+            except Exception as e:
+                logger.exception(f"Transcription error for {file_url}: {e}")
+                results[index] = {"file_url": file_url, "error": str(e)}
+            finally:
+                _remove_file(downloaded)
+
+        processing_time = round(time.time() - start_time, 2)
+        logger.info(f"Batch of {len(file_urls)} files completed in {processing_time} seconds")
+        response = {"results": results, "processing_time": processing_time}
+        if cancel_token.reason is not None:
+            response["truncated"] = True
+            response["truncation_reason"] = cancel_token.reason
+        return jsonify(response)
 
-        logger.info(f"Transcription completed in {transcription_result['processing_time']} seconds")
-        return jsonify(transcription_result)
+    except BadRequest as e:
+        logger.error(f"Bad request: {e}")
+        return jsonify({"error": str(e)}), 400
 
-    except SilenceError as e:
-        logger.error(f"Silence error: {e}")
-        return jsonify({"error": e.message, "code": e.code}), 400
+    except Exception as e:
+        logger.exception(f"Batch transcription error: {e}")
+        return jsonify({"error": str(e), "details": traceback.format_exc()}), 500
+
+
+def _parse_callback_url(data):
+    """Optional callback_url of a request; must be an absolute http(s) URL."""
+    callback_url = (data.get('callback_url') or '').strip()
+    if not callback_url:
+        return None
+    parsed = urlparse(callback_url)
+    if parsed.scheme not in ('http', 'https') or not parsed.netloc:
+        raise BadRequest("callback_url must be an http or https URL")
+    return callback_url
+
+
+def _queue_job(file_path, options):
+    """Admit a saved file as a background job and build the 202 response."""
+    # Counted in the admission queue until the job finishes
+    ticket = admission_controller.admit(file_path, options['model_type'])
+    try:
+        job_id = job_runner.submit(file_path, options, ticket)
+    except Exception:
+        ticket.release()
+        raise
+
+    status_url = url_for('routes.get_job', job_id=job_id)
+    body = {"job_id": job_id, "status": "queued", "status_url": status_url}
+    if options.get('callback_url'):
+        body["callback_url"] = options['callback_url']
+    response = jsonify(body)
+    response.headers['Location'] = status_url
+    return response, 202
+
+
+def _notify_job(job):
+    """JobRunner finish callback: deliver the job to its callback_url, if it has one."""
+    callback_url = job['options'].get('callback_url')
+    if callback_url:
+        webhook_dispatcher.send(callback_url, _job_response(job))
+
+
+def _job_response(job, partial=False):
+    """Public view of a stored job."""
+    response = {
+        "job_id": job['id'],
+        "status": job['status'],
+        "attempts": job['attempts'],
+        "created_at": job['created_at'],
+        "updated_at": job['updated_at'],
+        "segments_done": job['segments_done'],
+    }
+    if job['result'] is not None:
+        response["result"] = job['result']
+    if job['error'] is not None:
+        response["error"] = job['error']
+    if partial and job['status'] in ('queued', 'running'):
+        response["partial_segments"] = job_runner.store.segments(job['id'])
+    return response
+
+
+@routes.route('/jobs', methods=['POST'])
+@api_key_required
+@version_header
+def create_job():
+    """
+    Queue a transcription and return at once with its job id.
+
+    Accepts a multipart upload ("file" plus the /transcribe form fields) or JSON with
+    "file_url" and the /pull options. The job survives worker restarts and is resumed
+    from its last finished segment.
+    """
+    logger.info("Job request received")
+    file_path = None
+    try:
+        if not job_runner.enabled:
+            return jsonify({"error": "Jobs are disabled"}), 404
+
+        if 'file' in request.files:
+            file = request.files['file']
+            if file.filename == '' or not allowed_file(
+                    file.filename, allowed_extensions=current_app.config['ALLOWED_EXTENSIONS']):
+                raise BadRequest("Invalid file type")
+            data = request.form.to_dict()
+            if 'lang' in data and 'languages' not in data:
+                data['languages'] = data['lang']
+            options = _parse_pull_options(data)
+            options['callback_url'] = _parse_callback_url(data)
+            # Kept in UPLOAD_FOLDER until the job finishes
+            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'],
+                                     f"{uuid.uuid4().hex}_{secure_filename(file.filename)}")
+            file.save(file_path)
+        else:
+            data = request.get_json(silent=True)
+            if not data or not data.get('file_url'):
+                raise BadRequest("Provide a file upload or a file_url")
+            options = _parse_pull_options(data)
+            options['file_url'] = data['file_url']
+            options['callback_url'] = _parse_callback_url(data)
+            file_path = DownloadService.download(
+                data['file_url'],
+                current_app.config['UPLOAD_FOLDER'],
+                max_bytes=current_app.config.get('MAX_CONTENT_LENGTH'),
+                allowed_extensions=current_app.config['ALLOWED_EXTENSIONS']
+            )
+        _validate_downloaded_file(file_path)
+
+        response = _queue_job(file_path, options)
+        file_path = None
+        return response
+
+    except AdmissionError as e:
+        return _admission_error_response(e)
 
     except requests.exceptions.RequestException as e:
         logger.error(f"Error downloading file: {e}")
@@ -332,16 +714,24 @@ def transcribe_json():
         return jsonify({"error": str(e)}), 400
 
     except Exception as e:
-        logger.exception(f"Transcription error: {e}")
+        logger.exception(f"Job creation error: {e}")
         return jsonify({"error": str(e), "details": traceback.format_exc()}), 500
 
     finally:
-        try:
-            if 'file_path' in locals() and os.path.exists(file_path):
-                os.remove(file_path)
-                logger.info(f"Temporary file {file_path} removed")
-        except Exception as cleanup_error:
-            logger.error(f"Error removing file: {cleanup_error}")
+        # Only removed when the job was not queued
+        _remove_file(file_path)
+
+
+@routes.route('/jobs/<job_id>', methods=['GET'])
+@api_key_required
+@version_header
+def get_job(job_id):
+    """Status of a job; its result once completed, finished segments so far with ?partial=true."""
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    partial = request.args.get('partial', 'false').lower() in ['1', 'true', 't', 'yes', 'y']
+    return jsonify(_job_response(job, partial))
 
 
 @routes.route('/preload_gemma', methods=['POST'])
@@ -361,6 +751,49 @@ def preload_gemma():
         return jsonify({"error": str(e)}), 500
 
 
+def _parse_deterministic(data):
+    """Read the "deterministic" flag of a reconstruction request, defaulting to the configuration."""
+    deterministic = data.get('deterministic', ReconstructionConfig().get('deterministic', False))
+    if isinstance(deterministic, str):
+        deterministic = deterministic.lower() in ['1', 'true', 't', 'yes', 'y']
+    return bool(deterministic)
+
+
+def _parse_assist(data):
+    """Read the assisted decoding mode of a reconstruction request, defaulting to the configuration."""
+    assist = str(data.get('assist') or ReconstructionConfig().get('assist_mode', 'none')).lower()
+    if assist not in ASSIST_MODES:
+        raise BadRequest(f"Invalid assist mode, expected one of {', '.join(ASSIST_MODES)}")
+    return assist
+
+
+def _reconstruct_chunked(transcription, template, model_id, max_length, segments=None, deterministic=False,
+                         assist=None):
+    """Map-reduce reconstruction: split on segment boundaries, reconstruct chunks in batches, stitch."""
+    chunks = TextReconstructionService.split_into_chunks(transcription, segments)
+    logger.info(f"Reconstructing transcription in {len(chunks)} chunks")
+
+    futures = [
+        reconstruction_batcher.submit(
+            chunk_text,
+            template,
+            model_id,
+            max_length=TextReconstructionService.chunk_max_length(chunk_text, max_length),
+            deterministic=deterministic,
+            assist=assist
+        )
+        for chunk_text, _ in chunks
+    ]
+    texts = [future.result()["reconstructed_text"] for future in futures]
+
+    return {
+        "original_transcription": transcription,
+        "template": template,
+        "reconstructed_text": TextReconstructionService.stitch_chunks(texts, [overlap for _, overlap in chunks]),
+        "chunks": len(chunks)
+    }
+
+
 @routes.route('/reconstruct', methods=['POST'])
 @api_key_required
 @version_header
@@ -387,23 +820,29 @@ def reconstruct_text():
             logger.error("No template provided in JSON")
             raise BadRequest("Missing template parameter")
 
-        # Load the model if not already loaded
-        model, tokenizer = gemma_model_cache.get_model_and_tokenizer(model_id)
-
-        if not model or not tokenizer:
-            logger.error("Failed to load Gemma2 model")
-            raise RuntimeError("Failed to load Gemma2 model")
+        max_length = int(data.get('max_length', 1500))
+        segments = data.get('segments')
+        chunked = str(data.get('chunked', False)).lower() in ['1', 'true', 't', 'yes', 'y'] or bool(segments)
+        deterministic = _parse_deterministic(data)
+        assist = _parse_assist(data)
 
         logger.info("Starting text reconstruction")
         start_time = time.time()
 
-        result = TextReconstructionService.reconstruct_text(
-            transcription,
-            template,
-            model,
-            tokenizer,
-            max_length=int(data.get('max_length', 1500))
-        )
+        if chunked:
+            result = _reconstruct_chunked(
+                transcription, template, model_id, max_length, segments, deterministic, assist
+            )
+        else:
+            # Concurrent requests are gathered by the micro-batcher into a single generate call
+            result = reconstruction_batcher.submit(
+                transcription,
+                template,
+                model_id,
+                max_length=max_length,
+                deterministic=deterministic,
+                assist=assist
+            ).result()
 
         end_time = time.time()
         result['processing_time'] = round(end_time - start_time, 2)
@@ -419,6 +858,150 @@ def reconstruct_text():
         return jsonify({"error": str(e), "details": traceback.format_exc()}), 500
 
 
+@routes.route('/reconstruct/stream', methods=['POST'])
+@api_key_required
+@version_header
+def reconstruct_text_stream():
+    """
+    Streaming variant of /reconstruct: sends generated text as Server-Sent Events while it is
+    produced. Generation stops as soon as the client disconnects.
+    """
+    logger.info("Streaming text reconstruction request received")
+    pinned_models = ExitStack()
+    try:
+        data = request.get_json()
+
+        if not data:
+            logger.error("No JSON data in request")
+            raise BadRequest("No JSON data provided")
+
+        transcription = data.get('transcription')
+        template = data.get('template')
+        model_id = data.get('model_id', 'google/gemma-2b-it')
+
+        if not transcription:
+            logger.error("No transcription provided in JSON")
+            raise BadRequest("Missing transcription parameter")
+
+        if not template:
+            logger.error("No template provided in JSON")
+            raise BadRequest("Missing template parameter")
+
+        max_length = int(data.get('max_length', 1500))
+        deterministic = _parse_deterministic(data)
+        assist = _parse_assist(data)
+
+        # Pin the models for the whole stream; released when the response is closed
+        model, tokenizer = pinned_models.enter_context(gemma_model_cache.use(model_id))
+        draft = pinned_models.enter_context(draft_model(assist))
+
+    except BadRequest as e:
+        pinned_models.close()
+        logger.error(f"Bad request: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        pinned_models.close()
+        logger.exception(f"Text reconstruction error: {e}")
+        return jsonify({"error": str(e), "details": traceback.format_exc()}), 500
+
+    def generate_events():
+        start_time = time.time()
+        pieces = []
+        try:
+            for piece in TextReconstructionService.stream_text(
+                    transcription, template, model, tokenizer, max_length, deterministic=deterministic,
+                    assist_kwargs=TextReconstructionService.assist_kwargs(assist, draft)
+            ):
+                pieces.append(piece)
+                yield f"data: {json.dumps({'token': piece}, ensure_ascii=False)}\n\n"
+
+            result = {
+                "original_transcription": transcription,
+                "template": template,
+                "reconstructed_text": "".join(pieces).strip(),
+                "processing_time": round(time.time() - start_time, 2)
+            }
+            logger.info(f"Streaming text reconstruction completed in {result['processing_time']} seconds")
+            yield f"event: done\ndata: {json.dumps(result, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            logger.exception(f"Streaming text reconstruction error: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    response = Response(
+        stream_with_context(generate_events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(pinned_models.close)
+    return response
+
+
+@routes.route('/reconstruct/batch', methods=['POST'])
+@api_key_required
+@version_header
+def reconstruct_text_batch():
+    """Reconstruct several transcriptions in one request, batched into shared generate calls."""
+    logger.info("Batch text reconstruction request received")
+    try:
+        data = request.get_json()
+
+        if not data:
+            logger.error("No JSON data in request")
+            raise BadRequest("No JSON data provided")
+
+        items = data.get('items')
+        if not items or not isinstance(items, list):
+            logger.error("No items list provided in JSON")
+            raise BadRequest("Missing items parameter")
+
+        model_id = data.get('model_id', 'google/gemma-2b-it')
+        max_length = int(data.get('max_length', 1500))
+        default_template = data.get('template')
+        deterministic = _parse_deterministic(data)
+        assist = _parse_assist(data)
+
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not item.get('transcription'):
+                raise BadRequest(f"Missing transcription parameter in item {index}")
+            if not (item.get('template') or default_template):
+                raise BadRequest(f"Missing template parameter in item {index}")
+
+        logger.info(f"Starting batch text reconstruction of {len(items)} items")
+        start_time = time.time()
+
+        futures = [
+            reconstruction_batcher.submit(
+                item['transcription'],
+                item.get('template') or default_template,
+                model_id,
+                max_length=max_length,
+                deterministic=deterministic,
+                assist=assist
+            )
+            for item in items
+        ]
+        results = [future.result() for future in futures]
+
+        processing_time = round(time.time() - start_time, 2)
+        logger.info(f"Batch text reconstruction completed in {processing_time} seconds")
+        return jsonify({"results": results, "processing_time": processing_time})
+
+    except BadRequest as e:
+        logger.error(f"Bad request: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.exception(f"Batch text reconstruction error: {e}")
+        return jsonify({"error": str(e), "details": traceback.format_exc()}), 500
+
+
+@routes.route('/reconstruct/cache', methods=['GET'])
+@api_key_required
+@version_header
+def reconstruct_cache_stats():
+    """Hit/miss statistics of the reconstruction result cache."""
+    return jsonify(reconstruction_batcher.cache.stats()), 200
+
+
 @routes.route('/preload_tts_model', methods=['POST'])
 @api_key_required
 @version_header
@@ -477,9 +1060,15 @@ def text_to_speech():
         processing_time = round(end_time - start_time, 2)
         logger.info(f"TTS completed in {processing_time} seconds")
 
+        # Recent outputs kept in memory are served by /tts/audio instead of the static folder
+        if tts_service.storage.memory_max_bytes > 0:
+            audio_url = url_for('routes.tts_audio', filename=os.path.basename(audio_path))
+        else:
+            audio_url = f"/static/{audio_path}"
+
         return jsonify({
             "status": "success",
-            "audio_url": f"/static/{audio_path}",
+            "audio_url": audio_url,
             "processing_time": processing_time
         })
 
@@ -491,5 +1080,76 @@ def text_to_speech():
         return jsonify({"error": str(e)}), 500
 
 
+@routes.route('/tts/audio/<filename>', methods=['GET'])
+def tts_audio(filename):
+    """Serve a generated TTS file, from memory when it was produced recently."""
+    data = tts_service.storage.read(secure_filename(filename))
+    if data is None:
+        return jsonify({"error": "Audio file not found"}), 404
+
+    return Response(data, mimetype='audio/mpeg', headers={'Cache-Control': 'public, max-age=3600'})
+
+
+@routes.route('/tts/stream', methods=['POST'])
+@api_key_required
+@version_header
+def text_to_speech_stream():
+    """
+    Streaming variant of /tts: synthesizes the text sentence by sentence and sends the audio
+    in the response body as each sentence is ready, without writing files.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            raise BadRequest("No JSON data provided")
+
+        text = data.get('text')
+        if not text:
+            raise BadRequest("No text provided")
+
+        language = data.get('language', 'ua')
+        if language not in ['ua', 'en']:
+            logger.warning(f"Unsupported language requested: {language}. Defaulting to Ukrainian ('ua').")
+            language = 'ua'
+
+        voice = data.get('voice')
+        # Separately encoded MP3 chunks would leave gaps between sentences; /tts serves MP3 files
+        audio_format = str(data.get('format', 'wav')).lower()
+        if audio_format != 'wav':
+            raise BadRequest("format must be 'wav'; use /tts for MP3")
+
+        logger.info(f"TTS stream parameters: text='{text[:50]}...', language={language}, voice={voice}")
+
+        # Load before streaming so a failure is still reported as JSON
+        if not tts_service.load_model(language):
+            raise Exception("Failed to load TTS model")
+
+    except BadRequest as e:
+        logger.error(f"Bad request: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"TTS error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+    def generate_audio():
+        start_time = time.time()
+        try:
+            yield from tts_service.stream_speech(text, language, voice)
+            logger.info(f"TTS stream completed in {round(time.time() - start_time, 2)} seconds")
+        except Exception as e:
+            # Headers are already sent; the client sees a truncated stream
+            logger.exception(f"TTS stream error: {e}")
+
+    return Response(
+        stream_with_context(generate_audio()),
+        mimetype='audio/wav',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 def register_routes(app):
     app.register_blueprint(routes)
+    # Budgets must be shared between replicas; refuses to start in production otherwise
+    admission_controller.check_store()
+    # Resumes jobs left unfinished by a previous run of the service
+    job_runner.start(app, _run_job, _notify_job)
@@ -0,0 +1,79 @@
+import copy
+import hashlib
+import threading
+from concurrent.futures import Future, TimeoutError
+from logging import getLogger
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.cancellation import CancellationToken
+
+logger = getLogger(__name__)
+
+
+def file_digest(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """sha256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """
+    De-duplicates concurrent identical work.
+
+    The first caller for a key runs the function; callers arriving while it runs wait for
+    its result instead of running it again, and each receives its own deep copy. The lock is
+    only held to look up or register a call, never while the function runs, so callers can
+    take other locks (e.g. the model caches') without lock-order problems.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(
+            self,
+            key: str,
+            fn: Callable[[], Any],
+            cancel_token: Optional[CancellationToken] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Run fn once per key among concurrent callers.
+
+        Args:
+            key: Identity of the work
+            fn: Function computing the result
+            cancel_token: Stops a waiting caller early; it then gets None
+
+        Returns:
+            (result, whether it was shared from another caller's run)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            logger.info(f"Joining in-flight work {key[:12]}")
+            while True:
+                try:
+                    return copy.deepcopy(future.result(timeout=1.0)), True
+                except TimeoutError:
+                    if cancel_token is not None and cancel_token.cancelled():
+                        return None, True
+
+        try:
+            result = fn()
+            # Followers copy from a snapshot, so the caller may keep modifying its result
+            future.set_result(copy.deepcopy(result))
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
@@ -1,54 +1,129 @@
+import copy
+import queue
+import re
+import threading
+import time
 import traceback
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import torch
+from rapidfuzz import fuzz
+
+from app.cache import ResultCache
+from app.config import ReconstructionConfig
+from app.models import GemmaModelCache
+
+from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+try:
+    from transformers import DynamicCache
+except ImportError:
+    DynamicCache = None
 
 from logging import getLogger
 logger = getLogger(__name__)
 
+ASSIST_MODES = ('none', 'prompt_lookup', 'draft')
+
 
 class TextReconstructionService:
+    # (model name, prompt prefix) -> (prefix token ids, prefix KV cache)
+    _prefix_cache: 'OrderedDict[Tuple[str, str], Tuple[torch.Tensor, Any]]' = OrderedDict()
+    _prefix_lock = threading.Lock()
+
     @staticmethod
-    def reconstruct_text(transcription, template, model, tokenizer, max_length=1500):
-        try:
-            # If template is provided, use it directly
-            if template:
-                prompt_content = template.replace("{transcription}", transcription)
-            # Otherwise, determine language and use appropriate default template
+    def build_prompt(transcription, template, tokenizer):
+        # If template is provided, use it directly
+        if template:
+            prompt_content = template.replace("{transcription}", transcription)
+        # Otherwise, determine language and use appropriate default template
+        else:
+            # Simple language detection based on common characters
+            # This is a basic approach - for production, consider using a proper language detection library
+            if any(c in transcription for c in 'їєіґ'):
+                # Ukrainian default template
+                prompt_content = (
+                    f"Виправте помилки в тексті отриманому зі STT (Whisper) Українською мовою.\n"
+                    f"Виправляйте очевидні помилки розпізнавання мовлення. Не додавайте форматування, коментарів чи додаткової інформації.\n"
+                    f"STT текст для виправлення:\n{transcription}\n\n"
+                    f"Результат має містити ВИКЛЮЧНО виправлений текст без будь-яких додатків."
+                )
             else:
-                # Simple language detection based on common characters
-                # This is a basic approach - for production, consider using a proper language detection library
-                if any(c in transcription for c in 'їєіґ'):
-                    # Ukrainian default template
-                    prompt_content = (
-                        f"Виправте помилки в тексті отриманому зі STT (Whisper) Українською мовою.\n"
-                        f"Виправляйте очевидні помилки розпізнавання мовлення. Не додавайте форматування, коментарів чи додаткової інформації.\n"
-                        f"STT текст для виправлення:\n{transcription}\n\n"
-                        f"Результат має містити ВИКЛЮЧНО виправлений текст без будь-яких додатків."
-                    )
-                else:
-                    # English default template
-                    prompt_content = (
-                        f"Fix errors in the text obtained from STT (Whisper).\n"
-                        f"Correct obvious speech recognition errors. Do not add formatting, comments, or additional information.\n"
-                        f"STT text to fix:\n{transcription}\n\n"
-                        f"The result should contain ONLY the corrected text without any additions."
-                    )
+                # English default template
+                prompt_content = (
+                    f"Fix errors in the text obtained from STT (Whisper).\n"
+                    f"Correct obvious speech recognition errors. Do not add formatting, comments, or additional information.\n"
+                    f"STT text to fix:\n{transcription}\n\n"
+                    f"The result should contain ONLY the corrected text without any additions."
+                )
 
-            messages = [{
-                "role": "user",
-                "content": prompt_content
-            }]
-            prompt = tokenizer.apply_chat_template(messages, tokenize=False)
+        messages = [{
+            "role": "user",
+            "content": prompt_content
+        }]
+        return tokenizer.apply_chat_template(messages, tokenize=False)
+
+    @staticmethod
+    def _generation_kwargs(max_length, deterministic=False):
+        if deterministic:
+            # Greedy decoding: identical inputs always give identical output
+            return dict(
+                max_new_tokens=max_length,
+                do_sample=False,
+                repetition_penalty=1.1,
+            )
+        return dict(
+            max_new_tokens=max_length,
+            temperature=0.7,
+            top_p=0.9,
+            do_sample=True,
+            repetition_penalty=1.1,
+        )
+
+    @staticmethod
+    def assist_kwargs(assist, draft_model=None):
+        """
+        generate() arguments for assisted (speculative) decoding. The main model verifies several
+        drafted tokens per forward pass; with greedy decoding the output is unchanged.
+
+        'prompt_lookup' drafts from n-grams of the prompt, which suits copy-and-fix reconstruction;
+        'draft' uses a small model sharing the tokenizer. Only batch size 1 is supported.
+        """
+        if assist == 'prompt_lookup':
+            return {'prompt_lookup_num_tokens': ReconstructionConfig().get('prompt_lookup_tokens', 10)}
+        if assist == 'draft' and draft_model is not None:
+            return {'assistant_model': draft_model}
+        return {}
+
+    @staticmethod
+    def reconstruct_text(transcription, template, model, tokenizer, max_length=1500, deterministic=False,
+                         assist_kwargs=None):
+        try:
+            prompt = TextReconstructionService.build_prompt(transcription, template, tokenizer)
 
             inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
             input_length = inputs.input_ids.shape[1]
 
+            generation_kwargs = TextReconstructionService._generation_kwargs(max_length, deterministic)
+
+            if assist_kwargs:
+                generation_kwargs.update(assist_kwargs)
+            else:
+                # Reuse the KV cache of the template part that precedes the transcription
+                past_key_values = TextReconstructionService._get_prefix_cache(
+                    prompt, transcription, inputs.input_ids, model, tokenizer
+                )
+                if past_key_values is not None:
+                    generation_kwargs['past_key_values'] = past_key_values
+
             # Generate text
             outputs = model.generate(
                 inputs.input_ids,
-                max_new_tokens=max_length,
-                temperature=0.7,
-                top_p=0.9,
-                do_sample=True,
-                repetition_penalty=1.1,
+                attention_mask=inputs.attention_mask,
+                **generation_kwargs
             )
 
             # Extract only new tokens
@@ -66,6 +141,462 @@ class TextReconstructionService:
             logger.error(traceback.format_exc())
             raise RuntimeError(f"Text reconstruction failed: {e}")
 
+    @staticmethod
+    def stream_text(transcription, template, model, tokenizer, max_length=1500, cancel_event=None,
+                    deterministic=False, assist_kwargs=None):
+        """
+        Reconstruct text while yielding decoded pieces as soon as they are generated.
+
+        Generation runs on a background thread; closing the generator (e.g. when the client
+        disconnects) sets cancel_event, which stops generation at the next token.
+        """
+        cancel_event = cancel_event or threading.Event()
+        prompt = TextReconstructionService.build_prompt(transcription, template, tokenizer)
+        inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        stopping_criteria = StoppingCriteriaList([
+            CancellationCriteria(cancel_event, inputs.input_ids.shape[1])
+        ])
+        errors = []
+
+        def _generate():
+            try:
+                with torch.no_grad():
+                    model.generate(
+                        inputs.input_ids,
+                        attention_mask=inputs.attention_mask,
+                        streamer=streamer,
+                        stopping_criteria=stopping_criteria,
+                        **TextReconstructionService._generation_kwargs(max_length, deterministic),
+                        **(assist_kwargs or {})
+                    )
+            except Exception as e:
+                logger.error(f"Streaming text reconstruction error: {e}")
+                errors.append(e)
+                # Unblock the consumer waiting on the streamer
+                streamer.end()
+
+        worker = threading.Thread(target=_generate, name='reconstruction-stream', daemon=True)
+        worker.start()
+        try:
+            for piece in streamer:
+                if piece:
+                    yield piece
+            if errors:
+                raise RuntimeError(f"Text reconstruction failed: {errors[0]}")
+        finally:
+            if worker.is_alive():
+                logger.info("Reconstruction stream closed early, stopping generation")
+            cancel_event.set()
+            worker.join()
+
+    @staticmethod
+    def _left_pad(rows, pad_token_id, device):
+        """Stack token id lists into left-padded input_ids and attention_mask tensors."""
+        width = max(len(row) for row in rows)
+        input_ids = torch.full((len(rows), width), pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(rows), width), dtype=torch.long)
+        for i, row in enumerate(rows):
+            if row:
+                input_ids[i, width - len(row):] = torch.tensor(row, dtype=torch.long)
+                attention_mask[i, width - len(row):] = 1
+        return input_ids.to(device), attention_mask.to(device)
+
+    @staticmethod
+    def _batch_inputs(prompts, items, model, tokenizer, pad_token_id):
+        """
+        Token ids, attention mask and, when it can be reused, the KV cache for a batch of prompts.
+
+        When every prompt starts with the same template prefix, its cached KV is repeated across
+        the batch: the prefix comes first in every row and only the transcription parts are
+        left-padded, so the masked padding sits between the two. Otherwise whole prompts are
+        left-padded.
+        """
+        rows = [tokenizer(prompt).input_ids for prompt in prompts]
+
+        prefixes = set()
+        for prompt, (transcription, _) in zip(prompts, items):
+            prefix_end = prompt.find(transcription) if transcription else -1
+            prefixes.add(prompt[:prefix_end] if prefix_end > 0 else None)
+
+        entry = None
+        if len(prefixes) == 1 and None not in prefixes:
+            entry = TextReconstructionService._prefix_entry(prompts[0], items[0][0], model, tokenizer)
+
+        if entry is not None:
+            prefix_ids, past_key_values = entry
+            prefix = prefix_ids[0].tolist()
+            if hasattr(past_key_values, 'batch_repeat_interleave') and \
+                    all(len(row) > len(prefix) and row[:len(prefix)] == prefix for row in rows):
+                suffix_ids, suffix_mask = TextReconstructionService._left_pad(
+                    [row[len(prefix):] for row in rows], pad_token_id, model.device
+                )
+                batch_size = len(rows)
+                input_ids = torch.cat([prefix_ids.expand(batch_size, -1), suffix_ids], dim=1)
+                attention_mask = torch.cat([torch.ones_like(prefix_ids).expand(batch_size, -1), suffix_mask], dim=1)
+                # generate() extends the cache in place, so every batch gets its own copy
+                past_key_values = copy.deepcopy(past_key_values)
+                past_key_values.batch_repeat_interleave(batch_size)
+                return input_ids, attention_mask, past_key_values
+
+        input_ids, attention_mask = TextReconstructionService._left_pad(rows, pad_token_id, model.device)
+        return input_ids, attention_mask, None
+
+    @staticmethod
+    def reconstruct_batch(items, model, tokenizer, max_length=1500, deterministic=False):
+        """
+        Reconstruct several transcriptions with a single left-padded generate call, reusing the
+        template prefix KV cache when all items share a template.
+
+        Args:
+            items: List of (transcription, template) pairs
+            model: Causal LM
+            tokenizer: Matching tokenizer
+            max_length: Maximum number of new tokens per item
+            deterministic: Use greedy decoding instead of sampling
+
+        Returns:
+            List of result dicts in the order of items
+        """
+        if len(items) == 1:
+            transcription, template = items[0]
+            return [TextReconstructionService.reconstruct_text(
+                transcription, template, model, tokenizer, max_length, deterministic
+            )]
+
+        try:
+            prompts = [
+                TextReconstructionService.build_prompt(transcription, template, tokenizer)
+                for transcription, template in items
+            ]
+
+            # Padded here rather than by the tokenizer, which is cached with the model and shared
+            pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+            # Decoder-only models must be padded on the left so generation continues each prompt
+            input_ids, attention_mask, past_key_values = TextReconstructionService._batch_inputs(
+                prompts, items, model, tokenizer, pad_token_id
+            )
+            input_length = input_ids.shape[1]
+
+            generation_kwargs = TextReconstructionService._generation_kwargs(max_length, deterministic)
+            if past_key_values is not None:
+                generation_kwargs['past_key_values'] = past_key_values
+
+            outputs = model.generate(
+                input_ids,
+                attention_mask=attention_mask,
+                pad_token_id=pad_token_id,
+                **generation_kwargs
+            )
+
+            generated_ids = outputs[:, input_length:]
+            texts = tokenizer.batch_decode(generated_ids, skip_special_tokens=True)
+
+            return [
+                {
+                    "original_transcription": transcription,
+                    "template": template,
+                    "reconstructed_text": text.strip()
+                }
+                for (transcription, template), text in zip(items, texts)
+            ]
+
+        except Exception as e:
+            logger.error(f"Batched text reconstruction error: {e}")
+            logger.error(traceback.format_exc())
+            raise RuntimeError(f"Text reconstruction failed: {e}")
+
+    @staticmethod
+    def _get_prefix_cache(prompt, transcription, input_ids, model, tokenizer):
+        """
+        Return a private copy of the KV cache for the prompt prefix preceding the transcription,
+        computing and storing it on first use. Returns None when the prefix cannot be reused.
+        """
+        entry = TextReconstructionService._prefix_entry(prompt, transcription, model, tokenizer)
+        if entry is None:
+            return None
+
+        prefix_ids, past_key_values = entry
+        prefix_length = prefix_ids.shape[1]
+        if input_ids.shape[1] <= prefix_length or not torch.equal(input_ids[:, :prefix_length], prefix_ids):
+            return None
+
+        # generate() extends the cache in place, so every request gets its own copy
+        return copy.deepcopy(past_key_values)
+
+    @staticmethod
+    def _prefix_entry(prompt, transcription, model, tokenizer):
+        """
+        The shared (prefix token ids, prefix KV cache) entry for the template part of a prompt,
+        computed on first use. Callers copy the cache before generating with it.
+        """
+        cache_size = ReconstructionConfig().get('prefix_cache_size', 8)
+        prefix_end = prompt.find(transcription) if transcription else -1
+        if DynamicCache is None or cache_size <= 0 or prefix_end <= 0:
+            return None
+
+        prefix = prompt[:prefix_end]
+        key = (getattr(model.config, '_name_or_path', str(id(model))), prefix)
+
+        with TextReconstructionService._prefix_lock:
+            entry = TextReconstructionService._prefix_cache.get(key)
+            if entry is not None:
+                TextReconstructionService._prefix_cache.move_to_end(key)
+
+        if entry is None:
+            prefix_ids = tokenizer(prefix, return_tensors="pt").input_ids.to(model.device)
+            # The last prefix token may merge with the transcription when tokenized together
+            prefix_ids = prefix_ids[:, :-1]
+            if prefix_ids.shape[1] == 0:
+                return None
+
+            with torch.no_grad():
+                past_key_values = model(prefix_ids, past_key_values=DynamicCache(), use_cache=True).past_key_values
+            entry = (prefix_ids, past_key_values)
+
+            with TextReconstructionService._prefix_lock:
+                TextReconstructionService._prefix_cache[key] = entry
+                while len(TextReconstructionService._prefix_cache) > cache_size:
+                    TextReconstructionService._prefix_cache.popitem(last=False)
+
+        return entry
+
+    _sentence_splitter = re.compile(r'(?<=[.!?…])\s+')
+
+    @staticmethod
+    def split_into_chunks(transcription, segments=None):
+        """
+        Split a long transcription into chunks for map-reduce reconstruction.
+
+        Chunks are built from segment boundaries (the `segments` returned by TranscriptionService,
+        as dicts with "text" or plain strings), falling back to sentence boundaries. Each chunk
+        after the first starts with the last few segments of the previous one as overlap.
+
+        Returns:
+            List of (chunk text, overlap text) pairs
+        """
+        config = ReconstructionConfig()
+        chunk_chars = max(1, config.get('chunk_chars', 1500))
+        overlap_segments = max(0, config.get('chunk_overlap_segments', 1))
+
+        if segments:
+            pieces = [
+                (segment.get('text', '') if isinstance(segment, dict) else str(segment)).strip()
+                for segment in segments
+            ]
+        else:
+            pieces = TextReconstructionService._sentence_splitter.split(transcription)
+        pieces = [piece for piece in pieces if piece]
+
+        groups = []
+        current = []
+        current_chars = 0
+        for piece in pieces:
+            if current and current_chars + len(piece) > chunk_chars:
+                groups.append(current)
+                current = []
+                current_chars = 0
+            current.append(piece)
+            current_chars += len(piece) + 1
+        if current:
+            groups.append(current)
+
+        chunks = []
+        for index, group in enumerate(groups):
+            overlap = groups[index - 1][-overlap_segments:] if index > 0 and overlap_segments else []
+            chunks.append((" ".join(overlap + group), " ".join(overlap)))
+        return chunks
+
+    @staticmethod
+    def chunk_max_length(chunk_text, max_length):
+        """New-token budget for a chunk, bucketed so chunks still batch together."""
+        estimate = len(chunk_text) // 2 + 64
+        bucket = -(-estimate // 128) * 128
+        return min(max_length, bucket)
+
+    @staticmethod
+    def stitch_chunks(texts, overlaps):
+        """
+        Join reconstructed chunks, dropping the start of each chunk that re-states the overlap
+        already covered by the previous chunk.
+        """
+        if not texts:
+            return ""
+
+        result_words = texts[0].split()
+        for text, overlap in zip(texts[1:], overlaps[1:]):
+            words = text.split()
+            overlap_words = len(overlap.split())
+
+            cut = 0
+            if overlap_words and result_words:
+                best_score = 0.0
+                for candidate in range(max(1, overlap_words // 2), min(len(words), overlap_words * 2) + 1):
+                    head = " ".join(words[:candidate]).lower()
+                    tail = " ".join(result_words[-candidate:]).lower()
+                    score = fuzz.ratio(head, tail)
+                    if score > best_score:
+                        best_score, cut = score, candidate
+                if best_score < ReconstructionConfig().get('chunk_stitch_threshold', 60):
+                    cut = 0
+
+            result_words.extend(words[cut:])
+
+        return " ".join(result_words)
+
+
+class _ReconstructionRequest(NamedTuple):
+    transcription: str
+    template: Optional[str]
+    model_id: str
+    max_length: int
+    deterministic: bool
+    assist: str
+    cache_key: Optional[str]
+    future: Future
+
+
+class ReconstructionBatcher:
+    """
+    Micro-batcher for reconstruction requests: gathers requests arriving within a short
+    window, groups them by model and generation settings, and runs one generate per group.
+
+    Deterministic (greedy) results are cached, so repeated requests resolve immediately.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:
+                    cls._instance = super().__new__(cls)
+                    config = ReconstructionConfig()
+                    cls._instance._queue = queue.Queue()
+                    cls._instance._worker = None
+                    cls._instance.cache = ResultCache(
+                        max_entries=config.get('cache_size', 256),
+                        directory=config.get('cache_dir') or None,
+                        max_disk_entries=config.get('cache_disk_entries', 10000),
+                    )
+        return cls._instance
+
+    def submit(self, transcription, template, model_id, max_length=1500, deterministic=False, assist=None) -> Future:
+        """Queue a reconstruction and return a Future resolving to its result dict."""
+        future = Future()
+        cache_key = None
+        assist = assist or ReconstructionConfig().get('assist_mode', 'none')
+
+        if deterministic and self.cache is not None:
+            cache_key = ResultCache.make_key(
+                model_id=model_id,
+                template=template,
+                transcription=transcription,
+                generation=TextReconstructionService._generation_kwargs(max_length, deterministic),
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Reconstruction cache hit")
+                future.set_result(dict(cached))
+                return future
+
+        self._ensure_worker()
+        self._queue.put(_ReconstructionRequest(
+            transcription, template, model_id, max_length, deterministic, assist, cache_key, future
+        ))
+        return future
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='reconstruction-batcher', daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List[_ReconstructionRequest]:
+        """Block for the first request, then gather more until the window closes or the batch is full."""
+        config = ReconstructionConfig()
+        window = config.get('batch_window_ms', 20) / 1000.0
+        max_batch = max(1, config.get('max_batch_size', 8))
+
+        requests = [self._queue.get()]
+        deadline = time.monotonic() + window
+        while len(requests) < max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                requests.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return requests
+
+    def _run(self) -> None:
+        while True:
+            requests = self._collect()
+
+            groups: Dict[Tuple[str, int, bool, str], List[_ReconstructionRequest]] = {}
+            for request in requests:
+                key = (request.model_id, request.max_length, request.deterministic, request.assist)
+                groups.setdefault(key, []).append(request)
+
+            for (model_id, max_length, deterministic, assist), group in groups.items():
+                try:
+                    with GemmaModelCache().use(model_id) as (model, tokenizer):
+                        if assist == 'none':
+                            logger.info(f"Reconstructing batch of {len(group)} with {model_id}")
+                            results = TextReconstructionService.reconstruct_batch(
+                                [(request.transcription, request.template) for request in group],
+                                model,
+                                tokenizer,
+                                max_length,
+                                deterministic
+                            )
+                        else:
+                            # Assisted generation only supports batch size 1
+                            with draft_model(assist) as draft:
+                                assist_kwargs = TextReconstructionService.assist_kwargs(assist, draft)
+                                logger.info(f"Reconstructing {len(group)} items with {model_id} ({assist} assisted)")
+                                results = [
+                                    TextReconstructionService.reconstruct_text(
+                                        request.transcription, request.template, model, tokenizer,
+                                        max_length, deterministic, assist_kwargs
+                                    )
+                                    for request in group
+                                ]
+                    for request, result in zip(group, results):
+                        if request.cache_key is not None:
+                            self.cache.put(request.cache_key, result)
+                        request.future.set_result(dict(result))
+                except Exception as e:
+                    for request in group:
+                        request.future.set_exception(e)
+
+
+@contextmanager
+def draft_model(assist):
+    """Yield the pinned draft model for 'draft' assisted decoding, None for other modes."""
+    draft_model_id = ReconstructionConfig().get('draft_model_id', '')
+    if assist != 'draft' or not draft_model_id:
+        yield None
+        return
+
+    with GemmaModelCache().use(draft_model_id) as (model, _):
+        yield model
+
+
+class CancellationCriteria(StoppingCriteria):
+    """Stops generation once cancel_event is set, logging progress via logging_callback."""
+
+    def __init__(self, cancel_event, prompt_length):
+        self.cancel_event = cancel_event
+        self.prompt_length = prompt_length
+
+    def __call__(self, input_ids, scores, **kwargs):
+        step = input_ids.shape[1] - self.prompt_length
+        stop = logging_callback(step, input_ids[0, -1].item(), scores) or self.cancel_event.is_set()
+        return torch.full((input_ids.shape[0],), stop, dtype=torch.bool, device=input_ids.device)
+
 
 def logging_callback(step, token_id, scores):
     if step % 10 == 0:
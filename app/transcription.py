@@ -1,16 +1,150 @@
-import os
-from typing import List, Dict, Any, Optional, Tuple
+import queue
+import threading
+from concurrent.futures import Future
+from itertools import chain, islice
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterable, Iterator
+import numpy as np
 import torch
 import whisper
+from whisper.tokenizer import LANGUAGES, TO_LANGUAGE_CODE
 from flask import current_app
 from logging import getLogger
 
+from app.audio_pool import AudioDecodePool
+from app.cancellation import CancellationToken
 from app.config import AudioConfig, TranscriptionConfig
 from app.exceptions import SilenceError
+from app.features import SpectralFeatures
 from app.preprocessing import PreprocessingService
 
 logger = getLogger(__name__)
 
+# Marks the end of the segment stream in the producer/consumer queue
+_END_OF_SEGMENTS = object()
+
+SegmentCallback = Callable[[str, Dict[str, Any]], None]
+
+
+def encode_mel(model: Any, mel: torch.Tensor) -> torch.Tensor:
+    """Whisper encoder output for a (n_mels, 3000) log-mel window, shape (1, n_audio_ctx, n_audio_state)."""
+    device = model.device
+    dtype = torch.float16 if torch.device(device).type == 'cuda' else torch.float32
+
+    with torch.no_grad():
+        return model.embed_audio(mel.to(device).unsqueeze(0).to(dtype))
+
+
+def encode_audio(model: Any, audio: Any) -> torch.Tensor:
+    """Whisper encoder output for up to 30 seconds of audio, shape (1, n_audio_ctx, n_audio_state)."""
+    n_mels = getattr(model.dims, 'n_mels', 80)
+    return encode_mel(model, whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels, device=model.device))
+
+
+class AutoLanguage:
+    """
+    Chooses the decode language with Whisper's language identification so each segment is
+    decoded once instead of once per requested language.
+
+    With the 'recording' scope the language is detected on the first few speech segments and
+    used for the whole recording; with the 'segment' scope every segment is identified.
+    Detection is restricted to the candidate languages when any are given. With shared
+    spectral features the segments' encoder input is read from them.
+    """
+
+    def __init__(
+            self,
+            model: Any,
+            candidates: List[str],
+            scope: str = 'recording',
+            sample_segments: int = 3,
+            features: Optional[SpectralFeatures] = None
+    ):
+        self.model = model
+        self.scope = scope
+        self.features = features
+        self.sample_segments = max(1, sample_segments)
+        self.language: Optional[str] = None
+        self._totals: Dict[str, float] = {}
+        self._detections = 0
+
+        # Whisper language code -> label used as the key in the response
+        self._labels: Dict[str, str] = {}
+        for candidate in candidates:
+            code = self.language_code(candidate)
+            if code is None:
+                raise ValueError(f"Unknown language: {candidate}")
+            self._labels[code] = candidate.strip()
+
+    @staticmethod
+    def language_code(language: str) -> Optional[str]:
+        """Whisper language code for a language name or code, None if Whisper does not know it."""
+        code = language.strip().lower()
+        code = TO_LANGUAGE_CODE.get(code, code)
+        return code if code in LANGUAGES else None
+
+    def _label(self, code: str) -> str:
+        return self._labels.get(code) or LANGUAGES[code].title()
+
+    def detect(self, segment: Any, start_sample: Optional[int] = None) -> Dict[str, float]:
+        """Language probabilities of one segment, from the encoder output of its log-mel."""
+        if self.features is not None and start_sample is not None:
+            mel = self.features.log_mel(start_sample, start_sample + len(segment))
+            return self.detect_features(encode_mel(self.model, mel))
+        return self.detect_features(encode_audio(self.model, segment))
+
+    def detect_features(self, audio_features: torch.Tensor) -> Dict[str, float]:
+        """Language probabilities from an already computed encoder output."""
+        with torch.no_grad():
+            _, probs = self.model.detect_language(audio_features)
+
+        probs = probs[0]
+        if self._labels:
+            probs = {code: probs.get(code, 0.0) for code in self._labels}
+        total = sum(probs.values()) or 1.0
+        probabilities = {self._label(code): p / total for code, p in probs.items() if p > 0}
+
+        for label, p in probabilities.items():
+            self._totals[label] = self._totals.get(label, 0.0) + p
+        self._detections += 1
+        return probabilities
+
+    def prime(
+            self,
+            segments: Iterable[Tuple[int, Any, Optional[str]]]
+    ) -> Iterable[Tuple[int, Any, Optional[str]]]:
+        """For the recording scope, detect on the first speech segments; returns the full segment stream."""
+        if self.scope != 'recording':
+            return segments
+
+        iterator = iter(segments)
+        head = list(islice(iterator, self.sample_segments))
+        for start, segment, _ in head:
+            try:
+                self.detect(segment, start)
+            except Exception as e:
+                # Leave the language undetected; Whisper then identifies it while decoding
+                logger.error(f"Language identification failed: {str(e)}")
+                break
+        if self._totals:
+            self.language = max(self._totals, key=self._totals.get)
+        logger.info(f"Detected language {self.language} from {len(head)} segments: {self.probabilities()}")
+        return chain(head, iterator)
+
+    def pick(self, segment: Any, audio_features: Optional[torch.Tensor] = None) -> str:
+        """Language to decode a segment in; reuses the segment's encoder output when given."""
+        if self.scope == 'segment':
+            probabilities = self.detect_features(audio_features) if audio_features is not None \
+                else self.detect(segment)
+            return max(probabilities, key=probabilities.get)
+        return self.language
+
+    def probabilities(self) -> Dict[str, float]:
+        """Detected probabilities averaged over all identified segments."""
+        if not self._detections:
+            return {}
+        averaged = {label: round(total / self._detections, 4) for label, total in self._totals.items()}
+        return dict(sorted(averaged.items(), key=lambda item: item[1], reverse=True))
+
 
 class TranscriptionService:
     """Service for transcribing audio files using Whisper models."""
@@ -22,7 +156,14 @@ class TranscriptionService:
             languages: List[str],
             keywords: List[str],
             focus_tokens: Optional[List[str]] = None,
-            pre_process_file: bool = False
+            pre_process_file: bool = False,
+            audio_future: Optional[Future] = None,
+            on_segment: Optional[SegmentCallback] = None,
+            auto_language: bool = False,
+            cancel_token: Optional[CancellationToken] = None,
+            split_channels: bool = False,
+            channel_labels: Optional[List[str]] = None,
+            completed_segments: Optional[Dict[str, List[Dict[str, Any]]]] = None
     ) -> Dict[str, Any]:
         """
         Transcribe an audio file using the provided model with support for multiple languages.
@@ -34,69 +175,158 @@ class TranscriptionService:
             keywords: List of keywords to enhance recognition accuracy (also used for spotting)
             focus_tokens: Additional bias tokens injected into the prompt (request-level)
             pre_process_file: Whether to preprocess the audio file
+            audio_future: Pending result of prefetch_audio for this file, if already scheduled
+            on_segment: Called with (language, segment result) as soon as each segment is decoded
+            auto_language: Identify the spoken language and decode each segment once; languages
+                are then the candidates to choose from (empty for any language)
+            cancel_token: Checked between segments and languages; when it fires the segments
+                decoded so far are returned and the result is marked truncated
+            split_channels: Transcribe the channels of a stereo recording separately; segments
+                are tagged with the channel's speaker label and interleaved by time
+            channel_labels: Speaker labels of the channels (default from configuration)
+            completed_segments: Segment results per language from an interrupted run of the same
+                request; these positions are not decoded again
 
         Returns:
             Dictionary containing transcriptions and detailed segment information
         """
-        audio = whisper.load_audio(file_path)
-        TranscriptionService._validate_audio(audio, file_path)
+        if audio_future is None:
+            audio_future = TranscriptionService.prefetch_audio(file_path, pre_process_file, split_channels)
 
-        audio_file_path, sample_rate, processed_audio = TranscriptionService._prepare_audio(
-            file_path, audio, pre_process_file
-        )
+        audio, preprocessed_audio = audio_future.result()
+        sample_rate = AudioConfig().get('sample_rate')
+        processed_audio = audio if preprocessed_audio is None else preprocessed_audio
+
+        labels = None
+        if audio.ndim == 2:
+            labels = TranscriptionService._channel_labels(channel_labels, audio.shape[0])
+            # Drop channels that are silent throughout; the recording is silent only if all are
+            speaking = [index for index, channel in enumerate(audio)
+                        if not PreprocessingService.detect_silence(channel)]
+            if not speaking:
+                logger.warning("All channels appear to be silent - transcription may not be meaningful")
+                raise SilenceError()
+            processed_audio = processed_audio[speaking]
+            labels = [labels[index] for index in speaking]
+            logger.info(f"Transcribing channels separately: {labels}")
+            features = None
+
+        else:
+            features = TranscriptionService._spectral_features(processed_audio, model)
+            TranscriptionService._validate_audio(
+                audio, file_path, features if preprocessed_audio is None else None
+            )
 
-        audio_duration = len(processed_audio) / sample_rate
+        audio_duration = processed_audio.shape[-1] / sample_rate
         logger.info(f"Audio length: {audio_duration:.2f} seconds")
 
         focus_prompt = TranscriptionService._build_focus_prompt(keywords, focus_tokens or [])
 
-        segments = TranscriptionService._create_segments(processed_audio, sample_rate)
-        logger.info(f"Split audio into {len(segments)} segments for processing")
-
-        all_results = TranscriptionService._process_segments(
-            segments,
-            model,
-            languages,
-            focus_prompt,
-            sample_rate
-        )
+        cfg = TranscriptionConfig()
+        # Segments are decoded from slices of the shared log-mel unless transcribe() is needed
+        # for word timestamps
+        mel_features = None if cfg.get('word_timestamps', False) else features
+
+        detector = None
+        if auto_language:
+            detector = AutoLanguage(
+                model,
+                languages,
+                cfg.get('auto_language_scope', 'recording'),
+                cfg.get('language_detection_segments', 3),
+                features
+            )
+
+        if TranscriptionService._is_short_clip(processed_audio, labels):
+            # Fits in one Whisper window: no segmentation, no per-segment silence checks
+            all_results = TranscriptionService._transcribe_short_clip(
+                processed_audio, model, languages, focus_prompt, sample_rate, on_segment, detector, cancel_token,
+                features
+            )
+        else:
+            # Segmentation and silence checks run on a producer thread while the model decodes
+            segments = TranscriptionService._produce_segments(processed_audio, sample_rate, model, labels, features)
+            try:
+                all_results = TranscriptionService._process_segments(
+                    detector.prime(segments) if detector else segments,
+                    model,
+                    [] if detector else languages,
+                    focus_prompt,
+                    sample_rate,
+                    on_segment,
+                    detector.pick if detector else None,
+                    cancel_token,
+                    mel_features,
+                    completed_segments
+                )
+            finally:
+                # Also stops the producer when the loop ended early
+                segments.close()
+
+        if labels is not None or completed_segments:
+            for language_segments in all_results.values():
+                language_segments.sort(key=lambda segment: (segment["start"], segment.get("speaker", "")))
 
         # Combine segments into final transcriptions
-        transcriptions = TranscriptionService._combine_transcriptions(all_results, languages)
+        transcriptions = TranscriptionService._combine_transcriptions(all_results, list(all_results))
 
-        if audio_file_path != file_path and os.path.exists(audio_file_path):
-            os.remove(audio_file_path)
-
-        return {
+        result = {
             "transcriptions": transcriptions,
             "segments": all_results,
         }
+        if detector is not None:
+            result["language_probabilities"] = detector.probabilities()
+            if detector.language is not None:
+                result["detected_language"] = detector.language
+        if cancel_token is not None and cancel_token.reason is not None:
+            result["truncated"] = True
+            result["truncation_reason"] = cancel_token.reason
+        return result
 
     @staticmethod
-    def _prepare_audio(file_path: str, audio: Any, pre_process_file: bool) -> Tuple[str, int, Any]:
-        """
-        Prepare audio file for transcription and return its path, sample rate, and processed audio.
-        Only preprocesses if enabled and audio is not silent.
+    def prefetch_audio(file_path: str, pre_process_file: bool = False, split_channels: bool = False) -> Future:
         """
-        sample_rate = AudioConfig().get('sample_rate')
-        processed_audio = audio
+        Schedule decoding and (if enabled) preprocessing of an audio file on the decode pool.
+        Call this as soon as the file is on disk so the work overlaps with model loading
+        and with inference of other requests. With split_channels the channels of a stereo
+        file are decoded into separate arrays.
 
+        Returns:
+            Future resolving to (raw audio, preprocessed audio or None)
+        """
         should_preprocess = pre_process_file or current_app.config.get('AUDIO_ENABLE_PREPROCESSING', False)
 
         if should_preprocess:
-            logger.info("Starting audio preprocessing")
-            audio_file_path = PreprocessingService.preprocess_audio(file_path)
-            processed_audio = whisper.load_audio(audio_file_path)
+            logger.info("Scheduling audio decoding and preprocessing")
         else:
-            logger.info("Audio preprocessing is disabled")
-            audio_file_path = file_path
+            logger.info("Audio preprocessing is disabled, scheduling audio decoding")
 
-        return audio_file_path, sample_rate, processed_audio
+        return AudioDecodePool().submit(file_path, should_preprocess, split_channels)
 
     @staticmethod
-    def _validate_audio(audio: Any, file_path: str) -> None:
+    def _channel_labels(channel_labels: Optional[List[str]], channels: int) -> List[str]:
+        """Speaker label for each channel, falling back to the configured labels and then to numbers."""
+        labels = [label.strip() for label in (channel_labels or TranscriptionConfig().get('channel_labels', []))
+                  if label.strip()]
+        return [labels[index] if index < len(labels) else f"channel_{index + 1}" for index in range(channels)]
+
+    @staticmethod
+    def _spectral_features(audio: Any, model: Any) -> Optional[SpectralFeatures]:
+        """Shared STFT/mel of a mono recording, None when disabled or when it cannot be computed."""
+        if not TranscriptionConfig().get('shared_features', True) or len(audio) == 0:
+            return None
+        try:
+            return SpectralFeatures(audio, getattr(model.dims, 'n_mels', 80), getattr(model, 'device', None))
+        except Exception as e:
+            # Every stage can still compute its own spectrogram
+            logger.error(f"Could not compute shared spectral features: {str(e)}")
+            return None
+
+    @staticmethod
+    def _validate_audio(audio: Any, file_path: str, features: Optional[SpectralFeatures] = None) -> None:
         """Validate audio is not silent, raise appropriate error if it is."""
-        if PreprocessingService.detect_silence(audio):
+        frame_energy = features.silence_energy() if features is not None else None
+        if PreprocessingService.detect_silence(audio, frame_energy=frame_energy):
             logger.warning("Audio appears to be silent - transcription may not be meaningful")
             raise SilenceError()
 
@@ -119,50 +349,145 @@ class TranscriptionService:
         return focus_prompt
 
     @staticmethod
-    def _create_segments(audio: Any, sample_rate: int) -> List[Tuple[int, Any]]:
-        """Create overlapping segments from the audio for processing."""
+    def _produce_segments(
+            audio: Any,
+            sample_rate: int,
+            model: Any,
+            labels: Optional[List[str]] = None,
+            features: Optional[SpectralFeatures] = None
+    ) -> Iterator[Tuple[int, Any, Optional[str]]]:
+        """
+        Run segmentation on a producer thread and yield ready segments through a bounded queue.
+
+        The producer does the silence checks and stages each segment as a tensor on the model
+        device, so this CPU work overlaps with inference on the previous segment.
+        """
+        maxsize = max(1, TranscriptionConfig().get('pipeline_queue_size', 4))
+        segment_queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        stop = threading.Event()
+        device = getattr(model, 'device', None)
+
+        def _put(item: Any) -> bool:
+            while not stop.is_set():
+                try:
+                    segment_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _producer() -> None:
+            try:
+                for start, segment, label in TranscriptionService._iter_segments(audio, sample_rate, labels, features):
+                    if not _put((start, TranscriptionService._stage_segment(segment, device), label)):
+                        return
+            except Exception as e:
+                logger.error(f"Segment producer failed: {str(e)}")
+                _put(e)
+                return
+            _put(_END_OF_SEGMENTS)
+
+        producer = threading.Thread(target=_producer, name='segment-producer', daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = segment_queue.get()
+                if item is _END_OF_SEGMENTS:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            producer.join()
+
+    @staticmethod
+    def _stage_segment(segment: Any, device: Any) -> Any:
+        """Convert a segment to a float32 tensor on the model device ahead of inference."""
+        tensor = torch.from_numpy(np.ascontiguousarray(segment, dtype=np.float32))
+        if device is not None and torch.device(device).type == 'cuda':
+            tensor = tensor.pin_memory().to(device, non_blocking=True)
+        return tensor
+
+    @staticmethod
+    def _iter_segments(
+            audio: Any,
+            sample_rate: int,
+            labels: Optional[List[str]] = None,
+            features: Optional[SpectralFeatures] = None
+    ) -> Iterator[Tuple[int, Any, Optional[str]]]:
+        """
+        Yield overlapping segments from the audio for processing, as (start sample, segment, label).
+
+        Multi-channel audio of shape (channels, samples) yields each channel's segment at every
+        position in turn, tagged with the channel label, so segments come out ordered by time.
+        Silence checks of mono audio read their frame energies from the shared features.
+        """
         cfg = TranscriptionConfig()
         segment_length = cfg.get('segment_length_sec', 15) * sample_rate
         overlap = cfg.get('segment_overlap_sec', 5) * sample_rate
 
-        if len(audio) == 0:
-            logger.warning("Audio length is zero, returning empty segments list")
-            return []
-
-        segments = []
-        for start in range(0, len(audio), max(1, segment_length - overlap)):
-            end = min(start + segment_length, len(audio))
-            segment = audio[start:end]
-            # Optionally skip clearly silent segments to save time
-            if TranscriptionConfig().get('skip_silent_segments', True):
-                try:
-                    if PreprocessingService.detect_silence(segment):
-                        continue
-                except Exception:
-                    # Be conservative: if silence detection fails, don't skip
-                    pass
-            segments.append((start, segment))
+        channels = list(zip(labels, audio)) if labels is not None else [(None, audio)]
+        length = len(channels[0][1])
+
+        if length == 0:
+            logger.warning("Audio length is zero, no segments to process")
+            return
+
+        for start in range(0, length, max(1, segment_length - overlap)):
+            end = min(start + segment_length, length)
+            for label, channel in channels:
+                segment = channel[start:end]
+                # Optionally skip clearly silent segments to save time
+                if TranscriptionConfig().get('skip_silent_segments', True):
+                    try:
+                        frame_energy = features.silence_energy(start, end) if features is not None else None
+                        if PreprocessingService.detect_silence(segment, frame_energy=frame_energy):
+                            continue
+                    except Exception:
+                        # Be conservative: if silence detection fails, don't skip
+                        pass
+                yield start, segment, label
 
             # If we've reached the end of the audio, break
-            if end == len(audio):
+            if end == length:
                 break
 
-        return segments
-
     @staticmethod
     def _process_segments(
-            segments: List[Tuple[int, Any]],
+            segments: Iterable[Tuple[int, Any, Optional[str]]],
             model: Any,
             languages: List[str],
             focus_prompt: str,
-            sample_rate: int
+            sample_rate: int,
+            on_segment: Optional[SegmentCallback] = None,
+            pick_language: Optional[Callable[..., str]] = None,
+            cancel_token: Optional[CancellationToken] = None,
+            features: Optional[SpectralFeatures] = None,
+            completed_segments: Optional[Dict[str, List[Dict[str, Any]]]] = None
     ) -> Dict[str, List[Dict[str, Any]]]:
-        """Process all segments for all requested languages with proper resource management."""
+        """
+        Process all segments for all requested languages with proper resource management.
+
+        With pick_language each segment is decoded once, in the language it returns.
+        With cancel_token the loop stops between segments/languages once it is cancelled.
+        With features each segment is encoded once from its slice of the shared log-mel and
+        decoded per language from that encoder output.
+        With completed_segments (from an interrupted run) those results are kept and replayed
+        to on_segment, and only the positions and languages missing from them are decoded.
+        """
         all_results = {lang: [] for lang in languages}
 
-        if not segments:
-            logger.warning("No segments to process")
-            return all_results
+        done = set()
+        for language, language_segments in (completed_segments or {}).items():
+            for segment_result in language_segments:
+                all_results.setdefault(language, []).append(segment_result)
+                done.add((language, segment_result["start"], segment_result.get("speaker")))
+                if on_segment is not None:
+                    on_segment(language, segment_result)
+        done_positions = {(start, speaker) for _, start, speaker in done}
+        if done:
+            logger.info(f"Resuming with {len(done)} finished segments")
 
         device = 'cuda' if torch.cuda.is_available() else 'cpu'
         use_fp16 = device == 'cuda'
@@ -175,57 +500,106 @@ class TranscriptionService:
         model_name = getattr(model, 'name', str(type(model)))
         logger.info(f"Using model: {model_name}")
 
-        for i, (start_sample, segment) in enumerate(segments):
-            logger.info(f"Processing segment {i + 1}/{len(segments)}")
+        decode_options = TranscriptionService._window_decode_options(model, focus_prompt) \
+            if features is not None else None
+
+        processed = 0
+        for i, (start_sample, segment, speaker) in enumerate(segments):
+            if cancel_token is not None and cancel_token.cancelled():
+                break
             start_time = start_sample / sample_rate
 
+            segment_languages = languages
+            if done:
+                if pick_language is not None:
+                    # The language is chosen per segment, so any finished result covers the position
+                    if (start_time, speaker) in done_positions:
+                        continue
+                else:
+                    segment_languages = [lang for lang in languages if (lang, start_time, speaker) not in done]
+                    if not segment_languages:
+                        continue
+
+            processed += 1
+            logger.info(f"Processing segment {i + 1}")
+
             if use_fp16 and i > 0:  # Skip first segment as memory was likely cleaned before
                 try:
                     torch.cuda.empty_cache()
                 except Exception as e:
                     logger.warning(f"Error cleaning GPU cache: {str(e)}")
 
-            # Process for each language
-            for lang_idx, language in enumerate(languages):
+            audio_features = None
+            if features is not None:
                 try:
-                    cfg = TranscriptionConfig()
-                    options = {
-                        "language": language,
-                        "task": cfg.get('task', 'transcribe'),
-                        "temperature": cfg.get('temperature', 0.0),
-                        "beam_size": cfg.get('beam_size', 1),
-                        "best_of": cfg.get('best_of', 1),
-                        "max_initial_timestamp": cfg.get('max_initial_timestamp', 1.0),
-                        "word_timestamps": cfg.get('word_timestamps', False),
-                        "condition_on_previous_text": cfg.get('condition_on_previous_text', False),
-                        "no_speech_threshold": cfg.get('no_speech_threshold', 0.6),
-                        "compression_ratio_threshold": cfg.get('compression_ratio_threshold', 2.4),
-                        "fp16": use_fp16,
-                        "initial_prompt": focus_prompt,
-                    }
+                    mel = features.log_mel(start_sample, start_sample + len(segment))
+                    audio_features = encode_mel(model, mel)
+                except Exception as e:
+                    logger.error(f"Could not encode segment {i + 1} from shared features: {str(e)}")
 
-                    with torch.no_grad():
-                        result = model.transcribe(segment, **options)
+            if pick_language is not None:
+                try:
+                    segment_languages = [pick_language(segment, audio_features)]
+                except Exception as e:
+                    # Let Whisper identify the language itself while decoding
+                    logger.error(f"Language identification failed for segment {i + 1}: {str(e)}")
+                    segment_languages = [None]
+
+            # Process for each language
+            for lang_idx, language in enumerate(segment_languages):
+                if lang_idx > 0 and cancel_token is not None and cancel_token.cancelled():
+                    break
+                try:
+                    if audio_features is not None:
+                        result = TranscriptionService._decode_window(model, audio_features, language, decode_options)
+                    else:
+                        cfg = TranscriptionConfig()
+                        options = {
+                            "language": language,
+                            "task": cfg.get('task', 'transcribe'),
+                            "temperature": TranscriptionService._temperatures(),
+                            "beam_size": cfg.get('beam_size', 1),
+                            "best_of": cfg.get('best_of', 1),
+                            "max_initial_timestamp": cfg.get('max_initial_timestamp', 1.0),
+                            "word_timestamps": cfg.get('word_timestamps', False),
+                            "condition_on_previous_text": cfg.get('condition_on_previous_text', False),
+                            "no_speech_threshold": cfg.get('no_speech_threshold', 0.6),
+                            "compression_ratio_threshold": cfg.get('compression_ratio_threshold', 2.4),
+                            "logprob_threshold": cfg.get('logprob_threshold', -1.0),
+                            "fp16": use_fp16,
+                            "initial_prompt": focus_prompt,
+                        }
+
+                        with torch.no_grad():
+                            result = model.transcribe(segment, **options)
 
                     # Create segment result with timing info
                     segment_result = TranscriptionService._create_segment_result(
                         result, start_time, segment, sample_rate
                     )
+                    if speaker is not None:
+                        segment_result["speaker"] = speaker
 
-                    all_results[language].append(segment_result)
+                    if language is None:
+                        language = LANGUAGES.get(result.get("language"), "unknown").title()
+                    all_results.setdefault(language, []).append(segment_result)
 
                     del result
 
                 except Exception as e:
                     logger.error(f"Error processing segment {i + 1} for language {language}: {str(e)}")
                     # Add empty segment to maintain sequence
-                    all_results[language].append({
+                    segment_result = {
                         "text": "",
                         "start": start_time,
                         "end": start_time + (len(segment) / sample_rate),
                         "confidence": 0,
                         "error": str(e)
-                    })
+                    }
+                    if speaker is not None:
+                        segment_result["speaker"] = speaker
+                    language = language or "Unknown"
+                    all_results.setdefault(language, []).append(segment_result)
 
                     if use_fp16:
                         try:
@@ -233,6 +607,14 @@ class TranscriptionService:
                         except Exception as cleanup_error:
                             logger.warning(f"Error cleaning GPU cache after error: {str(cleanup_error)}")
 
+                if on_segment is not None:
+                    on_segment(language, segment_result)
+
+        if processed == 0:
+            logger.warning("No segments to process")
+        else:
+            logger.info(f"Processed {processed} segments")
+
         if use_fp16:
             try:
                 torch.cuda.empty_cache()
@@ -242,6 +624,155 @@ class TranscriptionService:
 
         return all_results
 
+    @staticmethod
+    def _is_short_clip(audio: Any, labels: Optional[List[str]]) -> bool:
+        """Whether the fast path applies: mono audio within Whisper's 30 s window, no word timestamps."""
+        cfg = TranscriptionConfig()
+        return (
+            labels is None
+            and cfg.get('short_clip_fast_path', True)
+            and not cfg.get('word_timestamps', False)
+            and 0 < len(audio) <= whisper.audio.N_SAMPLES
+        )
+
+    @staticmethod
+    def _temperatures() -> Tuple[float, ...]:
+        """Decoding temperatures: the configured one, then the fallbacks up to 1.0 as in Whisper's CLI."""
+        cfg = TranscriptionConfig()
+        temperature = cfg.get('temperature', 0.0)
+        increment = cfg.get('temperature_increment_on_fallback', 0.2)
+        if increment <= 0 or temperature >= 1.0:
+            return (temperature,)
+        steps = int((1.0 - temperature) / increment + 1e-6)
+        return tuple(round(temperature + i * increment, 2) for i in range(steps + 1))
+
+    @staticmethod
+    def _window_decode_options(model: Any, focus_prompt: str) -> Dict[str, Any]:
+        """DecodingOptions arguments (except temperature) for single-window decoding, as transcribe() uses them."""
+        cfg = TranscriptionConfig()
+        options = {
+            "task": cfg.get('task', 'transcribe'),
+            "without_timestamps": True,
+            "fp16": torch.device(model.device).type == 'cuda',
+            "prompt": focus_prompt or None,
+            "best_of": cfg.get('best_of', 1),
+        }
+        if cfg.get('beam_size', 1) > 1:
+            options["beam_size"] = cfg.get('beam_size', 1)
+        return options
+
+    @staticmethod
+    def _decode_window(
+            model: Any,
+            audio_features: torch.Tensor,
+            language: Optional[str],
+            options: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Decode one 30-second window from its encoder output.
+
+        Like transcribe(), a decode that is too repetitive (compression ratio) or too unlikely
+        (average logprob) is retried at the next fallback temperature, and Whisper's no-speech
+        gating is applied. Returns a transcribe()-style dict with text, avg_logprob and language.
+        """
+        cfg = TranscriptionConfig()
+        no_speech_threshold = cfg.get('no_speech_threshold', 0.6)
+        logprob_threshold = cfg.get('logprob_threshold', -1.0)
+        compression_ratio_threshold = cfg.get('compression_ratio_threshold', 2.4)
+        if language is None and not getattr(model, 'is_multilingual', True):
+            # English-only models have no language tokens to detect with, as in transcribe()
+            language = 'en'
+
+        decoded = None
+        for temperature in TranscriptionService._temperatures():
+            kwargs = dict(options)
+            # Beam search only applies to greedy decoding, best_of only to sampling
+            if temperature > 0:
+                kwargs.pop("beam_size", None)
+            else:
+                kwargs.pop("best_of", None)
+
+            with torch.no_grad():
+                decoded = model.decode(
+                    audio_features, whisper.DecodingOptions(language=language, temperature=temperature, **kwargs)
+                )[0]
+
+            needs_fallback = (
+                (compression_ratio_threshold is not None and decoded.compression_ratio > compression_ratio_threshold)
+                or (logprob_threshold is not None and decoded.avg_logprob < logprob_threshold)
+            )
+            if no_speech_threshold is not None and decoded.no_speech_prob > no_speech_threshold:
+                # Silence: a retry would not find speech either
+                needs_fallback = False
+            if not needs_fallback:
+                break
+
+        text = decoded.text
+        if no_speech_threshold is not None and decoded.no_speech_prob > no_speech_threshold \
+                and (logprob_threshold is None or decoded.avg_logprob < logprob_threshold):
+            text = ""
+        return {"text": text, "avg_logprob": decoded.avg_logprob, "language": decoded.language}
+
+    @staticmethod
+    def _transcribe_short_clip(
+            audio: Any,
+            model: Any,
+            languages: List[str],
+            focus_prompt: str,
+            sample_rate: int,
+            on_segment: Optional[SegmentCallback] = None,
+            detector: Optional[AutoLanguage] = None,
+            cancel_token: Optional[CancellationToken] = None,
+            features: Optional[SpectralFeatures] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Transcribe a clip shorter than 30 seconds with a single decode call per language.
+
+        The encoder runs once, on the shared log-mel when features are given, and its output is
+        shared by language identification and by the decode of every language.
+        """
+        options = TranscriptionService._window_decode_options(model, focus_prompt)
+        audio_features = encode_mel(model, features.log_mel()) if features is not None \
+            else encode_audio(model, audio)
+
+        if detector is not None:
+            try:
+                probabilities = detector.detect_features(audio_features)
+                detector.language = max(probabilities, key=probabilities.get)
+                logger.info(f"Detected language {detector.language}: {detector.probabilities()}")
+                languages = [detector.language]
+            except Exception as e:
+                # Let Whisper identify the language itself while decoding
+                logger.error(f"Language identification failed for short clip: {str(e)}")
+                languages = [None]
+
+        all_results = {lang: [] for lang in languages if lang is not None}
+        for lang_idx, language in enumerate(languages):
+            if lang_idx > 0 and cancel_token is not None and cancel_token.cancelled():
+                break
+            result = {}
+            try:
+                result = TranscriptionService._decode_window(model, audio_features, language, options)
+                segment_result = TranscriptionService._create_segment_result(result, 0.0, audio, sample_rate)
+            except Exception as e:
+                logger.error(f"Error processing short clip for language {language}: {str(e)}")
+                segment_result = {
+                    "text": "",
+                    "start": 0.0,
+                    "end": len(audio) / sample_rate,
+                    "confidence": 0,
+                    "error": str(e)
+                }
+
+            if language is None:
+                language = LANGUAGES.get(result.get("language"), "unknown").title()
+            all_results.setdefault(language, []).append(segment_result)
+            if on_segment is not None:
+                on_segment(language, segment_result)
+
+        logger.info(f"Short clip decoded in {len(all_results)} languages")
+        return all_results
+
     @staticmethod
     def _create_segment_result(
             result: Dict[str, Any],
@@ -275,13 +806,29 @@ class TranscriptionService:
             all_results: Dict[str, List[Dict[str, Any]]],
             languages: List[str]
     ) -> Dict[str, str]:
-        """Combine segment transcriptions into full text for each language."""
+        """
+        Combine segment transcriptions into full text for each language.
+
+        Speaker-tagged segments become one "speaker: text" line per turn.
+        """
         transcriptions = {}
 
         for lang in languages:
-            full_text = " ".join([segment.get("text", "") for segment in all_results[lang]])
-            full_text = " ".join(full_text.split())
-            transcriptions[lang] = full_text
+            turns: List[Tuple[Optional[str], List[str]]] = []
+            for segment in all_results[lang]:
+                speaker = segment.get("speaker")
+                if not turns or turns[-1][0] != speaker:
+                    turns.append((speaker, []))
+                turns[-1][1].append(segment.get("text", ""))
+
+            lines = []
+            for speaker, texts in turns:
+                text = " ".join(" ".join(texts).split())
+                if speaker is None:
+                    lines.append(text)
+                elif text:
+                    lines.append(f"{speaker}: {text}")
+            transcriptions[lang] = ("\n" if any(speaker for speaker, _ in turns) else " ").join(lines)
 
         logger.info("Segments combined into full transcriptions")
         return transcriptions
@@ -1,10 +1,18 @@
 from flask import current_app
+import hashlib
+import io
 import os
+import re
+import struct
+import threading
 import torch
 import torchaudio
 import logging
-import uuid
 from pathlib import Path
+
+from app.config import TTSConfig
+from app.tts_storage import TTSStorage
+
 try:
     import omegaconf
 except ImportError:
@@ -14,18 +22,30 @@ class TTSService:
     """
     Text-to-Speech service using Silero TTS models.
     Silero TTS is chosen because it's lightweight and can run completely locally without internet connection.
+
+    One model is kept loaded per language, and synthesized audio is cached on disk under a
+    content-addressed name so repeated phrases are served without running the model.
     """
 
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.model = None
-        self.current_language = None
+        self.models = {}
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.models_dir = os.path.join(os.getcwd(), 'tts_models')
         self.output_dir = os.path.join(os.getcwd(), 'static', 'audio')
-
-        # Create output directory if it doesn't exist
-        os.makedirs(self.output_dir, exist_ok=True)
+        self.sample_rate = TTSConfig().get('sample_rate', 48000)
+        self.stream_max_chars = TTSConfig().get('stream_max_chars', 800)
+
+        # Generated files expire after a TTL and the directory is kept under a size limit
+        config = TTSConfig()
+        self.storage = TTSStorage(
+            self.output_dir,
+            ttl_seconds=config.get('file_ttl_seconds', 7 * 24 * 3600),
+            max_bytes=config.get('cache_max_mb', 512) * 1024 ** 2,
+            sweep_interval=config.get('sweep_interval_seconds', 300),
+            memory_max_bytes=config.get('memory_cache_mb', 0) * 1024 ** 2
+        )
+        self.storage.start()
 
         # Available voices for supported languages with their Silero speaker IDs
         self.voices = {
@@ -44,106 +64,198 @@ class TTSService:
             'en': {'repo_id': 'snakers4/silero-models', 'model': 'silero_tts_en'}
         }
 
+        # Loading one language must not block synthesis in another
+        self._model_locks = {language: threading.Lock() for language in self.voices}
+
         self.logger.info(f"TTSService initialized. Using device: {self.device}")
 
+    def _hub_load(self, language, **kwargs):
+        """Load the Silero model for a language with torch.hub."""
+        config = self.model_configs[language]
+        if language == 'ua':
+            # For Ukrainian, use the default model with speaker
+            return torch.hub.load(model=config['model'], language='ua', speaker='mykyta_v2', **kwargs)
+        # For English, use the English-specific model
+        return torch.hub.load(model=config['model'], language='en', **kwargs)
+
     def load_model(self, language='ua'):
         """Load the Silero TTS model for the specified language if not already loaded."""
-        # If model is already loaded for the requested language, return True
-        if self.model is not None and self.current_language == language:
+        # Validate language
+        if language not in self.voices:
+            self.logger.error(f"Language {language} not in the supported list: {list(self.voices.keys())}")
+            return False
+
+        if language in self.models:
             self.logger.info(f"Model already loaded for language: {language}")
             return True
 
-        # Reset model to ensure we don't use a partially loaded model
-        self.model = None
-        self.current_language = None
+        with self._model_locks[language]:
+            # Another request may have loaded it while we waited
+            if language in self.models:
+                return True
 
-        try:
-            self.logger.info(f"Loading Silero TTS model for language: {language}")
+            try:
+                self.logger.info(f"Loading Silero TTS model for language: {language}")
 
-            # Check if omegaconf is available
-            if omegaconf is None:
-                self.logger.error("Failed to load Silero TTS model: 'omegaconf' module is missing. Please install it with 'pip install omegaconf'")
-                return False
+                # Check if omegaconf is available
+                if omegaconf is None:
+                    self.logger.error("Failed to load Silero TTS model: 'omegaconf' module is missing. Please install it with 'pip install omegaconf'")
+                    return False
 
-            # Validate language
-            if language not in self.voices:
-                self.logger.error(f"Language {language} not in the supported list: {list(self.voices.keys())}")
-                return False
+                try:
+                    model = self._hub_load(language, repo_or_dir=self.model_configs[language]['repo_id'])
+                except Exception as e:
+                    self.logger.error(f"Failed to load model from torch hub: {str(e)}")
+                    # Try loading from local cache
+                    cache_dir = os.path.expanduser("~/.cache/torch/hub/snakers4_silero-models_master")
+                    if os.path.exists(cache_dir):
+                        try:
+                            model = self._hub_load(language, repo_or_dir=cache_dir, source='local')
+                        except Exception as e:
+                            self.logger.error(f"Failed to load model from local cache: {str(e)}")
+                            return False
+                    else:
+                        self.logger.error("Local cache directory not found")
+                        return False
 
-            try:
-                # Get model configuration for the language
-                config = self.model_configs[language]
-
-                # Load model based on language
-                if language == 'ua':
-                    # For Ukrainian, use the default model with speaker
-                    model = torch.hub.load(
-                        repo_or_dir=config['repo_id'],
-                        model=config['model'],
-                        language='ua',
-                        speaker='mykyta_v2'
-                    )
-                else:  # English
-                    # For English, use the English-specific model
-                    model = torch.hub.load(
-                        repo_or_dir=config['repo_id'],
-                        model=config['model'],
-                        language='en'
-                    )
+                if model is None:
+                    self.logger.error("Model loading returned None")
+                    return False
 
-            except Exception as e:
-                self.logger.error(f"Failed to load model from torch hub: {str(e)}")
-                # Try loading from local cache
-                cache_dir = os.path.expanduser("~/.cache/torch/hub/snakers4_silero-models_master")
-                if os.path.exists(cache_dir):
-                    try:
-                        if language == 'ua':
-                            model = torch.hub.load(
-                                repo_or_dir=cache_dir,
-                                model=config['model'],
-                                language='ua',
-                                speaker='mykyta_v2',
-                                source='local'
-                            )
-                        else:  # English
-                            model = torch.hub.load(
-                                repo_or_dir=cache_dir,
-                                model=config['model'],
-                                language='en',
-                                source='local'
-                            )
-                    except Exception as e:
-                        self.logger.error(f"Failed to load model from local cache: {str(e)}")
-                        return False
+                # Handle the case where torch.hub.load returns a tuple
+                if isinstance(model, tuple):
+                    self.logger.info("Model returned as tuple, extracting model object")
+                    # Typically, the first element in the tuple is the model
+                    model_obj = model[0]
                 else:
-                    self.logger.error("Local cache directory not found")
-                    return False
+                    model_obj = model
 
-            if model is None:
-                self.logger.error("Model loading returned None")
+                self.models[language] = model_obj.to(self.device)
+                self.logger.info(f"Silero TTS model loaded successfully for language: {language}")
+                return True
+            except Exception as e:
+                self.logger.error(f"Failed to load Silero TTS model: {str(e)}")
                 return False
 
-            # Handle the case where torch.hub.load returns a tuple
-            if isinstance(model, tuple):
-                self.logger.info("Model returned as tuple, extracting model object")
-                # Typically, the first element in the tuple is the model
-                model_obj = model[0]
-            else:
-                model_obj = model
-
-            self.model = model_obj.to(self.device)
-            self.current_language = language
-            self.logger.info(f"Silero TTS model loaded successfully for language: {language}")
-            return True
-        except Exception as e:
-            self.logger.error(f"Failed to load Silero TTS model: {str(e)}")
-            self.model = None  # Reset model on error
-            return False
+    def resolve_speaker(self, language, voice=None):
+        """Map a public voice name to the Silero speaker used for synthesis."""
+        if language == 'en':
+            return 'en_0'  # Use default English speaker
+
+        if voice is None:
+            return list(self.voices[language].values())[0]
+        if voice not in self.voices[language]:
+            self.logger.warning(f"Voice {voice} not found for language {language}, using default voice")
+            return list(self.voices[language].values())[0]
+        return self.voices[language][voice]
+
+    @staticmethod
+    def cache_key(text, language, speaker, sample_rate):
+        """Content address of a synthesis request."""
+        payload = '\0'.join([text, language, speaker, str(sample_rate)])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def synthesize(self, text, language, speaker):
+        """Run the model for one piece of text and return a (1, samples) tensor."""
+        if not self.load_model(language):
+            raise Exception("Failed to load TTS model")
+
+        model = self.models.get(language)
+        if model is None:
+            self.logger.error("Model is None after successful load_model call")
+            raise Exception("TTS model is not loaded properly")
+
+        with torch.no_grad():
+            audio = model.apply_tts(
+                text=text,
+                speaker=speaker,
+                sample_rate=self.sample_rate
+            )
+
+        # Ensure audio is 2D tensor (1, samples)
+        if len(audio.shape) == 1:
+            audio = audio.unsqueeze(0)
+        return audio
+
+    def split_sentences(self, text):
+        """
+        Split text into sentences for incremental synthesis.
+
+        Sentences longer than the Silero input limit (TTS_STREAM_MAX_CHARS) are further split
+        on whitespace.
+        """
+        max_chars = max(1, self.stream_max_chars)
+        pieces = []
+        for sentence in re.split(r'(?<=[.!?…])\s+|\n+', text):
+            sentence = sentence.strip()
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(' ', 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(sentence[:cut].strip())
+                sentence = sentence[cut:].strip()
+            if sentence:
+                pieces.append(sentence)
+        return pieces
+
+    def _wav_header(self):
+        """Header of a mono 16-bit PCM WAV stream whose length is not known up front."""
+        unknown_size = 0xFFFFFFFF
+        byte_rate = self.sample_rate * 2
+        return b''.join([
+            b'RIFF', struct.pack('<I', unknown_size), b'WAVE',
+            b'fmt ', struct.pack('<IHHIIHH', 16, 1, 1, self.sample_rate, byte_rate, 2, 16),
+            b'data', struct.pack('<I', unknown_size),
+        ])
+
+    @staticmethod
+    def _pcm16(audio):
+        """Raw 16-bit PCM bytes of a (1, samples) float tensor."""
+        pcm = (audio.squeeze(0).clamp(-1.0, 1.0) * 32767).to(torch.int16)
+        return pcm.cpu().numpy().tobytes()
+
+    def _encode_mp3(self, audio):
+        """Encode a (1, samples) float tensor as one MP3 file."""
+        buffer = io.BytesIO()
+        torchaudio.save(buffer, audio.cpu(), sample_rate=self.sample_rate, format="mp3")
+        return buffer.getvalue()
+
+    def synthesize_text(self, text, language, speaker):
+        """Synthesize text of any length sentence by sentence and return one (1, samples) tensor."""
+        pieces = [self.synthesize(sentence, language, speaker) for sentence in self.split_sentences(text)]
+        if not pieces:
+            raise ValueError("Text contains nothing to synthesize")
+        return pieces[0] if len(pieces) == 1 else torch.cat(pieces, dim=1)
+
+    def stream_speech(self, text, language='ua', voice=None):
+        """
+        Synthesize text sentence by sentence, yielding WAV audio as each sentence is ready.
+
+        Nothing is written to disk. The stream starts with a header of unknown length followed
+        by 16-bit PCM, so the sentences play back without gaps.
+
+        Args:
+            text (str): The text to convert to speech
+            language (str): The language code ('ua' for Ukrainian, 'en' for English)
+            voice (str, optional): The voice ID to use
+
+        Yields:
+            bytes: WAV header, then PCM audio
+        """
+        speaker = self.resolve_speaker(language, voice)
+        sentences = self.split_sentences(text)
+        self.logger.info(f"Streaming speech for {len(sentences)} sentences using speaker {speaker}")
+
+        yield self._wav_header()
+        for sentence in sentences:
+            yield self._pcm16(self.synthesize(sentence, language, speaker))
 
     def text_to_speech(self, text, language='ua', voice=None):
         """
         Convert text to speech and return the path to the generated audio file.
 
+        Identical requests (text, language, speaker, sample rate) are served from the
+        on-disk cache without running the model.
+
         Args:
             text (str): The text to convert to speech
             language (str): The language code ('ua' for Ukrainian, 'en' for English)
@@ -157,67 +269,20 @@ class TTSService:
             self.logger.error(f"Language {language} not in the supported list: {list(self.voices.keys())}")
             raise Exception(f"Language not in the supported list {list(self.voices.keys())}")
 
-        # Try to load the model
-        if not self.load_model(language):
-            raise Exception("Failed to load TTS model")
+        speaker = self.resolve_speaker(language, voice)
+        filename = f"{self.cache_key(text, language, speaker, self.sample_rate)}.mp3"
 
-        # Double-check that the model is actually loaded
-        if self.model is None:
-            self.logger.error("Model is None after successful load_model call")
-            raise Exception("TTS model is not loaded properly")
-
-        # Get the actual Silero speaker ID
-        if voice is None:
-            speaker = list(self.voices[language].values())[0]
-        else:
-            if voice not in self.voices[language]:
-                self.logger.warning(f"Voice {voice} not found for language {language}, using default voice")
-                speaker = list(self.voices[language].values())[0]
-            else:
-                speaker = self.voices[language][voice]
+        if self.storage.touch(filename):
+            self.logger.info(f"TTS cache hit: {filename}")
+            return os.path.join('audio', filename)
 
         try:
-            # Generate a unique filename
-            filename = f"{uuid.uuid4()}.mp3"
-            output_path = os.path.join(self.output_dir, filename)
-
             self.logger.info(f"Generating speech for text: {text[:50]}... using speaker {speaker}")
-
-            # Generate speech
-            sample_rate = 48000
-
-            # Ensure model is loaded
-            if self.model is None:
-                self.logger.error("Model is None, cannot generate speech")
-                raise Exception("TTS model is not loaded properly")
-
-            # Generate speech using the model
-            with torch.no_grad():
-                if language == 'ua':
-                    audio = self.model.apply_tts(
-                        text=text,
-                        speaker=speaker,
-                        sample_rate=sample_rate
-                    )
-                else:  # English
-                    audio = self.model.apply_tts(
-                        text=text,
-                        speaker='en_0',  # Use default English speaker
-                        sample_rate=sample_rate
-                    )
-
-            # Ensure audio is 2D tensor (1, samples)
-            if len(audio.shape) == 1:
-                audio = audio.unsqueeze(0)
+            # Long text is synthesized in pieces within the model's input limit
+            audio = self.synthesize_text(text, language, speaker)
 
             # Save as MP3
-            torchaudio.save(
-                output_path,
-                audio,
-                sample_rate=sample_rate,
-                format="mp3"
-            )
-
+            output_path = self.storage.store(filename, self._encode_mp3(audio))
             self.logger.info(f"Speech generated successfully. Saved to {output_path}")
 
             # Return the relative path for the frontend
@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from logging import getLogger
+from typing import Optional
+
+logger = getLogger(__name__)
+
+
+class TTSStorage:
+    """
+    Lifecycle manager for generated TTS files.
+
+    Files older than the TTL (by last use) are deleted and the directory is trimmed to a
+    total size, least recently used first, by a background sweeper thread. Recently written
+    files can also be kept in memory and served without touching the disk.
+    """
+
+    def __init__(
+            self,
+            directory: str,
+            ttl_seconds: int = 7 * 24 * 3600,
+            max_bytes: int = 512 * 1024 ** 2,
+            sweep_interval: int = 300,
+            memory_max_bytes: int = 0,
+            suffix: str = '.mp3'
+    ):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.memory_max_bytes = memory_max_bytes
+        self.suffix = suffix
+
+        self._memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._sweeper = None
+        self._stop = threading.Event()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, filename: str) -> str:
+        return os.path.join(self.directory, os.path.basename(filename))
+
+    def touch(self, filename: str) -> bool:
+        """Mark a stored file as recently used; False if it is missing or expired."""
+        with self._lock:
+            if filename in self._memory:
+                self._memory.move_to_end(filename)
+
+        path = self.path_for(filename)
+        try:
+            if self.ttl_seconds > 0 and time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                return False
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            self._forget(filename)
+            return False
+
+    def store(self, filename: str, data: bytes) -> str:
+        """Write a file atomically (and keep it in memory when enabled). Returns its path."""
+        path = self.path_for(filename)
+        tmp_path = os.path.join(self.directory, f".{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._remember(filename, data)
+        return path
+
+    def read(self, filename: str) -> Optional[bytes]:
+        """Return file contents from memory, falling back to disk; None if not stored."""
+        with self._lock:
+            data = self._memory.get(filename)
+            if data is not None:
+                self._memory.move_to_end(filename)
+                return data
+
+        try:
+            with open(self.path_for(filename), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        self._remember(filename, data)
+        return data
+
+    def _remember(self, filename: str, data: bytes) -> None:
+        if self.memory_max_bytes <= 0 or len(data) > self.memory_max_bytes:
+            return
+
+        with self._lock:
+            previous = self._memory.pop(filename, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._memory[filename] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.memory_max_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _forget(self, filename: str) -> None:
+        with self._lock:
+            data = self._memory.pop(filename, None)
+            if data is not None:
+                self._memory_bytes -= len(data)
+
+    def sweep(self) -> int:
+        """
+        Delete expired files, then trim the directory to max_bytes by last use.
+
+        Returns:
+            int: Number of files removed
+        """
+        with self._sweep_lock:
+            now = time.time()
+            removed = 0
+            try:
+                files = []
+                for entry in os.scandir(self.directory):
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    # Leftover temporary files from interrupted writes
+                    if entry.name.endswith('.tmp') and now - stat.st_mtime > 3600:
+                        os.remove(entry.path)
+                        continue
+                    if entry.name.endswith(self.suffix):
+                        files.append((stat.st_mtime, stat.st_size, entry.name))
+
+                files.sort()
+                total = sum(size for _, size, _ in files)
+                for mtime, size, name in files:
+                    expired = self.ttl_seconds > 0 and now - mtime > self.ttl_seconds
+                    over_size = self.max_bytes > 0 and total > self.max_bytes
+                    if not (expired or over_size):
+                        break
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        pass
+                    self._forget(name)
+                    total -= size
+                    removed += 1
+            except OSError as e:
+                logger.warning(f"Failed to sweep TTS storage in {self.directory}: {e}")
+
+            if removed:
+                logger.info(f"TTS storage sweep removed {removed} files, {total / 1024 ** 2:.1f} MB remain")
+            return removed
+
+    def _run_sweeper(self) -> None:
+        # First pass right away so a backlog left by a previous run is cleared at startup
+        while True:
+            self.sweep()
+            if self._stop.wait(self.sweep_interval):
+                return
+
+    def start(self) -> None:
+        """Start the background sweeper (idempotent)."""
+        with self._lock:
+            if self._sweeper is not None or self.sweep_interval <= 0:
+                return
+            self._sweeper = threading.Thread(target=self._run_sweeper, name='tts-storage-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,212 @@
+import hashlib
+import heapq
+import hmac
+import itertools
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.config import WebhookConfig
+
+logger = getLogger(__name__)
+
+# Responses worth retrying; any other non-2xx status is a permanent failure
+_RETRY_STATUSES = frozenset((408, 425, 429, 500, 502, 503, 504))
+
+
+class _Delivery:
+    """One POST to a callback URL carrying one result, or several batched ones."""
+
+    def __init__(self, url: str, bodies: List[bytes], due: float = 0.0):
+        self.url = url
+        self.bodies = bodies
+        self.due = due
+        self.attempt = 0
+
+    def payload(self) -> bytes:
+        if len(self.bodies) == 1:
+            return self.bodies[0]
+        return b'{"batch": [' + b', '.join(self.bodies) + b']}'
+
+
+class WebhookDispatcher:
+    """
+    Delivers results to client callback URLs in the background.
+
+    Deliveries are POSTed as JSON over a pooled HTTP session by a small thread pool. Failed
+    ones (connection errors, timeouts, 408/429/5xx) are retried with exponential backoff and
+    jitter, honouring Retry-After. Deliveries waiting to be sent or retried are bounded by
+    WEBHOOK_QUEUE_SIZE; beyond it new results are dropped with an error (they can still be
+    fetched from the job API). With WEBHOOK_BATCH_MAX_ITEMS > 1, small results for the same
+    URL arriving within WEBHOOK_BATCH_WINDOW_MS are sent together as {"batch": [...]}.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if not cls._instance:
+            with cls._lock:
+                if not cls._instance:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._init()
+        return cls._instance
+
+    def _init(self) -> None:
+        config = WebhookConfig()
+        self.timeout = config.get('timeout', 10)
+        self.max_attempts = max(1, config.get('max_attempts', 6))
+        self.backoff_base = config.get('backoff_base', 1.0)
+        self.backoff_max = config.get('backoff_max', 300)
+        self.queue_size = max(1, config.get('queue_size', 1000))
+        self.batch_max_items = max(1, config.get('batch_max_items', 1))
+        self.batch_max_bytes = config.get('batch_max_bytes', 16 * 1024)
+        self.batch_window = config.get('batch_window_ms', 500) / 1000.0
+        self._secret = config.get('secret', '').encode('utf-8')
+        self._workers = max(1, config.get('per_host_connections', 4))
+
+        self._session: Optional[requests.Session] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._cond = threading.Condition()
+        self._ready: List[_Delivery] = []
+        self._batches: Dict[str, _Delivery] = {}
+        self._retries: List[Tuple[float, int, _Delivery]] = []
+        self._sequence = itertools.count()
+        # Results accepted and not yet delivered or given up on
+        self._outstanding = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def get_session(self) -> requests.Session:
+        """Pooled session; retries are done here with backoff, not by urllib3 (POST is not idempotent)."""
+        with self._lock:
+            if self._session is None:
+                config = WebhookConfig()
+                adapter = HTTPAdapter(
+                    pool_connections=config.get('pool_connections', 10),
+                    pool_maxsize=self._workers,
+                    max_retries=0,
+                )
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
+
+    def send(self, url: str, payload: Dict[str, Any]) -> bool:
+        """
+        Queue a result for delivery.
+
+        Returns:
+            False when the queue is full and the result was dropped
+        """
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        with self._cond:
+            if self._outstanding >= self.queue_size:
+                logger.error(f"Webhook queue full ({self.queue_size}), dropping delivery to {url}")
+                return False
+            self._outstanding += 1
+            self._ensure_started()
+
+            if self.batch_max_items > 1 and len(body) <= self.batch_max_bytes:
+                batch = self._batches.get(url)
+                if batch is None:
+                    batch = self._batches[url] = _Delivery(url, [], time.monotonic() + self.batch_window)
+                batch.bodies.append(body)
+                if len(batch.bodies) >= self.batch_max_items:
+                    self._ready.append(self._batches.pop(url))
+            else:
+                self._ready.append(_Delivery(url, [body]))
+            self._cond.notify()
+        return True
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='webhook')
+            self._thread = threading.Thread(target=self._schedule, name='webhook-scheduler', daemon=True)
+            self._thread.start()
+
+    def _schedule(self) -> None:
+        """Hand ready deliveries, expired batch windows and due retries to the senders."""
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                for url, batch in list(self._batches.items()):
+                    if batch.due <= now:
+                        self._ready.append(self._batches.pop(url))
+                while self._retries and self._retries[0][0] <= now:
+                    self._ready.append(heapq.heappop(self._retries)[2])
+
+                if not self._ready:
+                    deadlines = [batch.due for batch in self._batches.values()]
+                    if self._retries:
+                        deadlines.append(self._retries[0][0])
+                    self._cond.wait(timeout=max(0.0, min(deadlines) - now) if deadlines else None)
+                    continue
+                ready, self._ready = self._ready, []
+
+            for delivery in ready:
+                self._executor.submit(self._deliver, delivery)
+
+    def _headers(self, body: bytes, delivery: _Delivery) -> Dict[str, str]:
+        headers = {
+            'Content-Type': 'application/json',
+            'X-Webhook-Attempt': str(delivery.attempt),
+        }
+        if len(delivery.bodies) > 1:
+            headers['X-Webhook-Batch-Size'] = str(len(delivery.bodies))
+        if self._secret:
+            signature = hmac.new(self._secret, body, hashlib.sha256).hexdigest()
+            headers['X-Webhook-Signature'] = f"sha256={signature}"
+        return headers
+
+    def _deliver(self, delivery: _Delivery) -> None:
+        """Send one delivery; it always ends either done or scheduled for a retry."""
+        delivery.attempt += 1
+        retry_after = None
+        try:
+            body = delivery.payload()
+            response = self.get_session().post(
+                delivery.url, data=body, headers=self._headers(body, delivery), timeout=self.timeout
+            )
+            if 200 <= response.status_code < 300:
+                logger.info(f"Delivered {len(delivery.bodies)} result(s) to {delivery.url}")
+                self._done(delivery)
+                return
+            if response.status_code not in _RETRY_STATUSES:
+                logger.error(f"Webhook {delivery.url} rejected the delivery with HTTP {response.status_code}")
+                self._done(delivery)
+                return
+            reason = f"HTTP {response.status_code}"
+            try:
+                retry_after = min(self.backoff_max, max(0.0, float(response.headers.get('Retry-After', ''))))
+            except ValueError:
+                # Absent, or an HTTP date: use the backoff
+                retry_after = None
+        except requests.exceptions.RequestException as e:
+            reason = str(e)
+        except Exception as e:
+            # Anything else must not leak the delivery's place in the queue
+            logger.exception(f"Unexpected error delivering webhook to {delivery.url}: {e}")
+            reason = f"{type(e).__name__}: {e}"
+
+        if delivery.attempt >= self.max_attempts:
+            logger.error(f"Giving up on webhook {delivery.url} after {delivery.attempt} attempts: {reason}")
+            self._done(delivery)
+            return
+
+        delay = retry_after if retry_after is not None else \
+            min(self.backoff_max, self.backoff_base * 2 ** (delivery.attempt - 1)) * random.uniform(0.5, 1.0)
+        logger.warning(f"Webhook {delivery.url} failed ({reason}), retry {delivery.attempt} in {delay:.1f}s")
+        with self._cond:
+            heapq.heappush(self._retries, (time.monotonic() + delay, next(self._sequence), delivery))
+            self._cond.notify()
+
+    def _done(self, delivery: _Delivery) -> None:
+        with self._cond:
+            self._outstanding -= len(delivery.bodies)
@@ -0,0 +1,98 @@
+"""
+Compare CPU loading modes of the reconstruction model.
+
+Each mode (float32, bfloat16, int8) is measured in a fresh subprocess so peak RSS is
+not shared between runs. Reports load time, generation throughput and peak RSS.
+
+Usage:
+    python benchmarks/reconstruction_cpu_modes.py --model-id google/gemma-2b-it
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_TRANSCRIPTION = (
+    "so um the meeting starts at uh ten and we we need to to discuss the the budget "
+    "for next quarter and also who is going to handle the the new client onboarding"
+)
+
+
+def run_mode(model_id: str, mode: str, new_tokens: int, runs: int) -> dict:
+    """Load the model in one mode and time generation (runs inside the child process)."""
+    os.environ['RECONSTRUCTION_CPU_DTYPE'] = mode
+    os.environ['RECONSTRUCTION_MAX_MODELS'] = '1'
+
+    import torch
+    from app.models import GemmaModelCache
+    from app.text_reconstruction import TextReconstructionService
+
+    cache = GemmaModelCache()
+    start = time.perf_counter()
+    if not cache.load_model(model_id):
+        return {"mode": mode, "error": "load refused or failed"}
+    load_time = time.perf_counter() - start
+
+    model, tokenizer = cache.get_model_and_tokenizer(model_id)
+    prompt = TextReconstructionService.build_prompt(
+        SAMPLE_TRANSCRIPTION, "Fix errors in the text: {transcription}", tokenizer
+    )
+    inputs = tokenizer(prompt, return_tensors="pt")
+
+    timings = []
+    generated = 0
+    with torch.inference_mode():
+        for _ in range(runs):
+            start = time.perf_counter()
+            output = model.generate(**inputs, max_new_tokens=new_tokens, min_new_tokens=new_tokens, do_sample=False)
+            timings.append(time.perf_counter() - start)
+            generated += output.shape[1] - inputs['input_ids'].shape[1]
+
+    return {
+        "mode": mode,
+        "load_seconds": round(load_time, 2),
+        "tokens_per_second": round(generated / sum(timings), 2),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model-id', default='google/gemma-2b-it')
+    parser.add_argument('--modes', default='float32,bfloat16,int8')
+    parser.add_argument('--new-tokens', type=int, default=64)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.model_id, args.child, args.new_tokens, args.runs)))
+        return
+
+    env = dict(os.environ, CUDA_VISIBLE_DEVICES='')
+    print(f"{'mode':<10} {'load s':>8} {'tok/s':>8} {'peak RSS MB':>12}")
+    for mode in args.modes.split(','):
+        completed = subprocess.run(
+            [sys.executable, __file__, '--model-id', args.model_id, '--child', mode,
+             '--new-tokens', str(args.new_tokens), '--runs', str(args.runs)],
+            env=env, capture_output=True, text=True
+        )
+        lines = completed.stdout.strip().splitlines()
+        if completed.returncode != 0 or not lines:
+            print(f"{mode:<10} failed: {completed.stderr.strip().splitlines()[-1:]}")
+            continue
+        result = json.loads(lines[-1])
+        if 'error' in result:
+            print(f"{mode:<10} {result['error']}")
+            continue
+        print(f"{mode:<10} {result['load_seconds']:>8} {result['tokens_per_second']:>8} {result['peak_rss_mb']:>12}")
+
+
+if __name__ == '__main__':
+    main()
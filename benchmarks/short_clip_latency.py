@@ -0,0 +1,99 @@
+"""
+Latency of short clips with and without the single-window fast path.
+
+Cuts clips of the given lengths from an audio file (or uses a synthetic signal) and
+transcribes each several times through TranscriptionService.transcribe_audio, once with
+TRANSCRIPTION_SHORT_CLIP_FAST_PATH disabled and once enabled, reporting p50/p90 latency.
+
+Usage:
+    python benchmarks/short_clip_latency.py --audio sample.mp3 --model base
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import whisper
+
+from app.config import TranscriptionConfig
+from app.transcription import TranscriptionService
+
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+
+
+def synthetic_audio(seconds: float) -> np.ndarray:
+    """Amplitude-modulated harmonics, loud enough to pass the silence checks."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    voice = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((140, 280, 420, 560)))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    return (0.2 * voice * envelope).astype(np.float32)
+
+
+def ready_future(audio: np.ndarray) -> Future:
+    future = Future()
+    future.set_result((audio, None))
+    return future
+
+
+def measure(model, clip: np.ndarray, languages, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        TranscriptionService.transcribe_audio(
+            'benchmark', model, languages, [], audio_future=ready_future(clip)
+        )
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--audio', help='Audio file to cut clips from (default: synthetic signal)')
+    parser.add_argument('--model', default='base')
+    parser.add_argument('--lengths', default='5,10,15,20', help='Clip lengths in seconds')
+    parser.add_argument('--languages', default='Ukrainian')
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    lengths = [float(length) for length in args.lengths.split(',')]
+    source = whisper.load_audio(args.audio) if args.audio else synthetic_audio(max(lengths))
+    languages = args.languages.split(',')
+    model = whisper.load_model(args.model)
+    settings = TranscriptionConfig().settings
+
+    # Warm up kernels and caches so the first measured run is not an outlier
+    settings['short_clip_fast_path'] = True
+    measure(model, source[:int(5 * SAMPLE_RATE)], languages, 1)
+
+    print(f"{'clip s':>7} {'segmented p50':>14} {'fast p50':>9} {'segmented p90':>14} {'fast p90':>9} {'speedup':>8}")
+    all_slow, all_fast = [], []
+    for length in lengths:
+        clip = source[:int(length * SAMPLE_RATE)]
+
+        settings['short_clip_fast_path'] = False
+        slow = measure(model, clip, languages, args.runs)
+        settings['short_clip_fast_path'] = True
+        fast = measure(model, clip, languages, args.runs)
+
+        all_slow.extend(slow)
+        all_fast.extend(fast)
+        print(f"{length:>7.0f} {percentile(slow, 50):>14.3f} {percentile(fast, 50):>9.3f} "
+              f"{percentile(slow, 90):>14.3f} {percentile(fast, 90):>9.3f} "
+              f"{statistics.median(slow) / statistics.median(fast):>7.2f}x")
+
+    print(f"{'all':>7} {percentile(all_slow, 50):>14.3f} {percentile(all_fast, 50):>9.3f} "
+          f"{percentile(all_slow, 90):>14.3f} {percentile(all_fast, 90):>9.3f} "
+          f"{statistics.median(all_slow) / statistics.median(all_fast):>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Find the best split of CPU cores between concurrent inference slots and threads per slot.
+
+Every candidate (slots x torch/BLAS threads) runs in a fresh process, since BLAS pools and
+torch interop threads can only be sized before first use. Each process transcribes the
+same clip `--rounds` times per slot from `slots` concurrent threads through
+TranscriptionService.transcribe_audio and reports throughput (audio seconds transcribed per
+wall-clock second) and per-request latency. One oversubscribed split (every slot using all
+cores) is included for comparison.
+
+Usage:
+    python benchmarks/thread_split.py --audio sample.mp3 --model base
+    python benchmarks/thread_split.py --cores 8 --max-slots 4 --seconds 60
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.resources import BLAS_ENV_VARS, available_cores
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_audio(seconds: float):
+    """Amplitude-modulated harmonics, loud enough to pass the silence checks."""
+    import numpy as np
+
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    voice = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((140, 280, 420, 560)))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    return (0.2 * voice * envelope).astype(np.float32)
+
+
+def run_child(args) -> None:
+    """Measure one split; the thread environment was set by the parent."""
+    import numpy as np
+    import torch
+    import whisper
+
+    from app.transcription import TranscriptionService
+
+    torch.set_num_threads(args.threads)
+    torch.set_num_interop_threads(1)
+
+    clip = whisper.load_audio(args.audio) if args.audio else synthetic_audio(args.seconds)
+    clip = clip[:int(args.seconds * SAMPLE_RATE)]
+    model = whisper.load_model(args.model, device='cpu')
+    languages = args.languages.split(',')
+
+    def transcribe() -> float:
+        future = Future()
+        future.set_result((clip, None))
+        start = time.perf_counter()
+        TranscriptionService.transcribe_audio('benchmark', model, languages, [], audio_future=future)
+        return time.perf_counter() - start
+
+    transcribe()  # warm-up
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.slots) as pool:
+        latencies = list(pool.map(lambda _: transcribe(), range(args.slots * args.rounds)))
+    wall = time.perf_counter() - started
+
+    print(json.dumps({
+        'throughput': len(latencies) * len(clip) / SAMPLE_RATE / wall,
+        'p50': float(np.percentile(latencies, 50)),
+        'p90': float(np.percentile(latencies, 90)),
+    }))
+
+
+def measure(args, slots: int, threads: int) -> dict:
+    env = dict(os.environ)
+    env.update({name: str(threads) for name in BLAS_ENV_VARS})
+    command = [sys.executable, os.path.abspath(__file__), '--child',
+               '--slots', str(slots), '--threads', str(threads),
+               '--model', args.model, '--languages', args.languages,
+               '--seconds', str(args.seconds), '--rounds', str(args.rounds)]
+    if args.audio:
+        command += ['--audio', args.audio]
+    completed = subprocess.run(command, env=env, cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--audio', help='Audio file to transcribe (default: synthetic signal)')
+    parser.add_argument('--model', default='base')
+    parser.add_argument('--languages', default='Ukrainian')
+    parser.add_argument('--seconds', type=float, default=60, help='Length of the clip in seconds')
+    parser.add_argument('--rounds', type=int, default=2, help='Requests per slot')
+    parser.add_argument('--cores', type=int, default=0, help='Cores to split (default: available)')
+    parser.add_argument('--max-slots', type=int, default=0, help='Largest slot count to try')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--slots', type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument('--threads', type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    cores = args.cores or available_cores()
+    max_slots = args.max_slots or cores
+    splits = [(slots, cores // slots) for slots in range(1, max_slots + 1)
+              if cores // slots >= 1 and (slots == 1 or cores // slots != cores // (slots - 1))]
+    if max_slots > 1:
+        splits.append((min(2, max_slots), cores))  # oversubscribed baseline
+
+    print(f"{cores} cores, model {args.model}, {args.seconds:.0f}s clip, {args.rounds} requests per slot")
+    print(f"{'slots':>5} {'threads':>7} {'audio s/s':>10} {'p50 s':>8} {'p90 s':>8}")
+    best = None
+    for slots, threads in splits:
+        result = measure(args, slots, threads)
+        note = ' (oversubscribed)' if slots * threads > cores else ''
+        print(f"{slots:>5} {threads:>7} {result['throughput']:>10.2f} {result['p50']:>8.2f} "
+              f"{result['p90']:>8.2f}{note}")
+        if not note and (best is None or result['throughput'] > best[2]['throughput']):
+            best = (slots, threads, result)
+
+    slots, threads, _ = best
+    print(f"\nBest throughput: RESOURCE_INFERENCE_SLOTS={slots} RESOURCE_TORCH_THREADS={threads} "
+          f"RESOURCE_BLAS_THREADS={threads} GUNICORN_THREADS={slots}")
+
+
+if __name__ == '__main__':
+    main()
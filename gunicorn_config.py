@@ -4,7 +4,9 @@ import os
 bind = "0.0.0.0:8080"
 workers = 1
 worker_class = "gthread"
-threads = 1
+# Raise together with RESOURCE_INFERENCE_SLOTS to run several transcriptions at once; with 1,
+# duplicate requests are never de-duplicated and /reconstruct requests never micro-batched
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
 timeout = 500
 graceful_timeout = 120
 keepalive = 5
@@ -22,3 +24,9 @@ loglevel = os.getenv('GUNICORN_LOG_LEVEL') or ("warning" if is_prod else "info")
 default_accesslog = None if is_prod else "-"
 accesslog = os.getenv('GUNICORN_ACCESSLOG', default_accesslog)
 errorlog = os.getenv('GUNICORN_ERRORLOG', "-")
+
+
+def post_fork(server, worker):
+    # Size the thread pools before the worker loads the app and runs any inference
+    from app.resources import ResourceManager
+    ResourceManager().apply()
@@ -0,0 +1,70 @@
+from multiprocessing import shared_memory
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('whisper')
+pytest.importorskip('flask')
+
+from app import audio_pool
+
+
+def _exists(name):
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    shm.close()
+    return True
+
+
+def test_shared_round_trip_releases_the_block():
+    array = np.arange(12, dtype=np.float32).reshape(2, 6)
+
+    descriptor = audio_pool._to_shared(array)
+    restored = audio_pool._from_shared(descriptor)
+
+    np.testing.assert_array_equal(restored, array)
+    assert restored.dtype == np.float32
+    assert not _exists(descriptor[0])
+
+
+def test_empty_array_round_trip():
+    descriptor = audio_pool._to_shared(np.zeros(0, dtype=np.float32))
+
+    assert audio_pool._from_shared(descriptor).shape == (0,)
+
+
+def test_first_block_unlinked_when_second_fails(monkeypatch):
+    created = []
+    to_shared = audio_pool._to_shared
+
+    def failing_second(array):
+        if created:
+            raise OSError(28, "No space left on device")
+        descriptor = to_shared(array)
+        created.append(descriptor)
+        return descriptor
+
+    audio = np.ones(16, dtype=np.float32)
+    monkeypatch.setattr(audio_pool, '_load_arrays', lambda *args: (audio, audio * 2))
+    monkeypatch.setattr(audio_pool, '_to_shared', failing_second)
+
+    with pytest.raises(OSError):
+        audio_pool._decode_job('audio.mp3', preprocess=True)
+
+    assert len(created) == 1
+    assert not _exists(created[0][0])
+
+
+def test_inline_decoding_without_workers(monkeypatch):
+    audio = np.ones(16, dtype=np.float32)
+    monkeypatch.setattr(audio_pool, '_load_arrays', lambda *args: (audio, None))
+
+    pool = audio_pool.AudioDecodePool()
+    monkeypatch.setattr(pool, '_workers', 0)
+
+    raw, processed = pool.submit('audio.mp3').result(timeout=5)
+
+    np.testing.assert_array_equal(raw, audio)
+    assert processed is None
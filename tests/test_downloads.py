@@ -0,0 +1,115 @@
+import pytest
+
+requests = pytest.importorskip('requests')
+pytest.importorskip('flask')
+
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from app.downloads import DownloadService
+
+URL = 'http://example.com/audio.mp3'
+
+
+class FakeRaw:
+    def __init__(self, pieces):
+        self.pieces = list(pieces)
+
+    def read(self, size, decode_content=True):
+        if not self.pieces:
+            return b''
+        piece = self.pieces.pop(0)
+        if isinstance(piece, Exception):
+            raise piece
+        return piece
+
+
+class FakeResponse:
+    def __init__(self, status_code, pieces=(), headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.raw = FakeRaw(pieces)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, stream=True, timeout=None, headers=None):
+        self.requests.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+def _download(monkeypatch, tmp_path, responses, max_bytes=None):
+    session = FakeSession(responses)
+    monkeypatch.setattr(DownloadService, 'get_session', staticmethod(lambda: session))
+    return DownloadService.download(URL, str(tmp_path), max_bytes=max_bytes), session
+
+
+def _reset():
+    return requests.exceptions.ConnectionError("connection reset")
+
+
+def test_resumes_with_range_and_if_range(monkeypatch, tmp_path):
+    file_path, session = _download(monkeypatch, tmp_path, [
+        FakeResponse(200, [b'0123', _reset()], {'Content-Length': '10', 'ETag': '"a"'}),
+        FakeResponse(206, [b'456789'], {'Content-Range': 'bytes 4-9/10', 'ETag': '"a"'}),
+    ])
+
+    assert open(file_path, 'rb').read() == b'0123456789'
+    assert session.requests[1]['Range'] == 'bytes=4-'
+    assert session.requests[1]['If-Range'] == '"a"'
+
+
+def test_restart_uses_size_and_validator_of_the_new_file(monkeypatch, tmp_path):
+    file_path, session = _download(monkeypatch, tmp_path, [
+        FakeResponse(200, [b'0123', _reset()], {'Content-Length': '10', 'ETag': '"a"'}),
+        # The file changed, so If-Range failed and the whole new file is sent
+        FakeResponse(200, [b'abcdef', _reset()], {'Content-Length': '12', 'ETag': '"b"'}),
+        FakeResponse(206, [b'ghijkl'], {'Content-Range': 'bytes 6-11/12', 'ETag': '"b"'}),
+    ])
+
+    assert open(file_path, 'rb').read() == b'abcdefghijkl'
+    assert session.requests[2]['Range'] == 'bytes=6-'
+    assert session.requests[2]['If-Range'] == '"b"'
+
+
+def test_restart_rechecks_the_size_limit(monkeypatch, tmp_path):
+    with pytest.raises(RequestEntityTooLarge):
+        _download(monkeypatch, tmp_path, [
+            FakeResponse(200, [b'0123', _reset()], {'Content-Length': '10', 'ETag': '"a"'}),
+            FakeResponse(200, [b'x' * 4], {'Content-Length': '100', 'ETag': '"b"'}),
+        ], max_bytes=50)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_416_after_the_last_byte_completes_the_download(monkeypatch, tmp_path):
+    file_path, session = _download(monkeypatch, tmp_path, [
+        FakeResponse(200, [b'0123456789', _reset()], {'Content-Length': '10', 'ETag': '"a"'}),
+        FakeResponse(416, [], {'Content-Range': 'bytes */10'}),
+    ])
+
+    assert open(file_path, 'rb').read() == b'0123456789'
+    assert len(session.requests) == 2
+
+
+def test_416_for_a_shrunk_file_restarts(monkeypatch, tmp_path):
+    file_path, session = _download(monkeypatch, tmp_path, [
+        FakeResponse(200, [b'0123', _reset()], {'Content-Length': '10', 'ETag': '"a"'}),
+        FakeResponse(416, [], {'Content-Range': 'bytes */3'}),
+        FakeResponse(200, [b'xyz'], {'Content-Length': '3', 'ETag': '"b"'}),
+    ])
+
+    assert open(file_path, 'rb').read() == b'xyz'
+    assert 'Range' not in session.requests[2]
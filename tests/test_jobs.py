@@ -0,0 +1,151 @@
+import contextlib
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('flask')
+
+from app.jobs import COMPLETED, FAILED, JobRunner, JobStore
+
+LEASE = 60
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / 'jobs.sqlite3'))
+
+
+def _abandon(store, job_id, seconds_ago=LEASE * 2):
+    store._connection().execute(
+        "UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time() - seconds_ago, job_id)
+    )
+
+
+def test_live_jobs_are_not_claimable(store):
+    job_id = store.create('audio.mp3', {}, 'worker-a')
+
+    assert store.claimable('worker-b', LEASE) == []
+    assert not store.claim(job_id, 'worker-b', LEASE)
+
+
+def test_abandoned_job_is_claimed_once(store):
+    job_id = store.create('audio.mp3', {}, 'worker-a')
+    _abandon(store, job_id)
+
+    assert store.claimable('worker-b', LEASE) == [job_id]
+    assert store.claim(job_id, 'worker-b', LEASE)
+    assert not store.claim(job_id, 'worker-c', LEASE)
+    assert store.get(job_id)['owner'] == 'worker-b'
+
+
+def test_heartbeat_keeps_the_lease(store):
+    job_id = store.create('audio.mp3', {}, 'worker-a')
+    _abandon(store, job_id)
+
+    store.heartbeat('worker-a')
+
+    assert store.claimable('worker-b', LEASE) == []
+
+
+def test_finished_jobs_are_never_claimed(store):
+    job_id = store.create('audio.mp3', {}, 'worker-a')
+    store.finish(job_id, result={"text": "done"})
+    _abandon(store, job_id)
+
+    assert store.claimable('worker-b', LEASE) == []
+    assert store.get(job_id)['status'] == COMPLETED
+
+
+def test_segments_are_kept_in_order_until_finish(store):
+    job_id = store.create('audio.mp3', {}, 'worker-a')
+    store.add_segment(job_id, 'en', {"start": 5.0, "text": "second"})
+    store.add_segment(job_id, 'en', {"start": 0.0, "text": "first"})
+    # Replayed on resume: stored once
+    store.add_segment(job_id, 'en', {"start": 0.0, "text": "first"})
+    store.add_segment(job_id, 'uk', {"start": 0.0, "text": "перший"})
+
+    assert store.segments(job_id) == {
+        'en': [{"start": 0.0, "text": "first"}, {"start": 5.0, "text": "second"}],
+        'uk': [{"start": 0.0, "text": "перший"}],
+    }
+    assert store.get(job_id)['segments_done'] == 3
+
+    store.finish(job_id, error={"error": "failed"})
+
+    assert store.segments(job_id) == {}
+    assert store.get(job_id)['status'] == FAILED
+
+
+def _runner(store, handler):
+    runner = object.__new__(JobRunner)
+    runner._init()
+    runner.owner = 'worker-b'
+    runner.lease_seconds = LEASE
+    runner.store = store
+    runner._app = SimpleNamespace(app_context=contextlib.nullcontext)
+    runner._handler = handler
+    runner.finished = []
+    runner._on_finish = runner.finished.append
+    return runner
+
+
+def test_abandoned_job_resumes_after_its_finished_segments(store, tmp_path):
+    audio = tmp_path / 'audio.mp3'
+    audio.write_bytes(b'audio')
+    job_id = store.create(str(audio), {"lang": "en"}, 'worker-a')
+    store.start(job_id)
+    store.add_segment(job_id, 'en', {"start": 0.0, "text": "first"})
+    _abandon(store, job_id)
+
+    def handler(file_path, options, on_segment, completed):
+        assert completed == {'en': [{"start": 0.0, "text": "first"}]}
+        on_segment('en', {"start": 5.0, "text": "second"})
+        on_segment('en', {"start": 10.0, "error": "decode failed"})
+        return {"text": "first second"}
+
+    runner = _runner(store, handler)
+    runner._reclaim()
+    assert runner._queue.get_nowait() == job_id
+
+    runner._run(job_id)
+
+    job = store.get(job_id)
+    assert job['status'] == COMPLETED
+    assert job['attempts'] == 2
+    assert job['result'] == {"text": "first second", "resumed_segments": 1}
+    assert job['segments_done'] == 0
+    assert not audio.exists()
+    assert [finished['id'] for finished in runner.finished] == [job_id]
+
+
+def test_job_gives_up_after_max_attempts(store):
+    job_id = store.create('audio.mp3', {}, 'worker-a')
+    runner = _runner(store, lambda *args: pytest.fail("handler must not run"))
+    runner.max_attempts = 2
+    store.start(job_id)
+    store.start(job_id)
+
+    runner._run(job_id)
+
+    job = store.get(job_id)
+    assert job['status'] == FAILED
+    assert 'after 2 attempts' in job['error']['error']
+
+
+def test_handler_failure_is_stored_and_releases_the_ticket(store):
+    job_id = store.create('audio.mp3', {}, 'worker-b')
+    released = []
+
+    def handler(*args):
+        raise ValueError("bad audio")
+
+    runner = _runner(store, handler)
+    runner._tickets[job_id] = SimpleNamespace(release=released.append)
+
+    runner._run(job_id)
+
+    job = store.get(job_id)
+    assert job['status'] == FAILED
+    assert job['error'] == {"error": "bad audio"}
+    assert [type(error) for error in released] == [ValueError]
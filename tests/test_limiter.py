@@ -0,0 +1,122 @@
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_limiter')
+
+from app import limiter
+from app.exceptions import AdmissionError, ModelLoadError, SilenceError
+from app.limiter import AdmissionController, AdmissionTicket, SQLiteCostStore
+
+
+def _usage(store, key, window):
+    row = store._connection().execute(
+        "SELECT cost FROM admission_usage WHERE key = ? AND window = ?", (key, window)
+    ).fetchone()
+    return row[0] if row else 0.0
+
+
+def test_charge_stops_at_the_budget(tmp_path):
+    store = SQLiteCostStore(str(tmp_path / 'usage.sqlite3'))
+
+    assert store.charge('k', 1, 60.0, 100.0) == (True, 60.0)
+    assert store.charge('k', 1, 60.0, 100.0) == (False, 60.0)
+    assert store.charge('other', 1, 60.0, 100.0) == (True, 60.0)
+    # A new window starts from zero and drops the old ones
+    assert store.charge('k', 2, 60.0, 100.0) == (True, 60.0)
+    assert _usage(store, 'other', 1) == 0.0
+
+
+def test_refund_never_goes_below_zero(tmp_path):
+    store = SQLiteCostStore(str(tmp_path / 'usage.sqlite3'))
+    store.charge('k', 1, 60.0, 100.0)
+
+    store.refund('k', 1, 40.0)
+    assert _usage(store, 'k', 1) == 20.0
+
+    store.refund('k', 1, 40.0)
+    assert _usage(store, 'k', 1) == 0.0
+    assert store.charge('k', 1, 100.0, 100.0) == (True, 100.0)
+
+
+class FakeController:
+    def __init__(self):
+        self.finished = []
+        self.refunded = []
+
+    def _finish(self, cost, elapsed):
+        self.finished.append(cost)
+
+    def _refund(self, key, window, cost):
+        self.refunded.append((key, window, cost))
+
+
+@pytest.mark.parametrize('error', [SilenceError(), ModelLoadError("no model")])
+def test_ticket_refunds_work_that_produced_nothing(error):
+    controller = FakeController()
+
+    with pytest.raises(type(error)):
+        with AdmissionTicket(controller, 5.0, 'k', 7):
+            raise error
+
+    assert controller.finished == [5.0]
+    assert controller.refunded == [('k', 7, 5.0)]
+
+
+def test_ticket_keeps_the_charge_for_other_outcomes():
+    controller = FakeController()
+
+    with pytest.raises(ValueError):
+        with AdmissionTicket(controller, 5.0, 'k', 7):
+            raise ValueError("bad audio")
+    with AdmissionTicket(controller, 5.0, 'k', 7):
+        pass
+
+    assert controller.finished == [5.0, 5.0]
+    assert controller.refunded == []
+
+
+def test_ticket_releases_once_and_skips_uncharged_refunds():
+    controller = FakeController()
+    ticket = AdmissionTicket(controller, 5.0)
+
+    ticket.release(SilenceError())
+    ticket.release(SilenceError())
+
+    assert controller.finished == [5.0]
+    assert controller.refunded == []
+
+
+@pytest.fixture
+def controller(monkeypatch, tmp_path):
+    controller = object.__new__(AdmissionController)
+    controller._init()
+    controller.enabled = True
+    controller.budget = 100.0
+    controller.max_duration = 0
+    controller.max_queue_wait = 0
+    controller.model_weights = {'base': 1.0}
+    controller._store_uri = f"sqlite:///{tmp_path / 'usage.sqlite3'}"
+    monkeypatch.setattr(limiter, 'probe_duration', lambda file_path: 60.0)
+    return controller
+
+
+def test_refunded_charge_can_be_spent_again(controller):
+    with pytest.raises(SilenceError):
+        with controller.admit('audio.mp3', 'base', key='k'):
+            raise SilenceError()
+
+    with controller.admit('audio.mp3', 'base', key='k'):
+        pass
+
+    with pytest.raises(AdmissionError):
+        controller.admit('audio.mp3', 'base', key='k')
+    assert controller.estimated_wait() == 0.0
+
+
+def test_sqlite_store_is_refused_in_production(controller, monkeypatch):
+    monkeypatch.setattr(limiter, 'is_prod', True)
+    with pytest.raises(RuntimeError):
+        controller.check_store()
+
+    controller._store_uri = 'redis://localhost:6379/0'
+    controller.check_store()
@@ -0,0 +1,90 @@
+from collections import OrderedDict
+
+import pytest
+
+pytest.importorskip('torch')
+pytest.importorskip('transformers')
+pytest.importorskip('whisper')
+pytest.importorskip('flask')
+
+from app.models import GemmaModelCache, _GemmaEntry
+
+MB = 1024 ** 2
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = GemmaModelCache()
+    monkeypatch.setattr(cache, '_entries', OrderedDict())
+    monkeypatch.setattr(cache, '_reserved', {})
+    monkeypatch.setattr(cache, '_max_models', 2)
+    monkeypatch.setattr(cache, '_memory_budget', 0)
+    return cache
+
+
+def _add(cache, model_id, size_mb=100, refcount=0):
+    entry = _GemmaEntry(object(), object(), 'cpu', size_bytes=size_mb * MB)
+    entry.refcount = refcount
+    cache._entries[model_id] = entry
+    return entry
+
+
+def test_acquire_pins_and_release_unpins(cache):
+    entry = _add(cache, 'a')
+
+    model, tokenizer = cache.acquire('a')
+    assert (model, tokenizer) == (entry.model, entry.tokenizer)
+    assert entry.refcount == 1
+
+    cache.release('a')
+    cache.release('a')
+    assert entry.refcount == 0
+
+
+def test_least_recently_used_idle_model_is_evicted(cache):
+    _add(cache, 'a')
+    _add(cache, 'b')
+    cache.acquire('a')
+    cache.release('a')
+
+    cache._reserve('c', 100 * MB)
+
+    assert list(cache._entries) == ['a']
+    assert cache._reserved == {'c': 100 * MB}
+
+
+def test_models_in_use_are_not_evicted(cache):
+    _add(cache, 'a', refcount=1)
+    _add(cache, 'b', refcount=1)
+
+    cache._reserve('c', 100 * MB)
+
+    assert list(cache._entries) == ['a', 'b']
+
+    # Evicted once the last user releases it
+    cache.release('a')
+    assert list(cache._entries) == ['b']
+
+
+def test_reserve_over_memory_budget_raises(cache, monkeypatch):
+    monkeypatch.setattr(cache, '_memory_budget', 300 * MB)
+    monkeypatch.setattr(cache, '_max_models', 5)
+    _add(cache, 'a', size_mb=200, refcount=1)
+
+    with pytest.raises(MemoryError, match='a'):
+        cache._reserve('b', 200 * MB)
+
+    assert cache._reserved == {}
+    assert list(cache._entries) == ['a']
+
+
+def test_reserve_evicts_idle_models_to_fit_budget(cache, monkeypatch):
+    monkeypatch.setattr(cache, '_memory_budget', 300 * MB)
+    monkeypatch.setattr(cache, '_max_models', 5)
+    _add(cache, 'a', size_mb=200)
+    _add(cache, 'b', size_mb=50, refcount=1)
+
+    cache._reserve('c', 200 * MB)
+
+    assert list(cache._entries) == ['b']
+    assert cache._memory_used() == 250 * MB
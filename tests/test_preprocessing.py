@@ -0,0 +1,44 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('scipy')
+pytest.importorskip('librosa')
+pytest.importorskip('flask')
+
+from app.preprocessing import PreprocessingService
+
+HOP_LENGTH = 512
+
+
+def _noise(bins, frames, level, seed=0):
+    rng = np.random.default_rng(seed)
+    return level * (0.8 + 0.4 * rng.random((bins, frames)))
+
+
+def test_noise_floor_without_leading_silence():
+    # Speech bursts from the very first frame, separated by short pauses
+    D_mag = _noise(64, 400, 0.1)
+    for start in range(0, 400, 40):
+        D_mag[:, start:start + 20] += 2.0
+
+    floor = PreprocessingService._estimate_noise_floor(D_mag, HOP_LENGTH)
+
+    assert floor.shape == D_mag.shape
+    # The floor follows the background, not the bursts, even inside the first burst
+    assert np.all(floor[:, :20] < 0.5)
+    assert np.all(floor >= 0.05)
+
+
+def test_noise_floor_follows_rising_background():
+    D_mag = np.concatenate([_noise(32, 300, 0.1, seed=1), _noise(32, 300, 0.5, seed=2)], axis=1)
+
+    floor = PreprocessingService._estimate_noise_floor(D_mag, HOP_LENGTH)
+
+    assert np.median(floor[:, 450:]) > 3 * np.median(floor[:, :150])
+
+
+def test_noise_floor_of_empty_spectrum():
+    floor = PreprocessingService._estimate_noise_floor(np.zeros((16, 0)), HOP_LENGTH)
+
+    assert floor.shape == (16, 1)
+    assert not floor.any()
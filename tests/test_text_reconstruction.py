@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip('torch')
+pytest.importorskip('transformers')
+pytest.importorskip('rapidfuzz')
+pytest.importorskip('flask')
+
+from app.config import ReconstructionConfig
+from app.text_reconstruction import TextReconstructionService
+
+
+@pytest.fixture
+def chunk_config(monkeypatch):
+    settings = ReconstructionConfig().settings
+    monkeypatch.setitem(settings, 'chunk_chars', 12)
+    monkeypatch.setitem(settings, 'chunk_overlap_segments', 1)
+    monkeypatch.setitem(settings, 'chunk_stitch_threshold', 60)
+    return settings
+
+
+def test_chunks_follow_segment_boundaries_with_overlap(chunk_config):
+    segments = [{"text": " a1 a2 "}, {"text": "b1 b2"}, "c1 c2", {"text": "d1 d2"}]
+
+    chunks = TextReconstructionService.split_into_chunks("ignored", segments)
+
+    assert chunks == [("a1 a2 b1 b2", ""), ("b1 b2 c1 c2 d1 d2", "b1 b2")]
+
+
+def test_chunks_fall_back_to_sentences(chunk_config):
+    chunks = TextReconstructionService.split_into_chunks("One two. Three four! Five six?")
+
+    assert [text for text, _ in chunks] == ["One two.", "One two. Three four!", "Three four! Five six?"]
+
+
+def test_chunks_without_overlap(chunk_config, monkeypatch):
+    monkeypatch.setitem(chunk_config, 'chunk_overlap_segments', 0)
+
+    chunks = TextReconstructionService.split_into_chunks("", ["a1 a2", "b1 b2", "c1 c2"])
+
+    assert chunks == [("a1 a2 b1 b2", ""), ("c1 c2", "")]
+
+
+def test_stitch_drops_the_restated_overlap(chunk_config):
+    stitched = TextReconstructionService.stitch_chunks(
+        ["a1 a2 b1 b2", "b1 b2 c1 c2 d1 d2"], ["", "b1 b2"]
+    )
+
+    assert stitched == "a1 a2 b1 b2 c1 c2 d1 d2"
+
+
+def test_stitch_keeps_text_that_does_not_match_the_overlap(chunk_config):
+    stitched = TextReconstructionService.stitch_chunks(["aaa bbb", "xxx yyy zzz"], ["", "bbb"])
+
+    assert stitched == "aaa bbb xxx yyy zzz"
+
+
+def test_stitch_of_nothing():
+    assert TextReconstructionService.stitch_chunks([], []) == ""
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('whisper')
+
+from app import routes
+from app.cancellation import DEADLINE_EXCEEDED, CancellationToken
+from app.exceptions import SilenceError
+
+
+def test_follower_deadline_while_waiting_returns_truncated_result(monkeypatch):
+    release_leader = threading.Event()
+    leader_started = threading.Event()
+
+    def slow_transcription(file_path, options, cancel_token=None):
+        leader_started.set()
+        release_leader.wait(timeout=10)
+        return {"transcriptions": {"Ukrainian": "text"}, "segments": {}, "keyword_spots": {},
+                "processing_time": 1.0}
+
+    monkeypatch.setattr(routes, '_run_transcription', slow_transcription)
+    monkeypatch.setattr(routes, 'file_digest', lambda file_path: 'digest')
+    monkeypatch.setattr(routes.AdmissionController, 'caller_key', staticmethod(lambda: 'caller'))
+
+    options = {'languages': ['Ukrainian'], 'model_type': 'base'}
+    leader_result = {}
+    leader = threading.Thread(
+        target=lambda: leader_result.update(routes._transcribe_file('audio.mp3', options))
+    )
+    leader.start()
+    assert leader_started.wait(timeout=5)
+
+    try:
+        result = routes._transcribe_file('audio.mp3', options, CancellationToken(timeout=0.05))
+    finally:
+        release_leader.set()
+        leader.join(timeout=10)
+
+    assert result["truncated"] is True
+    assert result["truncation_reason"] == DEADLINE_EXCEEDED
+    assert result["transcriptions"] == {}
+    assert result["keyword_spots"] == {}
+    # Read unconditionally by /transcribe and /pull
+    assert isinstance(result["processing_time"], float)
+    assert leader_result["transcriptions"] == {"Ukrainian": "text"}
+
+
+def test_leader_exception_is_raised_in_followers(monkeypatch):
+    release_leader = threading.Event()
+    leader_started = threading.Event()
+    calls = []
+
+    def failing_transcription(file_path, options, cancel_token=None):
+        calls.append(file_path)
+        leader_started.set()
+        release_leader.wait(timeout=10)
+        raise SilenceError()
+
+    monkeypatch.setattr(routes, '_run_transcription', failing_transcription)
+    monkeypatch.setattr(routes, 'file_digest', lambda file_path: 'digest')
+    monkeypatch.setattr(routes.AdmissionController, 'caller_key', staticmethod(lambda: 'caller'))
+
+    options = {'languages': ['Ukrainian'], 'model_type': 'base'}
+    errors = {}
+
+    def transcribe(name):
+        try:
+            routes._transcribe_file('audio.mp3', options, CancellationToken(timeout=10))
+        except Exception as e:
+            errors[name] = e
+
+    leader = threading.Thread(target=transcribe, args=('leader',))
+    leader.start()
+    assert leader_started.wait(timeout=5)
+
+    follower = threading.Thread(target=transcribe, args=('follower',))
+    follower.start()
+    # Let the follower join the in-flight call before the leader fails
+    time.sleep(0.3)
+    release_leader.set()
+    leader.join(timeout=10)
+    follower.join(timeout=10)
+
+    assert not follower.is_alive()
+    assert len(calls) == 1
+    assert isinstance(errors['leader'], SilenceError)
+    assert isinstance(errors['follower'], SilenceError)
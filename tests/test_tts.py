@@ -0,0 +1,71 @@
+import logging
+
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('torchaudio')
+pytest.importorskip('flask')
+
+from app.tts import TTSService
+
+
+def _service(stream_max_chars=800):
+    service = object.__new__(TTSService)
+    service.stream_max_chars = stream_max_chars
+    service.sample_rate = 48000
+    service.logger = logging.getLogger(__name__)
+    return service
+
+
+def test_split_sentences_on_punctuation_and_newlines():
+    pieces = _service().split_sentences("Hello there! How are you?\nFine.  Thanks…  Bye")
+
+    assert pieces == ["Hello there!", "How are you?", "Fine.", "Thanks…", "Bye"]
+
+
+def test_long_sentences_split_on_whitespace():
+    pieces = _service(stream_max_chars=12).split_sentences("one two three four five six")
+
+    assert pieces == ["one two", "three four", "five six"]
+    assert all(len(piece) <= 12 for piece in pieces)
+
+
+def test_words_longer_than_the_limit_are_cut():
+    assert _service(stream_max_chars=4).split_sentences("abcdefghij") == ["abcd", "efgh", "ij"]
+
+
+def test_blank_text_has_no_sentences():
+    assert _service().split_sentences(" \n\n  ") == []
+
+
+def test_synthesize_text_joins_sentences(monkeypatch):
+    service = _service(stream_max_chars=12)
+    calls = []
+
+    def synthesize(sentence, language, speaker):
+        calls.append(sentence)
+        return torch.full((1, 3), float(len(calls)))
+
+    monkeypatch.setattr(service, 'synthesize', synthesize)
+
+    audio = service.synthesize_text("one two three. four", 'en', 'speaker')
+
+    assert calls == ["one two", "three.", "four"]
+    assert audio.tolist() == [[1.0, 1.0, 1.0, 2.0, 2.0, 2.0, 3.0, 3.0, 3.0]]
+
+
+def test_synthesize_text_rejects_blank_text():
+    with pytest.raises(ValueError):
+        _service().synthesize_text("   ", 'en', 'speaker')
+
+
+def test_stream_starts_with_an_open_ended_wav_header(monkeypatch):
+    service = _service()
+    monkeypatch.setattr(service, 'resolve_speaker', lambda language, voice: 'speaker')
+    monkeypatch.setattr(service, 'synthesize', lambda sentence, language, speaker: torch.zeros(1, 10))
+
+    chunks = list(service.stream_speech("One. Two.", 'en'))
+
+    assert chunks[0][:4] == b'RIFF' and chunks[0][8:12] == b'WAVE'
+    assert len(chunks[0]) == 44
+    assert [len(chunk) for chunk in chunks[1:]] == [20, 20]
@@ -0,0 +1,68 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+
+from app.tts_storage import TTSStorage
+
+
+def _write(storage, name, size, age=0):
+    path = storage.store(name, b'x' * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_sweep_removes_expired_files(tmp_path):
+    storage = TTSStorage(str(tmp_path), ttl_seconds=60, max_bytes=0)
+    _write(storage, 'old.mp3', 10, age=120)
+    _write(storage, 'new.mp3', 10)
+
+    assert storage.sweep() == 1
+    assert sorted(os.listdir(tmp_path)) == ['new.mp3']
+
+
+def test_sweep_trims_least_recently_used_first(tmp_path):
+    storage = TTSStorage(str(tmp_path), ttl_seconds=0, max_bytes=15)
+    _write(storage, 'a.mp3', 10, age=30)
+    _write(storage, 'b.mp3', 10, age=20)
+    _write(storage, 'c.mp3', 10, age=10)
+
+    # A touch makes the oldest file the most recently used
+    assert storage.touch('a.mp3')
+
+    assert storage.sweep() == 2
+    assert sorted(os.listdir(tmp_path)) == ['a.mp3']
+
+
+def test_sweep_removes_stale_temporary_files_only(tmp_path):
+    storage = TTSStorage(str(tmp_path), ttl_seconds=0, max_bytes=0)
+    for name, age in (('.stale.tmp', 7200), ('.fresh.tmp', 0)):
+        path = tmp_path / name
+        path.write_bytes(b'partial')
+        os.utime(path, (time.time() - age, time.time() - age))
+    _write(storage, 'other.wav', 10, age=7200)
+
+    storage.sweep()
+
+    assert sorted(os.listdir(tmp_path)) == ['.fresh.tmp', 'other.wav']
+
+
+def test_swept_files_leave_the_memory_cache(tmp_path):
+    storage = TTSStorage(str(tmp_path), ttl_seconds=60, max_bytes=0, memory_max_bytes=100)
+    _write(storage, 'old.mp3', 10, age=120)
+    assert storage.read('old.mp3') == b'x' * 10
+
+    storage.sweep()
+
+    assert storage.read('old.mp3') is None
+
+
+def test_touch_of_an_expired_file_fails(tmp_path):
+    storage = TTSStorage(str(tmp_path), ttl_seconds=60)
+    _write(storage, 'old.mp3', 10, age=120)
+
+    assert not storage.touch('old.mp3')
+    assert not storage.touch('missing.mp3')
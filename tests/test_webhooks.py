@@ -0,0 +1,161 @@
+import hashlib
+import hmac
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+requests = pytest.importorskip('requests')
+pytest.importorskip('flask')
+
+from app.webhooks import WebhookDispatcher, _Delivery
+
+URL = 'http://example.com/hook'
+
+
+class FakeSession:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.posts = []
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        self.posts.append((url, data, headers))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        status_code, response_headers = outcome if isinstance(outcome, tuple) else (outcome, {})
+        return SimpleNamespace(status_code=status_code, headers=response_headers)
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    dispatcher = object.__new__(WebhookDispatcher)
+    dispatcher._init()
+    dispatcher.max_attempts = 3
+    dispatcher.backoff_base = 1.0
+    dispatcher.backoff_max = 300
+    dispatcher._secret = b''
+    # Deliveries are driven by hand instead of by the scheduler thread
+    monkeypatch.setattr(dispatcher, '_ensure_started', lambda: None)
+    return dispatcher
+
+
+def _use(dispatcher, monkeypatch, *outcomes):
+    session = FakeSession(*outcomes)
+    monkeypatch.setattr(dispatcher, 'get_session', lambda: session)
+    return session
+
+
+def _queued(dispatcher, body=b'{}'):
+    dispatcher._outstanding += 1
+    return _Delivery(URL, [body])
+
+
+def _retry_delay(dispatcher):
+    due, _, delivery = dispatcher._retries[0]
+    return due - time.monotonic(), delivery
+
+
+def test_success_releases_the_queue_slot(dispatcher, monkeypatch):
+    _use(dispatcher, monkeypatch, 204)
+
+    dispatcher._deliver(_queued(dispatcher))
+
+    assert dispatcher._outstanding == 0
+    assert dispatcher._retries == []
+
+
+def test_retry_after_is_honoured_and_clamped(dispatcher, monkeypatch):
+    dispatcher.backoff_max = 60
+    _use(dispatcher, monkeypatch, (503, {'Retry-After': '30'}), (429, {'Retry-After': '86400'}))
+    delivery = _queued(dispatcher)
+
+    dispatcher._deliver(delivery)
+    delay, retried = _retry_delay(dispatcher)
+    assert retried is delivery and 29 < delay <= 30
+
+    dispatcher._retries.clear()
+    dispatcher._deliver(delivery)
+    delay, _ = _retry_delay(dispatcher)
+    assert 59 < delay <= 60
+    assert dispatcher._outstanding == 1
+
+
+def test_backoff_without_retry_after(dispatcher, monkeypatch):
+    _use(dispatcher, monkeypatch, (502, {'Retry-After': 'Wed, 21 Oct 2026 07:28:00 GMT'}))
+    dispatcher.max_attempts = 6
+    delivery = _queued(dispatcher)
+    delivery.attempt = 2
+
+    dispatcher._deliver(delivery)
+
+    # Third attempt: base * 2 ** 2 with jitter between half and full
+    delay, _ = _retry_delay(dispatcher)
+    assert 1.9 < delay <= 4.0
+
+
+def test_permanent_failure_is_not_retried(dispatcher, monkeypatch):
+    _use(dispatcher, monkeypatch, 404)
+
+    dispatcher._deliver(_queued(dispatcher))
+
+    assert dispatcher._retries == []
+    assert dispatcher._outstanding == 0
+
+
+@pytest.mark.parametrize('error', [requests.exceptions.ConnectionError("refused"), TypeError("not serializable")])
+def test_errors_are_retried_until_max_attempts(dispatcher, monkeypatch, error):
+    session = _use(dispatcher, monkeypatch, error, error, error)
+    delivery = _queued(dispatcher)
+
+    for _ in range(dispatcher.max_attempts):
+        dispatcher._retries.clear()
+        dispatcher._deliver(delivery)
+
+    assert len(session.posts) == 3
+    assert dispatcher._retries == []
+    assert dispatcher._outstanding == 0
+
+
+def test_results_for_one_url_are_batched(dispatcher, monkeypatch):
+    dispatcher.batch_max_items = 3
+    dispatcher.batch_max_bytes = 100
+    dispatcher._secret = b'secret'
+    session = _use(dispatcher, monkeypatch, 200)
+
+    for index in range(3):
+        assert dispatcher.send(URL, {"id": index})
+    dispatcher.send(URL, {"text": "x" * 200})
+
+    assert dispatcher._batches == {}
+    batch, single = dispatcher._ready
+    assert len(batch.bodies) == 3 and len(single.bodies) == 1
+
+    dispatcher._deliver(batch)
+
+    _, body, headers = session.posts[0]
+    assert json.loads(body) == {"batch": [{"id": 0}, {"id": 1}, {"id": 2}]}
+    assert headers['X-Webhook-Batch-Size'] == '3'
+    assert headers['X-Webhook-Signature'] == 'sha256=' + hmac.new(b'secret', body, hashlib.sha256).hexdigest()
+    assert dispatcher._outstanding == 1
+
+
+def test_partial_batch_waits_for_its_window(dispatcher):
+    dispatcher.batch_max_items = 3
+    dispatcher.batch_max_bytes = 100
+
+    dispatcher.send(URL, {"id": 0})
+    dispatcher.send('http://example.com/other', {"id": 1})
+
+    assert dispatcher._ready == []
+    assert sorted(dispatcher._batches) == [URL, 'http://example.com/other']
+
+
+def test_full_queue_drops_results(dispatcher):
+    dispatcher.queue_size = 2
+
+    assert dispatcher.send(URL, {"id": 0})
+    assert dispatcher.send(URL, {"id": 1})
+    assert not dispatcher.send(URL, {"id": 2})
+    assert dispatcher._outstanding == 2